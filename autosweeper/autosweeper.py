@@ -4,21 +4,287 @@
 # website: https://github.com/Michael1075/autosweeper
 
 from abc import abstractmethod
+from array import array
+from collections import deque
+from collections import OrderedDict
 import json
+import math
+import mmap
+import multiprocessing
 import os
+import queue
 import random
+import struct
+import threading
 import time
 
+import bit_autosweeper
 from tools import *
 
+try:
+    import np_autosweeper
+except ImportError:
+    np_autosweeper = None
+
 
 __author__ = "Michael W"
 
 
 CONSOLE = ConsoleTools()
+PROFILER = Profiler(
+    ("start", "expand", "inference", "guess", "other", "record"),
+    ("inferences", "pair_checks", "queue_pushes")
+)
+
+
+class SpiralTable(object):
+    """
+    The spiral order of boxes around any center, built once for each map size
+    and shared by all games of that size.
+
+    Each layer of the spiral is stored as its four straight sides. A side is
+    clipped against the map as a whole, so that tracing the spiral never
+    visits coordinates out of the map.
+    """
+    TABLES = {}
+
+    def __init__(self, map_width, map_height):
+        self.map_width = map_width
+        self.map_height = map_height
+        self.max_layer = max(map_width, map_height) - 1
+        self.layer_sides = [()]
+        for layer in range(1, self.max_layer + 1):
+            self.layer_sides.append(self.get_layer_sides(layer))
+
+    @staticmethod
+    def get(map_width, map_height):
+        size = (map_width, map_height)
+        table = SpiralTable.TABLES.get(size)
+        if table is None:
+            table = SpiralTable(map_width, map_height)
+            SpiralTable.TABLES[size] = table
+        return table
+
+    def get_layer_sides(self, layer):
+        """
+        :return: tuple[tuple[int]]
+            (x, y, dx, dy, offset, step) of each side, where (x, y) is the
+            first box relative to the center and (dx, dy) is the direction.
+            Each side contains 2 * layer boxes.
+        """
+        map_width = self.map_width
+        return tuple(
+            (x, y, dx, dy, x + map_width * y, dx + map_width * dy)
+            for x, y, dx, dy in (
+                (layer, 1 - layer, 0, 1),
+                (layer - 1, layer, -1, 0),
+                (-layer, layer - 1, 0, -1),
+                (1 - layer, -layer, 1, 0),
+            )
+        )
+
+    @staticmethod
+    def clip_side(begin_val, direction, side_length, limit):
+        if direction == 1:
+            return max(0, -begin_val), min(side_length, limit - begin_val)
+        return max(0, begin_val - limit + 1), min(side_length, begin_val + 1)
+
+    def get_spiral_indexes(self, center_index, layer=-1):
+        map_width = self.map_width
+        map_height = self.map_height
+        x0 = center_index % map_width
+        y0 = center_index // map_width
+        if layer == -1:
+            layer = max(x0, map_width - x0 - 1, y0, map_height - y0 - 1)
+        layer = min(layer, self.max_layer)
+        yield center_index
+        for current_layer in range(1, layer + 1):
+            side_length = 2 * current_layer
+            for x, y, dx, dy, offset, step in self.layer_sides[current_layer]:
+                x += x0
+                y += y0
+                if dx == 0:
+                    if not 0 <= x < map_width:
+                        continue
+                    begin, end = SpiralTable.clip_side(
+                        y, dy, side_length, map_height
+                    )
+                else:
+                    if not 0 <= y < map_height:
+                        continue
+                    begin, end = SpiralTable.clip_side(
+                        x, dx, side_length, map_width
+                    )
+                if begin < end:
+                    begin_index = center_index + offset + begin * step
+                    yield from range(
+                        begin_index, begin_index + (end - begin) * step, step
+                    )
+
+
+class SurroundingTable(object):
+    """
+    The surrounding indexes of every box within `layer` layers, built once
+    for each map size and shared by all games of that size.
+
+    The indexes are stored as compressed rows: those around box `i` are
+    `indexes[offsets[i]:offsets[i + 1]]`, in spiral order. On maps of up to
+    `MAX_EXPANDED_BOXES` boxes, `rows` holds each row as a tuple for fast
+    iteration; on larger maps `rows` is the table itself, which slices rows
+    out on access.
+
+    At most `MAX_CACHED_TABLES` tables are cached, the least recently used
+    one being dropped first. Games keep references to their own tables, so
+    dropping a table never affects a game.
+    """
+    MAX_EXPANDED_BOXES = 1 << 16
+    MAX_CACHED_TABLES = 8
+    TABLES = OrderedDict()
+
+    def __init__(self, map_width, map_height, layer):
+        spiral_table = SpiralTable.get(map_width, map_height)
+        num_boxes = map_width * map_height
+        offsets = array("i", [0])
+        indexes = array("i")
+        for i in range(num_boxes):
+            spiral_indexes = spiral_table.get_spiral_indexes(i, layer)
+            next(spiral_indexes)
+            indexes.extend(spiral_indexes)
+            offsets.append(len(indexes))
+        self.offsets = offsets
+        self.indexes = indexes
+        self.counts = bytearray(
+            offsets[i + 1] - offsets[i] for i in range(num_boxes)
+        )
+        if num_boxes <= SurroundingTable.MAX_EXPANDED_BOXES:
+            box_indexes = list(range(num_boxes))
+            self.rows = [
+                tuple(map(
+                    box_indexes.__getitem__,
+                    indexes[offsets[i]:offsets[i + 1]]
+                ))
+                for i in range(num_boxes)
+            ]
+        else:
+            self.rows = self
+
+    @staticmethod
+    def get(map_width, map_height, layer):
+        key = (map_width, map_height, layer)
+        tables = SurroundingTable.TABLES
+        table = tables.get(key)
+        if table is None:
+            table = SurroundingTable(map_width, map_height, layer)
+            tables[key] = table
+            if len(tables) > SurroundingTable.MAX_CACHED_TABLES:
+                tables.popitem(last=False)
+        else:
+            tables.move_to_end(key)
+        return table
+
+    def __len__(self):
+        return len(self.counts)
+
+    def __getitem__(self, index):
+        return self.indexes[self.offsets[index]:self.offsets[index + 1]]
+
+
+class PairTable(object):
+    """
+    The boxes compared by `Logic.two_indexes_logic` for every box and every
+    box within 2 layers around it, built once for each map size and shared
+    by all games of that size.
+
+    The boxes are kept as offsets from the first box of the pair. Whether
+    the boxes of a pair are in the map only depends on how far the first
+    box is from each side of the map, counted up to `MAX_DISTANCE`, so the
+    boxes at the same distances share one row of offsets, which is built
+    from the surrounding rows of the first of them. `rows[i]` is the row of
+    box `i`: for each box of `sub_surrounding_indexes[i]` in order, the
+    offsets of the common boxes and of the boxes around each of the pair
+    but not the other, in the order of the surrounding rows. Only the
+    positions of the boxes are kept; what the boxes show is read by each
+    comparison.
+
+    Tables are cached like `SurroundingTable`.
+    """
+    MAX_DISTANCE = 3
+    MAX_CACHED_TABLES = 8
+    TABLES = OrderedDict()
+
+    def __init__(self, map_width, map_height):
+        """
+        :attr num_position_classes: int
+            The number of distinct rows, each built once.
+        """
+        surrounding_indexes = SurroundingTable.get(
+            map_width, map_height, 1
+        ).rows
+        sub_surrounding_indexes = SurroundingTable.get(
+            map_width, map_height, 2
+        ).rows
+        max_distance = PairTable.MAX_DISTANCE
+        class_rows = {}
+        rows = []
+        for i in range(map_width * map_height):
+            y, x = divmod(i, map_width)
+            class_key = (
+                min(x, max_distance), min(map_width - 1 - x, max_distance),
+                min(y, max_distance), min(map_height - 1 - y, max_distance)
+            )
+            row = class_rows.get(class_key)
+            if row is None:
+                row = tuple(
+                    PairTable.get_pair_offsets(
+                        i, j, surrounding_indexes[i], surrounding_indexes[j]
+                    )
+                    for j in sub_surrounding_indexes[i]
+                )
+                class_rows[class_key] = row
+            rows.append(row)
+        self.rows = rows
+        self.num_position_classes = len(class_rows)
+
+    @staticmethod
+    def get(map_width, map_height):
+        key = (map_width, map_height)
+        tables = PairTable.TABLES
+        table = tables.get(key)
+        if table is None:
+            table = PairTable(map_width, map_height)
+            tables[key] = table
+            if len(tables) > PairTable.MAX_CACHED_TABLES:
+                tables.popitem(last=False)
+        else:
+            tables.move_to_end(key)
+        return table
+
+    @staticmethod
+    def get_pair_offsets(index0, index1, surrounding0, surrounding1):
+        """
+        :return: tuple[tuple[int], tuple[int], tuple[int]]
+            The offsets from `index0` of the common boxes and of the boxes
+            around one of the pair but not the other.
+        """
+        set0 = set(surrounding0)
+        set1 = set(surrounding1)
+        return (
+            tuple(i - index0 for i in surrounding0 if i in set1),
+            tuple(i - index0 for i in surrounding0 if i not in set1),
+            tuple(i - index0 for i in surrounding1 if i not in set0)
+        )
 
 
 class Core(object):
+    __slots__ = (
+        "map_width", "map_height", "num_mines", "num_boxes",
+        "num_unknown_boxes", "num_unknown_mines", "mine_indexes", "base_map",
+        "view_map", "game_status", "num_steps", "num_random_steps",
+        "previous_index", "time_used", "spiral_table", "surrounding_table",
+        "surrounding_indexes", "sub_surrounding_indexes", "board_source",
+    )
+    BOARD_BACKEND_VAR = "AUTOSWEEPER_BOARD_BACKEND"
+
     def __init__(self, map_width, map_height, num_mines):
         """
         :attr game_status: int in range(4)
@@ -33,7 +299,11 @@ class Core(object):
             2: flag
             3: guess
 
-        :attr view_map: list[int in range(14)]
+        :attr base_map: array[int in range(-1, 9)]
+            -1: mine
+            0~8: numbers
+
+        :attr view_map: bytearray[int in range(14)]
             0~8: numbers
             9: blank
             10: flag
@@ -48,8 +318,8 @@ class Core(object):
         self.num_unknown_boxes = num_boxes
         self.num_unknown_mines = num_mines
         self.mine_indexes = [-1] * num_mines
-        self.base_map = [0] * num_boxes
-        self.view_map = [9] * num_boxes
+        self.base_map = array("b", bytes(num_boxes))
+        self.view_map = bytearray(b"\x09") * num_boxes
 
         self.game_status = 0
         self.num_steps = 0
@@ -57,23 +327,25 @@ class Core(object):
         self.previous_index = 0
         self.time_used = 0.0
 
-        self.surrounding_indexes = [[]] * num_boxes
-        self.sub_surrounding_indexes = [[]] * num_boxes
-        self.init_surrounding_indexes()
+        self.spiral_table = SpiralTable.get(map_width, map_height)
+        self.surrounding_table = SurroundingTable.get(
+            map_width, map_height, 1
+        )
+        self.surrounding_indexes = self.surrounding_table.rows
+        self.sub_surrounding_indexes = SurroundingTable.get(
+            map_width, map_height, 2
+        ).rows
 
-    def init_surrounding_indexes(self):
-        for i in range(self.num_boxes):
-            self.surrounding_indexes[i] = self.get_surrounding_indexes(i)
-            self.sub_surrounding_indexes[i] = self.get_surrounding_indexes(
-                i, layer=2
-            )
+        self.board_source = Core.get_board_source(
+            map_width, map_height, num_mines
+        )
 
     def re_initialize(self):
         self.num_unknown_boxes = self.num_boxes
         self.num_unknown_mines = self.num_mines
         self.mine_indexes = [-1] * self.num_mines
-        self.base_map = [0] * self.num_boxes
-        self.view_map = [9] * self.num_boxes
+        self.base_map = array("b", bytes(self.num_boxes))
+        self.view_map = bytearray(b"\x09") * self.num_boxes
 
         self.game_status = 0
         self.num_steps = 0
@@ -83,11 +355,13 @@ class Core(object):
 
     @staticmethod
     def get_union(list0, list1):
-        return [e for e in list0 if e in list1]
+        set1 = set(list1)
+        return [e for e in list0 if e in set1]
 
     @staticmethod
     def get_difference(list0, list1):
-        return [e for e in list0 if e not in list1]
+        set1 = set(list1)
+        return [e for e in list0 if e not in set1]
 
     def coord_to_index(self, coord):
         x, y = coord
@@ -103,26 +377,7 @@ class Core(object):
         return 0 <= x < self.map_width and 0 <= y < self.map_height
 
     def spiral_trace_generator(self, center_index, *, layer=-1):
-        x0, y0 = self.index_to_coord(center_index)
-        dx = dy = 0
-        if layer == -1:
-            layer = max(
-                x0, self.map_width - x0 - 1,
-                y0, self.map_height - y0 - 1
-            )
-        while max(abs(dx), abs(dy)) <= layer:
-            next_coord = (x0 + dx, y0 + dy)
-            if self.in_map(next_coord):
-                next_index = self.coord_to_index(next_coord)
-                yield next_index
-            if dx + dy <= 0 and dx - dy >= 0:
-                dx += 1
-            elif dx + dy > 0 and dx - dy <= 0:
-                dx -= 1
-            elif dx + dy > 0 and dx - dy > 0:
-                dy += 1
-            elif dx + dy <= 0 and dx - dy < 0:
-                dy -= 1
+        return self.spiral_table.get_spiral_indexes(center_index, layer)
 
     def get_surrounding_indexes_with_self(self, index, *, layer=1):
         return list(self.spiral_trace_generator(index, layer=layer))
@@ -142,15 +397,32 @@ class Core(object):
         surrounding1 = self.surrounding_indexes[index1]
         return self.get_difference(surrounding0, surrounding1)
 
+    def get_spiral_rank(self, center_index, index):
+        """
+        The position of `index` in the sequence yielded by
+        `spiral_trace_generator(center_index)` if the map were unbounded.
+        """
+        x0, y0 = self.index_to_coord(center_index)
+        x, y = self.index_to_coord(index)
+        dx = x - x0
+        dy = y - y0
+        layer = max(abs(dx), abs(dy))
+        if layer == 0:
+            return 0
+        if dx == layer and dy > -layer:
+            position = dy + layer - 1
+        elif dy == layer:
+            position = 3 * layer - 1 - dx
+        elif dx == -layer:
+            position = 5 * layer - 1 - dy
+        else:
+            position = 7 * layer - 1 + dx
+        return (2 * layer - 1) ** 2 + position
+
     def indexes_ordered_in_spiral(self, index, index_list):
-        spiral_ordered_indexes = self.spiral_trace_generator(index)
-        result = []
-        while index_list:
-            next_index = next(spiral_ordered_indexes)
-            if next_index in index_list:
-                index_list.remove(next_index)
-                result.append(next_index)
-        return result
+        return sorted(
+            index_list, key=lambda i: self.get_spiral_rank(index, i)
+        )
 
     @abstractmethod
     def raise_init_mine_map_error(self):
@@ -170,6 +442,31 @@ class Core(object):
         except ValueError:
             self.raise_init_mine_map_error()
 
+    @staticmethod
+    def get_board_source(map_width, map_height, num_mines):
+        """
+        :return: np_autosweeper.BoardSource | None
+            A source of boards generated by NumPy if the
+            environment variable `BOARD_BACKEND_VAR` is "numpy" and NumPy
+            is installed, otherwise None.
+        """
+        board_backend = os.environ.get(Core.BOARD_BACKEND_VAR, "")
+        if board_backend.lower() != "numpy" or np_autosweeper is None:
+            return None
+        return np_autosweeper.BoardSource(map_width, map_height, num_mines)
+
+    def init_board(self, first_index):
+        if self.board_source is None:
+            self.init_mine_indexes(first_index)
+            self.init_base_map()
+            return
+        try:
+            self.mine_indexes, self.base_map = self.board_source.get_board(
+                first_index
+            )
+        except ValueError:
+            self.raise_init_mine_map_error()
+
     def init_base_map(self):
         for mine_index in self.mine_indexes:
             self.base_map[mine_index] = -1
@@ -189,21 +486,22 @@ class Core(object):
         self.num_unknown_mines -= 1
 
     def expand_zero(self, index):
-        pre_updated_zero_region = []
-        zero_region = [index]
-        while len(pre_updated_zero_region) != len(zero_region):
-            zero_region_difference = self.get_difference(
-                zero_region, pre_updated_zero_region
-            )
-            pre_updated_zero_region = zero_region.copy()
-            for i in zero_region_difference:
-                for j in self.surrounding_indexes[i]:
-                    if self.base_map[j] == 0 and j not in zero_region:
-                        zero_region.append(j)
-        expand_region = zero_region.copy()
-        for i in zero_region:
-            for j in self.surrounding_indexes[i]:
-                if self.view_map[j] == 9 and j not in expand_region:
+        base_map = self.base_map
+        view_map = self.view_map
+        surrounding_indexes = self.surrounding_indexes
+        visited = {index}
+        zero_queue = deque((index,))
+        expand_region = [index]
+        while zero_queue:
+            for j in surrounding_indexes[zero_queue.popleft()]:
+                if j in visited:
+                    continue
+                if base_map[j] == 0:
+                    visited.add(j)
+                    zero_queue.append(j)
+                    expand_region.append(j)
+                elif view_map[j] == 9:
+                    visited.add(j)
                     expand_region.append(j)
         for i in self.indexes_ordered_in_spiral(index, expand_region):
             self.explore_single_safe_box(i)
@@ -257,8 +555,7 @@ class Core(object):
         self.check_if_win()
 
     def start(self, first_index):
-        self.init_mine_indexes(first_index)
-        self.init_base_map()
+        self.init_board(first_index)
         self.game_status = 1
 
     def explode(self, indexes):
@@ -286,7 +583,7 @@ class Core(object):
 
     def check_if_win(self):
         if self.game_status == 1 \
-                and self.view_map.count(9) == self.num_unknown_mines:
+                and self.num_unknown_boxes == self.num_unknown_mines:
             self.win()
 
     @abstractmethod
@@ -300,28 +597,449 @@ class Core(object):
         self.time_used = end_time - begin_time
 
 
+class ProbabilitySolver(object):
+    """
+    Solves the unknown boxes around the frontier when pairwise inference
+    finds nothing. The frontier is split into independent components, each
+    of which is enumerated by backtracking, and the solutions are weighed
+    by how many ways the remaining mines fit in the other unknown boxes.
+    """
+    MAX_COMPONENT_SIZE = 48
+    MAX_SEARCH_NODES = 200000
+    MAX_CACHED_COMPONENTS = 4096
+
+    def __init__(self):
+        """
+        :attr component_cache: dict
+            Maps the normalized constraints of a component to its
+            solutions, or to None if it's too large to be enumerated.
+        """
+        self.component_cache = {}
+
+    @staticmethod
+    def get_constraints(game):
+        view_map = game.view_map
+        constraints = []
+        for index in sorted(game.frontier):
+            variables = tuple(
+                i for i in game.surrounding_indexes[index]
+                if view_map[i] == 9
+            )
+            num_mines = game.base_map[index] - game.flags_map[index]
+            constraints.append((variables, num_mines))
+        return constraints
+
+    @staticmethod
+    def split_components(constraints):
+        parents = {}
+
+        def find(i):
+            while parents[i] != i:
+                parents[i] = parents[parents[i]]
+                i = parents[i]
+            return i
+
+        for variables, _ in constraints:
+            for i in variables:
+                parents.setdefault(i, i)
+            root = find(variables[0])
+            for i in variables[1:]:
+                other_root = find(i)
+                if other_root != root:
+                    parents[other_root] = root
+        components = {}
+        for constraint in constraints:
+            root = find(constraint[0][0])
+            components.setdefault(root, []).append(constraint)
+        return list(components.values())
+
+    @staticmethod
+    def order_variables(constraints):
+        """
+        Orders variables in a breadth-first manner, so that constraints are
+        closed early during the backtracking.
+        """
+        neighbours = {}
+        for variables, _ in constraints:
+            for i in variables:
+                neighbours.setdefault(i, set()).update(variables)
+        first_index = min(neighbours)
+        ordered_variables = [first_index]
+        visited = {first_index}
+        variable_queue = deque(ordered_variables)
+        while variable_queue:
+            for i in sorted(neighbours[variable_queue.popleft()]):
+                if i not in visited:
+                    visited.add(i)
+                    ordered_variables.append(i)
+                    variable_queue.append(i)
+        return ordered_variables
+
+    @staticmethod
+    def enumerate_component(num_variables, constraints):
+        """
+        Variables sharing the same constraints are grouped together, so that
+        only the number of mines in each group is enumerated.
+
+        :param constraints: list[tuple[tuple[int], int]]
+            Each constraint holds variable positions and the number of
+            mines among them.
+
+        :return: dict[int, tuple[int, list[int]]] or None
+            Maps each possible number of mines to the number of solutions
+            and how many of them put a mine on each variable. None if the
+            search is too large.
+        """
+        variable_signatures = [[] for _ in range(num_variables)]
+        for constraint_index, (variables, _) in enumerate(constraints):
+            for i in variables:
+                variable_signatures[i].append(constraint_index)
+        group_positions = {}
+        for i, signature in enumerate(variable_signatures):
+            group_positions.setdefault(tuple(signature), []).append(i)
+        groups = list(group_positions.items())
+        num_groups = len(groups)
+        needs = [num_mines for _, num_mines in constraints]
+        rests = [len(variables) for variables, _ in constraints]
+        group_mines = [0] * num_groups
+        solutions = {}
+        num_nodes = 0
+
+        def record_solution(num_mines, weight):
+            num_solutions, group_mine_weights = solutions.get(
+                num_mines, (0, [0] * num_groups)
+            )
+            for group_index in range(num_groups):
+                group_mine_weights[group_index] \
+                    += weight * group_mines[group_index]
+            solutions[num_mines] = (
+                num_solutions + weight, group_mine_weights
+            )
+
+        def backtrack(group_index, num_mines, weight):
+            nonlocal num_nodes
+            num_nodes += 1
+            if num_nodes > ProbabilitySolver.MAX_SEARCH_NODES:
+                raise OverflowError
+            if group_index == num_groups:
+                record_solution(num_mines, weight)
+                return
+            signature, positions = groups[group_index]
+            group_size = len(positions)
+            for c in signature:
+                rests[c] -= group_size
+            for group_num_mines in range(group_size + 1):
+                if all(
+                    0 <= needs[c] - group_num_mines <= rests[c]
+                    for c in signature
+                ):
+                    for c in signature:
+                        needs[c] -= group_num_mines
+                    group_mines[group_index] = group_num_mines
+                    backtrack(
+                        group_index + 1, num_mines + group_num_mines,
+                        weight * math.comb(group_size, group_num_mines)
+                    )
+                    for c in signature:
+                        needs[c] += group_num_mines
+            for c in signature:
+                rests[c] += group_size
+
+        try:
+            backtrack(0, 0, 1)
+        except OverflowError:
+            return None
+        for num_mines, (num_solutions, group_mine_weights) in \
+                solutions.items():
+            mine_counts = [0] * num_variables
+            for (_, positions), group_mine_weight in zip(
+                groups, group_mine_weights
+            ):
+                for i in positions:
+                    mine_counts[i] = group_mine_weight // len(positions)
+            solutions[num_mines] = (num_solutions, mine_counts)
+        return solutions
+
+    def solve_component(self, constraints):
+        """
+        :return: tuple[list[int], dict] or None
+            The variables of the component and its solutions.
+        """
+        variables = ProbabilitySolver.order_variables(constraints)
+        if len(variables) > ProbabilitySolver.MAX_COMPONENT_SIZE:
+            return None
+        positions = {i: position for position, i in enumerate(variables)}
+        normalized_constraints = tuple(sorted(
+            (tuple(sorted(positions[i] for i in c_variables)), num_mines)
+            for c_variables, num_mines in constraints
+        ))
+        try:
+            solutions = self.component_cache[normalized_constraints]
+        except KeyError:
+            if len(self.component_cache) \
+                    >= ProbabilitySolver.MAX_CACHED_COMPONENTS:
+                self.component_cache.clear()
+            solutions = ProbabilitySolver.enumerate_component(
+                len(variables), normalized_constraints
+            )
+            self.component_cache[normalized_constraints] = solutions
+        if solutions is None:
+            return None
+        return variables, solutions
+
+    @staticmethod
+    def convolve(distribution0, distribution1):
+        result = {}
+        for num_mines0, num_solutions0 in distribution0.items():
+            for num_mines1, num_solutions1 in distribution1.items():
+                num_mines = num_mines0 + num_mines1
+                result[num_mines] = result.get(num_mines, 0) \
+                    + num_solutions0 * num_solutions1
+        return result
+
+    def solve(self, game):
+        """
+        :return: tuple[list[int], list[int], int]
+            Indexes of certainly safe boxes, indexes of certain mines and
+            the index of the box least likely to be a mine, which is -1 if
+            some component couldn't be solved.
+        """
+        solved_components = []
+        all_solved = True
+        for constraints in ProbabilitySolver.split_components(
+            ProbabilitySolver.get_constraints(game)
+        ):
+            solved_component = self.solve_component(constraints)
+            if solved_component is None:
+                all_solved = False
+            else:
+                solved_components.append(solved_component)
+        if not all_solved:
+            return ProbabilitySolver.get_local_deductions(solved_components)
+        return self.get_global_solution(game, solved_components)
+
+    @staticmethod
+    def get_local_deductions(solved_components):
+        safe_indexes = []
+        mine_indexes = []
+        for variables, solutions in solved_components:
+            num_solutions_sum = sum(
+                num_solutions for num_solutions, _ in solutions.values()
+            )
+            for position, i in enumerate(variables):
+                mine_count = sum(
+                    mine_counts[position] for _, mine_counts
+                    in solutions.values()
+                )
+                if mine_count == 0:
+                    safe_indexes.append(i)
+                elif mine_count == num_solutions_sum:
+                    mine_indexes.append(i)
+        return safe_indexes, mine_indexes, -1
+
+    def get_global_solution(self, game, solved_components):
+        num_mines = game.num_unknown_mines
+        frontier_variables = set()
+        for variables, _ in solved_components:
+            frontier_variables.update(variables)
+        outside_indexes = [
+            i for i in range(game.num_boxes)
+            if game.view_map[i] == 9 and i not in frontier_variables
+        ]
+        num_outside = len(outside_indexes)
+
+        def get_num_outside_ways(num_frontier_mines):
+            num_outside_mines = num_mines - num_frontier_mines
+            if num_outside_mines < 0 or num_outside_mines > num_outside:
+                return 0
+            return math.comb(num_outside, num_outside_mines)
+
+        distributions = [
+            {k: pair[0] for k, pair in solutions.items()}
+            for _, solutions in solved_components
+        ]
+        safe_indexes = []
+        mine_indexes = []
+        best_index = -1
+        best_probability = 2.0
+        total_weight = 0
+        for component_index, (variables, solutions) in enumerate(
+            solved_components
+        ):
+            others_distribution = {0: 1}
+            for other_index, distribution in enumerate(distributions):
+                if other_index != component_index:
+                    others_distribution = ProbabilitySolver.convolve(
+                        others_distribution, distribution
+                    )
+            weights = {}
+            for k in solutions:
+                weights[k] = sum(
+                    num_solutions * get_num_outside_ways(k + t)
+                    for t, num_solutions in others_distribution.items()
+                )
+            total_weight = sum(
+                solutions[k][0] * weight for k, weight in weights.items()
+            )
+            for position, i in enumerate(variables):
+                mine_weight = sum(
+                    solutions[k][1][position] * weight
+                    for k, weight in weights.items()
+                )
+                if mine_weight == 0:
+                    safe_indexes.append(i)
+                elif mine_weight == total_weight:
+                    mine_indexes.append(i)
+                else:
+                    probability = mine_weight / total_weight
+                    if probability < best_probability:
+                        best_index = i
+                        best_probability = probability
+        if num_outside:
+            total_distribution = {0: 1}
+            for distribution in distributions:
+                total_distribution = ProbabilitySolver.convolve(
+                    total_distribution, distribution
+                )
+            total_weight = 0
+            outside_mine_weight = 0
+            for t, num_solutions in total_distribution.items():
+                weight = num_solutions * get_num_outside_ways(t)
+                total_weight += weight
+                outside_mine_weight += weight * (num_mines - t)
+            if outside_mine_weight == 0:
+                safe_indexes.extend(outside_indexes)
+            elif outside_mine_weight == total_weight * num_outside:
+                mine_indexes.extend(outside_indexes)
+            elif outside_mine_weight / (total_weight * num_outside) \
+                    < best_probability:
+                best_index = random.choice(outside_indexes)
+        return safe_indexes, mine_indexes, best_index
+
+
+class StepQueue(object):
+    """
+    Steps waiting to be made, first in, first out. A step which is already
+    waiting is not queued again. Steps on boxes which are no longer blank
+    are skipped lazily by `skip_stale_steps`.
+    """
+    __slots__ = ("steps", "queued_modes")
+
+    def __init__(self, num_boxes):
+        """
+        :attr queued_modes: bytearray
+            Bit `step_mode` of each box is set while the step is waiting.
+        """
+        self.steps = deque()
+        self.queued_modes = bytearray(num_boxes)
+
+    def __len__(self):
+        return len(self.steps)
+
+    def push(self, index, step_mode):
+        mode_bit = 1 << step_mode
+        queued_modes = self.queued_modes
+        if not queued_modes[index] & mode_bit:
+            queued_modes[index] |= mode_bit
+            self.steps.append((index, step_mode))
+
+    def pop(self):
+        step = self.steps.popleft()
+        self.queued_modes[step[0]] ^= 1 << step[1]
+        return step
+
+    def skip_stale_steps(self, view_map):
+        steps = self.steps
+        while steps and view_map[steps[0][0]] != 9:
+            self.pop()
+
+    def clear(self):
+        queued_modes = self.queued_modes
+        for index, _ in self.steps:
+            queued_modes[index] = 0
+        self.steps.clear()
+
+
 class Logic(Core):
-    def __init__(self, map_width, map_height, num_mines):
+    __slots__ = (
+        "unknown_map", "flags_map", "cached_steps", "frontier",
+        "dirty_indexes", "changed_indexes", "solver", "pair_rows",
+    )
+    DIRTY_LAYER = 3
+
+    def __init__(self, map_width, map_height, num_mines, use_solver=False):
+        """
+        :param use_solver: bool
+            Whether to consult a `ProbabilitySolver` instead of guessing
+            uniformly when pairwise inference finds nothing.
+
+        :attr frontier: set[int]
+            Indexes of revealed boxes which still have unknown boxes around.
+
+        :attr dirty_indexes: set[int]
+            Indexes of boxes whose neighbourhood has changed since they were
+            inferred last time. The inference of a box only depends on boxes
+            within `DIRTY_LAYER` layers around it, so the other boxes will
+            certainly infer nothing new.
+
+        :attr changed_indexes: list[int]
+            Indexes of boxes explored or flagged since `dirty_indexes` was
+            updated last time.
+        """
         Core.__init__(self, map_width, map_height, num_mines)
-        self.unknown_map = [0] * self.num_boxes
-        self.flags_map = [0] * self.num_boxes
-        self.cached_steps = []
+        self.unknown_map = None
+        self.flags_map = bytearray(self.num_boxes)
+        self.cached_steps = StepQueue(self.num_boxes)
+        self.frontier = set()
+        self.dirty_indexes = set()
+        self.changed_indexes = []
+        if use_solver:
+            self.solver = ProbabilitySolver()
+        else:
+            self.solver = None
+        self.pair_rows = PairTable.get(map_width, map_height).rows
         self.init_unknown_map()
 
     def init_unknown_map(self):
-        for i in range(self.num_boxes):
-            self.unknown_map[i] = len(self.surrounding_indexes[i])
+        self.unknown_map = bytearray(self.surrounding_table.counts)
 
     def re_initialize(self):
         Core.re_initialize(self)
-        self.unknown_map = [0] * self.num_boxes
-        self.flags_map = [0] * self.num_boxes
-        self.cached_steps = []
+        self.flags_map = bytearray(self.num_boxes)
+        self.cached_steps.clear()
+        self.frontier = set()
+        self.dirty_indexes = set()
+        self.changed_indexes = []
         self.init_unknown_map()
 
     def modify_surrounding_unknown_map(self, index):
+        unknown_map = self.unknown_map
         for i in self.surrounding_indexes[index]:
-            self.unknown_map[i] -= 1
+            unknown_map[i] -= 1
+            if unknown_map[i] == 0:
+                self.frontier.discard(i)
+
+    def update_dirty_indexes(self):
+        """
+        Marks boxes within `DIRTY_LAYER` layers around each changed box as
+        dirty. The region may wrap around the sides of the map, which only
+        marks a few more boxes than necessary.
+        """
+        if not self.changed_indexes:
+            return
+        layer = Logic.DIRTY_LAYER
+        map_width = self.map_width
+        changed_indexes = set(self.changed_indexes)
+        self.changed_indexes = []
+        line_region = changed_indexes.copy()
+        for dx in range(1, layer + 1):
+            line_region.update(map(dx.__add__, changed_indexes))
+            line_region.update(map(dx.__rsub__, changed_indexes))
+        dirty_indexes = self.dirty_indexes
+        dirty_indexes.update(line_region)
+        for dy in range(map_width, (layer + 1) * map_width, map_width):
+            dirty_indexes.update(map(dy.__add__, line_region))
+            dirty_indexes.update(map(dy.__rsub__, line_region))
 
     def modify_surrounding_flags_map(self, index):
         for i in self.surrounding_indexes[index]:
@@ -330,45 +1048,56 @@ class Logic(Core):
     def explore_single_safe_box(self, index):
         Core.explore_single_safe_box(self, index)
         self.modify_surrounding_unknown_map(index)
+        if self.unknown_map[index] != 0:
+            self.frontier.add(index)
+        self.changed_indexes.append(index)
 
     def flag_blank_box(self, index):
         Core.flag_blank_box(self, index)
         self.modify_surrounding_unknown_map(index)
         self.modify_surrounding_flags_map(index)
+        self.changed_indexes.append(index)
 
     def is_valuable(self, index):
         return self.unknown_map[index] != 0 and self.view_map[index] < 9
 
-    def two_indexes_logic(self, index0, index1):
-        num_common_unknown = [
-            self.view_map[i] for i in self.get_common_indexes(index0, index1)
-        ].count(9)
-        suburb_indexes0 = self.get_suburb_indexes(index0, index1)
-        suburb_indexes1 = self.get_suburb_indexes(index1, index0)
+    def two_indexes_logic(self, index0, index1, pair_offsets):
+        """
+        :param pair_offsets: tuple[tuple[int], tuple[int], tuple[int]]
+            See `PairTable`.
+        """
+        common_offsets, suburb_offsets0, suburb_offsets1 = pair_offsets
+        view_map = self.view_map
+        num_common_unknown = 0
+        for offset in common_offsets:
+            if view_map[index0 + offset] == 9:
+                num_common_unknown += 1
         num_unknown0 = self.unknown_map[index0] - num_common_unknown
         if self.base_map[index0] - self.base_map[index1] == num_unknown0 \
                 + self.flags_map[index0] - self.flags_map[index1]:
-            for i in suburb_indexes0:
-                if self.view_map[i] == 9:
-                    self.cached_steps.append((i, 2))
-            for i in suburb_indexes1:
-                if self.view_map[i] == 9:
-                    self.cached_steps.append((i, 0))
+            for offset in suburb_offsets0:
+                if view_map[index0 + offset] == 9:
+                    self.cached_steps.push(index0 + offset, 2)
+            for offset in suburb_offsets1:
+                if view_map[index0 + offset] == 9:
+                    self.cached_steps.push(index0 + offset, 0)
 
     def infer_single_box(self, index):
         if not self.is_valuable(index):
             return
         if self.flags_map[index] == self.base_map[index]:
-            self.cached_steps.append((index, 1))
+            self.cached_steps.push(index, 1)
         if self.unknown_map[index] + self.flags_map[index] \
                 == self.base_map[index]:
             for i in self.surrounding_indexes[index]:
                 if self.view_map[i] == 9:
-                    self.cached_steps.append((i, 2))
+                    self.cached_steps.push(i, 2)
         exp_indexes = self.sub_surrounding_indexes[index]
-        for exp_index in exp_indexes:
+        for exp_index, pair_offsets in zip(
+            exp_indexes, self.pair_rows[index]
+        ):
             if self.is_valuable(exp_index):
-                self.two_indexes_logic(index, exp_index)
+                self.two_indexes_logic(index, exp_index, pair_offsets)
 
     def make_random_choice(self):
         blank_indexes = [
@@ -380,24 +1109,44 @@ class Logic(Core):
         return random_step
 
     def make_choice(self):
-        self.cached_steps = list(filter(
-            lambda cached_step: self.view_map[cached_step[0]] == 9,
-            self.cached_steps
-        ))
+        self.cached_steps.skip_stale_steps(self.view_map)
         if self.cached_steps:
-            return self.cached_steps.pop(0)
-        inferred_box_indexes = self.spiral_trace_generator(
-            self.previous_index
-        )
-        for _ in range(self.num_boxes):
-            index = next(inferred_box_indexes)
-            self.infer_single_box(index)
-            if self.cached_steps:
-                self.previous_index = index
-                return self.cached_steps.pop(0)
+            return self.cached_steps.pop()
+        self.update_dirty_indexes()
+        dirty_indexes = self.dirty_indexes
+        dirty_indexes &= self.frontier
+        if dirty_indexes:
+            for index in self.spiral_trace_generator(self.previous_index):
+                if index not in dirty_indexes:
+                    continue
+                dirty_indexes.remove(index)
+                self.infer_single_box(index)
+                if self.cached_steps:
+                    self.previous_index = index
+                    return self.cached_steps.pop()
+                if not dirty_indexes:
+                    break
+        if self.solver is not None:
+            return self.make_solver_choice()
         random_step = self.make_random_choice()
         return random_step
 
+    def make_solver_choice(self):
+        safe_indexes, mine_indexes, guess_index = self.solver.solve(self)
+        for i in safe_indexes:
+            self.cached_steps.push(i, 0)
+        for i in mine_indexes:
+            self.cached_steps.push(i, 2)
+        if self.cached_steps:
+            next_step = self.cached_steps.pop()
+            self.previous_index = next_step[0]
+            return next_step
+        if guess_index == -1:
+            return self.make_random_choice()
+        self.previous_index = guess_index
+        guess_step = (guess_index, 3)
+        return guess_step
+
     def make_first_choice_index(self):
         first_index = self.coord_to_index(
             (self.map_width // 2, self.map_height // 2)
@@ -429,6 +1178,7 @@ class GameRecorder(object):
         self.mine_indexes = game.mine_indexes
         self.step_index_list = game.step_index_list
         self.step_mode_list = game.step_mode_list
+        self.game_seed = game.game_seed
 
     def record(self, game_file_index, folder_path):
         json_dict = {
@@ -447,14 +1197,306 @@ class GameRecorder(object):
             "step_indexes": " ".join(map(str, self.step_index_list)),
             "step_mode_nums": "".join(map(str, self.step_mode_list)),
         }
+        if self.game_seed is not None:
+            json_dict["game_seed"] = str(self.game_seed)
         file_name = str(game_file_index) + ".json"
         file_path = os.path.join(folder_path, file_name)
         assert not os.path.exists(file_path)
         with open(file_path, "w") as output_file:
             json.dump(json_dict, output_file, indent=0)
 
+    def encode(self):
+        """
+        Encodes the game in the binary record format, see `RecordSegment`.
+        """
+        buffer = bytearray()
+        for value in (
+            self.map_width, self.map_height, self.num_mines,
+            self.game_status, self.progress, self.num_flags,
+            self.num_steps, self.num_guesses
+        ):
+            BinaryTools.put_varint(buffer, value)
+        buffer += struct.pack("<d", self.time_used)
+        previous_index = 0
+        for i in sorted(self.mine_indexes):
+            BinaryTools.put_varint(buffer, i - previous_index)
+            previous_index = i
+        BinaryTools.put_varint(buffer, len(self.step_index_list))
+        for i in self.step_index_list:
+            BinaryTools.put_varint(buffer, i)
+        buffer += BinaryTools.pack_2bit(self.step_mode_list)
+        if self.game_seed is not None:
+            BinaryTools.put_varint(buffer, self.game_seed)
+        return bytes(buffer)
+
+
+class RecordSegment(object):
+    """
+    An append-only file holding many binary game records of the same
+    specification, together with an index file of their offsets. The id of
+    a game is its position in the index.
+
+    The segment file begins with `MAGIC`, followed by records, each of
+    which is a varint length and then:
+        varints: map_width, map_height, num_mines, game_status, progress,
+            num_flags, num_steps, num_guesses
+        float64: time_used
+        varints: sorted mine indexes, each stored as the difference from
+            the previous one
+        varint: number of recorded steps n
+        varints: n step indexes
+        bytes: n step modes, 2 bits each
+        varint: game seed, absent if the game was not seeded
+
+    The index file holds the offset of each record as a little-endian
+    uint64.
+    """
+    MAGIC = b"ASWSEG01"
+    SEGMENT_SUFFIX = ".seg"
+    INDEX_SUFFIX = ".idx"
+    OFFSET_SIZE = 8
+
+    def __init__(self, path_prefix):
+        self.segment_path = path_prefix + RecordSegment.SEGMENT_SUFFIX
+        self.index_path = path_prefix + RecordSegment.INDEX_SUFFIX
+
+    def exists(self):
+        return os.path.exists(self.segment_path)
+
+    def get_num_records(self):
+        if not os.path.exists(self.index_path):
+            return 0
+        return os.path.getsize(self.index_path) // RecordSegment.OFFSET_SIZE
+
+    def read(self, game_id):
+        with open(self.index_path, "rb") as index_file:
+            index_file.seek(game_id * RecordSegment.OFFSET_SIZE)
+            offset, = struct.unpack("<Q", index_file.read(
+                RecordSegment.OFFSET_SIZE
+            ))
+        with open(self.segment_path, "rb") as segment_file:
+            assert segment_file.read(len(RecordSegment.MAGIC)) \
+                == RecordSegment.MAGIC
+            segment_file.seek(offset)
+            head = segment_file.read(10)
+            length, position = BinaryTools.get_varint(head, 0)
+            segment_file.seek(offset + position)
+            return segment_file.read(length)
+
+    def iter_records(self):
+        """
+        Yields the id and the binary record of each game in order, reading
+        the index once and the segment through a memory map.
+        """
+        with open(self.index_path, "rb") as index_file:
+            offsets = [
+                offset for offset, in struct.iter_unpack(
+                    "<Q", index_file.read()
+                )
+            ]
+        with open(self.segment_path, "rb") as segment_file:
+            with mmap.mmap(
+                segment_file.fileno(), 0, access=mmap.ACCESS_READ
+            ) as segment_data:
+                for game_id, offset in enumerate(offsets):
+                    length, position = BinaryTools.get_varint(
+                        segment_data, offset
+                    )
+                    yield game_id, segment_data[position:position + length]
+
+    @staticmethod
+    def decode(record):
+        """
+        :return: dict
+            The same items as a json record, with ints instead of strings.
+        """
+        values = []
+        position = 0
+        for _ in range(8):
+            value, position = BinaryTools.get_varint(record, position)
+            values.append(value)
+        map_width, map_height, num_mines, game_status, progress, \
+            num_flags, num_steps, num_guesses = values
+        time_used, = struct.unpack_from("<d", record, position)
+        position += 8
+        mine_indexes = []
+        previous_index = 0
+        for _ in range(num_mines):
+            delta, position = BinaryTools.get_varint(record, position)
+            previous_index += delta
+            mine_indexes.append(previous_index)
+        num_recorded_steps, position = BinaryTools.get_varint(
+            record, position
+        )
+        step_indexes = []
+        for _ in range(num_recorded_steps):
+            index, position = BinaryTools.get_varint(record, position)
+            step_indexes.append(index)
+        step_mode_nums, position = BinaryTools.unpack_2bit(
+            record, position, num_recorded_steps
+        )
+        if position < len(record):
+            game_seed, position = BinaryTools.get_varint(record, position)
+        else:
+            game_seed = None
+        return {
+            "map_width": map_width,
+            "map_height": map_height,
+            "num_mines": num_mines,
+            "game_result": "won" if game_status == 2 else "lost",
+            "progress": progress,
+            "num_flags": num_flags,
+            "num_steps": num_steps,
+            "num_guesses": num_guesses,
+            "time_used": time_used,
+            "mine_indexes": mine_indexes,
+            "step_indexes": step_indexes,
+            "step_mode_nums": step_mode_nums,
+            "game_seed": game_seed,
+        }
+
+
+class RecordArchive(RecordSegment):
+    """
+    Appends binary records to a `RecordSegment` through files kept open, so
+    that recording a game costs one buffered append. Game ids are counted
+    from the size of the index when it's opened, instead of scanning any
+    folder.
+
+    With `with_summary`, a summary table is kept next to the segment, whose
+    fixed-size rows hold the game status, progress, number of steps and
+    number of guesses of each game.
+    """
+    SUMMARY_SUFFIX = ".sum"
+    SUMMARY_ROW = struct.Struct("<BIII")
+    BUFFER_SIZE = 1 << 20
+
+    def __init__(self, path_prefix, with_summary):
+        RecordSegment.__init__(self, path_prefix)
+        self.summary_path = path_prefix + RecordArchive.SUMMARY_SUFFIX
+        self.with_summary = with_summary
+        self.segment_file = None
+        self.index_file = None
+        self.summary_file = None
+        self.segment_size = 0
+        self.num_records = 0
+
+    def open(self):
+        buffer_size = RecordArchive.BUFFER_SIZE
+        self.num_records = self.get_num_records()
+        self.segment_file = open(self.segment_path, "ab", buffer_size)
+        self.segment_size = self.segment_file.seek(0, os.SEEK_END)
+        if self.segment_size == 0:
+            self.segment_file.write(RecordSegment.MAGIC)
+            self.segment_size = len(RecordSegment.MAGIC)
+        self.index_file = open(self.index_path, "ab", buffer_size)
+        if self.with_summary:
+            row_size = RecordArchive.SUMMARY_ROW.size
+            self.summary_file = open(self.summary_path, "ab", buffer_size)
+            num_rows = self.summary_file.seek(0, os.SEEK_END) // row_size
+            if num_rows < self.num_records:
+                self.summary_file.write(
+                    bytes((self.num_records - num_rows) * row_size)
+                )
+
+    def add(self, game_recorder):
+        """
+        :return: int
+            The id of the added game.
+        """
+        record = game_recorder.encode()
+        buffer = bytearray()
+        BinaryTools.put_varint(buffer, len(record))
+        buffer += record
+        self.index_file.write(struct.pack("<Q", self.segment_size))
+        self.segment_file.write(buffer)
+        self.segment_size += len(buffer)
+        if self.summary_file is not None:
+            self.summary_file.write(RecordArchive.SUMMARY_ROW.pack(
+                game_recorder.game_status, game_recorder.progress,
+                game_recorder.num_steps, game_recorder.num_guesses
+            ))
+        game_id = self.num_records
+        self.num_records += 1
+        return game_id
+
+    def close(self):
+        for output_file in (
+            self.segment_file, self.index_file, self.summary_file
+        ):
+            if output_file is not None:
+                output_file.close()
+        self.segment_file = None
+        self.index_file = None
+        self.summary_file = None
+
+    def read_summaries(self):
+        """
+        :return: list[tuple[int, int, int, int]]
+            The row of each game. Games recorded without the summary table
+            have rows of zeros.
+        """
+        if not os.path.exists(self.summary_path):
+            return []
+        with open(self.summary_path, "rb") as summary_file:
+            return list(RecordArchive.SUMMARY_ROW.iter_unpack(
+                summary_file.read()
+            ))
+
+
+class RecordWriter(object):
+    """
+    Writes game records on a background thread, so that games keep being
+    played while the records of finished ones are written. At most
+    `MAX_PENDING_RECORDS` records may wait to be written, after which `put`
+    blocks until the writer catches up.
+    """
+    MAX_PENDING_RECORDS = 1024
+
+    def __init__(self, write_record):
+        """
+        :param write_record: Callable[[GameRecorder], None]
+            Called on the writer thread for each record, in order.
+        """
+        self.write_record = write_record
+        self.pending_records = queue.Queue(RecordWriter.MAX_PENDING_RECORDS)
+        self.error = None
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def run(self):
+        while True:
+            game_recorder = self.pending_records.get()
+            if game_recorder is None:
+                break
+            if self.error is None:
+                try:
+                    self.write_record(game_recorder)
+                except Exception as error:
+                    self.error = error
+
+    def put(self, game_recorder):
+        self.pending_records.put(game_recorder)
+
+    def close(self):
+        """
+        Waits for all pending records to be written.
+        """
+        self.pending_records.put(None)
+        self.thread.join()
+        if self.error is not None:
+            raise self.error
+
 
 class Interface(Logic):
+    __slots__ = (
+        "display_mode", "record_mode", "sleep_per_step_if_displayed",
+        "display_map", "step_index_list", "step_mode_list", "game_seed",
+        "game_file_index",
+        "record_format", "record_archive", "record_writer",
+        "status_info_width", "cell_width", "console_cols", "console_lines",
+        "folder_path",
+    )
     BOX_CHAR_LIST = (
         ("\u3000", 0x00),  # black       "　"
         ("\uff11", 0x03),  # dark blue   "１"
@@ -489,9 +1531,11 @@ class Interface(Logic):
     FINISH_MSG = "Finished!"
     INIT_FAILURE_MSG = "Fatal: Too many mines!"
     FOLDER_NAME = "game_savings"
+    RECORD_FORMAT_VAR = "AUTOSWEEPER_RECORD_FORMAT"
 
     def __init__(self, map_width, map_height, num_mines,
-            display_mode, record_mode, sleep_per_step_if_displayed):
+            display_mode, record_mode, sleep_per_step_if_displayed,
+            use_solver=False):
         """
         :param display_mode: int in range(4)
             0: Display the map and basic information after each step
@@ -505,8 +1549,11 @@ class Interface(Logic):
             2: record if won
             3: record if lost
             -n: record n best-played games
+
+        :param use_solver: bool
+            See `Logic`.
         """
-        Logic.__init__(self, map_width, map_height, num_mines)
+        Logic.__init__(self, map_width, map_height, num_mines, use_solver)
         self.display_mode = display_mode
         self.record_mode = record_mode
         self.sleep_per_step_if_displayed = sleep_per_step_if_displayed
@@ -514,7 +1561,11 @@ class Interface(Logic):
 
         self.step_index_list = []
         self.step_mode_list = []
+        self.game_seed = None
         self.game_file_index = -1
+        self.record_format = Interface.get_record_format()
+        self.record_archive = None
+        self.record_writer = None
 
         self.status_info_width = 0
         self.cell_width = 0
@@ -552,6 +1603,22 @@ class Interface(Logic):
         self.console_cols = cols
         self.console_lines = lines
 
+    @staticmethod
+    def get_record_format():
+        """
+        :return: str
+            "json": one json file per game in the folder of the
+                specification
+            "binary": binary records appended to the `RecordArchive` of the
+                specification
+            "archive": the same as "binary", with a summary table
+        """
+        record_format = os.environ.get(Interface.RECORD_FORMAT_VAR, "")
+        record_format = record_format.lower()
+        if record_format in ("binary", "archive"):
+            return record_format
+        return "json"
+
     def init_folder_path(self):
         main_folder = Interface.FOLDER_NAME
         if not os.path.exists(main_folder):
@@ -565,6 +1632,15 @@ class Interface(Logic):
         Logic.re_initialize(self)
         self.step_index_list = []
         self.step_mode_list = []
+        self.game_seed = None
+
+    def seed_game(self, game_seed):
+        """
+        Seeds `random` for the next game and keeps the seed in its record,
+        so that the game can be played again from the seed.
+        """
+        self.game_seed = game_seed
+        random.seed(game_seed)
 
     def exploit_step(self, step):
         if self.record_mode != 0:
@@ -575,6 +1651,7 @@ class Interface(Logic):
         if self.display_map:
             if self.display_mode == 0:
                 self.print_game_base_info_values()
+            CONSOLE.flush()
             if self.game_status == 1:
                 time.sleep(self.sleep_per_step_if_displayed)
 
@@ -589,6 +1666,7 @@ class Interface(Logic):
         self.print_game_status()
         if self.display_mode != 0:
             self.print_game_base_info_values()
+        CONSOLE.flush()
 
     def explode(self, indexes):
         Logic.explode(self, indexes)
@@ -610,13 +1688,14 @@ class Interface(Logic):
             return
         box_char_tuple = Interface.BOX_CHAR_LIST[self.view_map[index]]
         console_coord = self.calculate_console_coord(index)
-        CONSOLE.print_at(
-            console_coord, box_char_tuple[0], color=box_char_tuple[1]
+        CONSOLE.draw_at(
+            console_coord, box_char_tuple[0], color=box_char_tuple[1],
+            cell_width=2
         )
 
     def print_game_status(self):
         status_tuple = Interface.GAME_STATUS_LIST[self.game_status]
-        CONSOLE.print_in_line(
+        CONSOLE.draw_in_line(
             1, StringTools.set_space(self.status_info_width, -1).format(
                 status_tuple[0]
             ),
@@ -649,10 +1728,10 @@ class Interface(Logic):
 
     def print_game_base_info_values(self):
         game_base_info_values = self.get_game_base_info_values()
-        CONSOLE.print_list_as_table_row(
-            3, game_base_info_values, self.cell_width, 1,
+        CONSOLE.draw_in_line(3, CONSOLE.get_table_row_str(
+            game_base_info_values, self.cell_width, 1,
             Interface.CELL_SEPARATOR
-        )
+        ))
 
     def init_display_frame(self):
         parts = Interface.FRAME_PARTS
@@ -670,8 +1749,9 @@ class Interface(Logic):
         blank_tuple = Interface.BOX_CHAR_LIST[9]
         view_map_line_str = blank_tuple[0] * self.map_width
         for line_index in range(5, self.map_height + 5):
-            CONSOLE.print_at(
-                (2, line_index), view_map_line_str, color=blank_tuple[1]
+            CONSOLE.draw_at(
+                (2, line_index), view_map_line_str, color=blank_tuple[1],
+                cell_width=2
             )
 
     def get_num_of_files(self):
@@ -684,7 +1764,35 @@ class Interface(Logic):
     def get_recorder(self):
         return GameRecorder(self)
 
+    def get_record_archive(self):
+        if self.record_archive is None:
+            self.record_archive = RecordArchive(
+                self.folder_path, self.record_format == "archive"
+            )
+            self.record_archive.open()
+        return self.record_archive
+
+    def close_record_archive(self):
+        if self.record_archive is not None:
+            self.record_archive.close()
+            self.record_archive = None
+
+    def close_record_writer(self):
+        if self.record_writer is not None:
+            self.record_writer.close()
+            self.record_writer = None
+
     def record_game_using_recorder(self, game_recorder):
+        if self.record_writer is None:
+            self.record_writer = RecordWriter(self.write_record)
+        self.record_writer.put(game_recorder)
+
+    def write_record(self, game_recorder):
+        if self.record_format != "json":
+            self.game_file_index = self.get_record_archive().add(
+                game_recorder
+            )
+            return
         if self.game_file_index == -1:
             self.game_file_index = self.get_num_of_files()
         else:
@@ -720,8 +1828,9 @@ class Interface(Logic):
             self.display_new_view_map()
         Logic.run(self)
 
-    @staticmethod
-    def terminate_process():
+    def terminate_process(self):
+        self.close_record_writer()
+        self.close_record_archive()
         CONSOLE.move_cursor_to_end_line(1)
         CONSOLE.print_with_color(Interface.FINISH_MSG, color=0x0a)
         CONSOLE.ready_to_quit()
@@ -735,31 +1844,134 @@ class Interface(Logic):
 class AutoGame(Interface):
     def run_whole_process(self):
         self.begin_process()
+        self.seed_game(random.getrandbits(64))
         self.run()
         if self.record_mode != 0:
             self.judge_to_record_game_data(self)
         self.terminate_process()
 
 
+class BitGame(bit_autosweeper.BitLogic):
+    """
+    A `BitLogic` game which can be seeded and recorded like an `Interface`
+    game, played by `GameStatistics` in place of `Interface` when the
+    environment variable `GameStatistics.ENGINE_VAR` is "bitboard".
+    """
+    def __init__(self, map_width, map_height, num_mines, record_mode):
+        bit_autosweeper.BitLogic.__init__(
+            self, map_width, map_height, num_mines, record_mode != 0
+        )
+        self.game_seed = None
+
+    def re_initialize(self):
+        bit_autosweeper.BitLogic.re_initialize(self)
+        self.game_seed = None
+
+    def seed_game(self, game_seed):
+        self.game_seed = game_seed
+        random.seed(game_seed)
+
+    def get_recorder(self):
+        return GameRecorder(self)
+
+    def raise_init_mine_map_error(self):
+        CONSOLE.move_cursor_to_end_line(1)
+        CONSOLE.print_with_color(Interface.INIT_FAILURE_MSG, color=0x0c)
+        CONSOLE.ready_to_quit()
+
+
+class StatisticsDisplay(object):
+    """
+    Redraws the statistics panel on a background thread every
+    `REFRESH_INTERVAL` seconds if more games have finished, so that games
+    only add to the statistics data, and the cost of displaying doesn't
+    depend on how fast they finish. The panel is drawn for the last time
+    when the display is closed.
+    """
+    REFRESH_INTERVAL = 0.1
+
+    def __init__(self, statistics):
+        """
+        :param statistics: GameStatistics
+        """
+        self.statistics = statistics
+        self.num_shown_games = statistics.num_finished_games
+        self.closing = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def run(self):
+        while not self.closing.wait(StatisticsDisplay.REFRESH_INTERVAL):
+            num_finished_games = self.statistics.num_finished_games
+            if num_finished_games != self.num_shown_games:
+                self.num_shown_games = num_finished_games
+                self.statistics.print_statistics_values()
+
+    def close(self):
+        self.closing.set()
+        self.thread.join()
+        self.statistics.print_statistics_values()
+
+
 class GameStatistics(Interface):
     STATISTICS_TITLE = "- Statistics -"
     STATISTICS_KEYS = (
         "Specification", "Main progress", "Games won", "Without guesses",
         "Avg. progress", "Avg. flags", "Avg. steps", "Avg. steps (won)",
-        "Avg. guesses", "Avg. time", "Avg. time (won)", "Total avg. time"
+        "Avg. guesses", "Avg. time", "Avg. time (won)", "Total avg. time",
+        "Master seed"
+    )
+    PROFILE_KEYS = (
+        "Start time", "Expand time", "Inference time", "Guess time",
+        "Other time", "Record time", "Inferences", "Pair checks",
+        "Queue pushes"
     )
     KEY_VAL_SEPARATOR_WIDTH = 1
+    ENGINE_VAR = "AUTOSWEEPER_ENGINE"
+
+    STATISTICS_SUM_ATTRS = (
+        "num_games_won", "num_games_won_without_guesses", "progress_sum",
+        "num_flags_sum", "num_steps_sum", "num_won_games_steps_sum",
+        "num_random_steps_sum", "time_sum", "won_games_time_sum"
+    )
 
     def __init__(self, map_width, map_height, num_mines, num_games,
-            display_mode, record_mode, update_freq,
-            sleep_per_step_if_displayed, sleep_per_game_if_displayed):
+            display_mode, record_mode, chunk_size,
+            sleep_per_step_if_displayed, sleep_per_game_if_displayed,
+            num_processes=1, use_solver=False, master_seed=None):
+        """
+        :param chunk_size: int > 0
+            The number of games given to a worker process at a time, see
+            `get_chunk_size`.
+
+        :param num_processes: int > 0
+            Games are sharded into chunks and played by a pool of worker
+            processes if it's larger than 1. Only available when
+            display_mode is 3.
+
+        :param master_seed: int >= 0 or None
+            The seed of each game is derived from it and the serial number
+            of the game, see `SeedTools`, so that a run can be repeated with
+            any number of processes. A random one is used if None.
+        """
         Interface.__init__(
             self, map_width, map_height, num_mines,
-            display_mode, record_mode, sleep_per_step_if_displayed
+            display_mode, record_mode, sleep_per_step_if_displayed,
+            use_solver
         )
+        self.use_solver = use_solver
         self.num_games = num_games
-        self.update_freq = update_freq
+        self.chunk_size = chunk_size
         self.sleep_per_game_if_displayed = sleep_per_game_if_displayed
+        if display_mode != 3:
+            num_processes = 1
+        self.num_processes = num_processes
+        if master_seed is None:
+            master_seed = random.getrandbits(64)
+        self.master_seed = master_seed
+        self.serial_num_offset = 0
+        self.statistics_lock = threading.Lock()
+        self.num_finished_games = 0
 
         self.num_games_won = 0
         self.num_games_won_without_guesses = 0
@@ -777,6 +1989,9 @@ class GameStatistics(Interface):
         else:
             self.num_recorded_games = 0
         self.ranking_list = []
+        self.statistics_keys = GameStatistics.STATISTICS_KEYS
+        if PROFILER.enabled:
+            self.statistics_keys += GameStatistics.PROFILE_KEYS
 
         self.key_info_width = 0
         self.value_info_width = 0
@@ -792,9 +2007,14 @@ class GameStatistics(Interface):
             num_games, num_games, num_games, num_boxes, num_mines,
             num_boxes, num_boxes, num_boxes, max_time, max_time, max_time
         )
-        statistic_info_height = len(GameStatistics.STATISTICS_KEYS)
+        if PROFILER.enabled:
+            longest_statistics_values += self.get_profile_values_template(
+                1, dict.fromkeys(PROFILER.phases, int(max_time * 1e9)),
+                dict.fromkeys(PROFILER.counters, num_boxes * 100)
+            )
+        statistic_info_height = len(self.statistics_keys)
         assert statistic_info_height == len(longest_statistics_values)
-        self.key_info_width = max(map(len, GameStatistics.STATISTICS_KEYS))
+        self.key_info_width = max(map(len, self.statistics_keys))
         self.value_info_width = max(map(len, longest_statistics_values))
         statistic_info_width = self.key_info_width \
             + GameStatistics.KEY_VAL_SEPARATOR_WIDTH + self.value_info_width
@@ -864,6 +2084,27 @@ class GameStatistics(Interface):
             "{0} ms".format(
                 StringTools.set_decimal(6).format(total_avg_time * 1e3)
             ),
+            str(self.master_seed),
+        )
+
+    @staticmethod
+    def get_profile_values_template(serial_num, phase_times, counts):
+        profiled_time = sum(phase_times.values())
+        return tuple(
+            "{0} ms ({1})".format(
+                StringTools.set_decimal(6).format(
+                    f_div(phase_times[phase] * 1e-6, serial_num)
+                ),
+                StringTools.set_percentage(2).format(
+                    f_div(phase_times[phase], profiled_time)
+                )
+            ) for phase in PROFILER.phases
+        ) + tuple(
+            "{0} call(s)".format(
+                StringTools.set_decimal(3).format(
+                    f_div(counts[counter], serial_num)
+                )
+            ) for counter in PROFILER.counters
         )
 
     def get_statistics_values(self, serial_num):
@@ -880,12 +2121,17 @@ class GameStatistics(Interface):
         total_avg_time = f_div(
             self.game_end_time - self.process_begin_time, serial_num
         )
-        return self.get_statistics_values_template(
+        statistics_values = self.get_statistics_values_template(
             serial_num, num_games_won,
             self.num_games_won_without_guesses, avg_progress, avg_num_flags,
             avg_num_steps, avg_won_games_num_steps, avg_num_random_steps,
             avg_time, avg_won_games_time, total_avg_time
         )
+        if PROFILER.enabled:
+            statistics_values += GameStatistics.get_profile_values_template(
+                serial_num, PROFILER.phase_times, PROFILER.counts
+            )
+        return statistics_values
 
     def get_statistics_begin_line_index(self):
         if self.display_mode == 3:
@@ -902,9 +2148,7 @@ class GameStatistics(Interface):
                 GameStatistics.STATISTICS_TITLE
             )
         )
-        for line_index, statistics_key in enumerate(
-            GameStatistics.STATISTICS_KEYS
-        ):
+        for line_index, statistics_key in enumerate(self.statistics_keys):
             CONSOLE.print_in_line(
                 begin_line_index + line_index,
                 StringTools.set_space(self.key_info_width, -1).format(
@@ -912,8 +2156,11 @@ class GameStatistics(Interface):
                 )
             )
 
-    def print_statistics_values(self, serial_num):
-        statistics_values = self.get_statistics_values(serial_num)
+    def print_statistics_values(self):
+        with self.statistics_lock:
+            statistics_values = self.get_statistics_values(
+                self.num_finished_games
+            )
         begin_line_index = self.get_statistics_begin_line_index()
         begin_col_index = self.key_info_width \
             + GameStatistics.KEY_VAL_SEPARATOR_WIDTH
@@ -925,6 +2172,23 @@ class GameStatistics(Interface):
                 )
             )
 
+    def print_statistics_summary(self, serial_num):
+        statistics_values = self.get_statistics_values(serial_num)
+        print_(GameStatistics.STATISTICS_TITLE)
+        CONSOLE.put_new_line()
+        for statistics_key, statistics_val in zip(
+            self.statistics_keys, statistics_values
+        ):
+            print_(" ".join((
+                StringTools.set_space(self.key_info_width, -1).format(
+                    statistics_key
+                ),
+                StringTools.set_space(self.value_info_width, 1).format(
+                    statistics_val
+                )
+            )))
+            CONSOLE.put_new_line()
+
     def update_statistics_data(self, game):
         if game.game_status == 2:
             self.num_games_won += 1
@@ -938,23 +2202,38 @@ class GameStatistics(Interface):
         self.num_random_steps_sum += game.num_random_steps
         self.time_sum += game.time_used
 
-    def update_ranking_list(self, game):
+    def get_statistics_sums(self):
+        return tuple(
+            getattr(self, attr) for attr in GameStatistics.STATISTICS_SUM_ATTRS
+        )
+
+    def merge_statistics_sums(self, statistics_sums):
+        for attr, val in zip(
+            GameStatistics.STATISTICS_SUM_ATTRS, statistics_sums
+        ):
+            setattr(self, attr, getattr(self, attr) + val)
+
+    def rank_recorder(self, num_unknown_boxes, game_recorder):
         if self.num_recorded_games == 0:
             return
-        game_recorder = game.get_recorder()
-        if game.num_unknown_boxes == 0:
+        if num_unknown_boxes == 0:
             self.record_game_using_recorder(game_recorder)
             self.num_recorded_games -= 1
         else:
-            self.ranking_list.append((game.num_unknown_boxes, game_recorder))
+            self.ranking_list.append((num_unknown_boxes, game_recorder))
             self.ranking_list.sort(key=lambda pair: pair[0])
         if len(self.ranking_list) > self.num_recorded_games:
             self.ranking_list.pop()
 
+    def update_ranking_list(self, game):
+        if self.num_recorded_games == 0:
+            return
+        self.rank_recorder(game.num_unknown_boxes, game.get_recorder())
+
     def begin_process(self):
         Interface.begin_process(self)
         self.print_statistics_keys()
-        self.print_statistics_values(0)
+        self.print_statistics_values()
 
     def run_single_game(self, game):
         game.run()
@@ -962,53 +2241,650 @@ class GameStatistics(Interface):
             self.judge_to_record_game_data(game)
         elif self.record_mode < 0:
             self.update_ranking_list(game)
-        self.game_end_time = time.time()
-        self.update_statistics_data(game)
+        with self.statistics_lock:
+            self.game_end_time = time.time()
+            self.update_statistics_data(game)
+            self.num_finished_games += 1
         game.re_initialize()
 
-    def run_whole_process(self):
-        self.begin_process()
-        self.process_begin_time = time.time()
-        game = Interface(
+    @staticmethod
+    def get_engine():
+        return os.environ.get(GameStatistics.ENGINE_VAR, "").lower()
+
+    def get_game(self):
+        """
+        :return: Interface | BitGame
+            A `BitGame` if the environment variable `ENGINE_VAR` is
+            "bitboard", only the statistics data is displayed and the solver
+            is not used, otherwise an `Interface` game.
+        """
+        if GameStatistics.get_engine() == "bitboard" \
+                and self.display_mode == 3 and not self.use_solver:
+            return BitGame(
+                self.map_width, self.map_height, self.num_mines,
+                self.record_mode
+            )
+        return Interface(
             self.map_width, self.map_height, self.num_mines,
             self.display_mode, self.record_mode,
-            self.sleep_per_step_if_displayed
+            self.sleep_per_step_if_displayed, self.use_solver
+        )
+
+    def use_batch_logic(self):
+        """
+        :return: bool
+            Whether games are played in lockstep by
+            `np_autosweeper.BatchLogic`, which is the case if the
+            environment variable `ENGINE_VAR` is "numpy", NumPy is
+            installed, only the statistics data is displayed, and games are
+            neither recorded nor played with the solver.
+        """
+        return GameStatistics.get_engine() == "numpy" \
+            and np_autosweeper is not None and self.display_mode == 3 \
+            and self.record_mode == 0 and not self.use_solver
+
+    def update_statistics_data_in_batch(self, batch_result):
+        won, progress, num_flags, num_steps, num_guesses, game_times, \
+            time_used = batch_result
+        self.num_games_won += int(won.sum())
+        self.num_games_won_without_guesses += int(
+            (won & (num_guesses == 0)).sum()
         )
+        self.num_won_games_steps_sum += int(num_steps[won].sum())
+        self.won_games_time_sum += float(game_times[won].sum())
+        self.progress_sum += int(progress.sum())
+        self.num_flags_sum += int(num_flags.sum())
+        self.num_steps_sum += int(num_steps.sum())
+        self.num_random_steps_sum += int(num_guesses.sum())
+        self.time_sum += time_used
+
+    def get_chunk_size(self):
+        """
+        :return: int
+            The number of games of each chunk given to a process, which is
+            `chunk_size`, or a full batch of `np_autosweeper.BatchLogic` if
+            games are played in lockstep, since smaller batches lose most of
+            the speedup.
+        """
+        if self.use_batch_logic():
+            return np_autosweeper.BatchLogic.MAX_BATCH_SIZE
+        return self.chunk_size
+
+    def run_all_games_in_batches(self):
+        """
+        Plays the games in lockstep in full batches, with the boards and
+        guesses of each batch drawn from the seed of its first game.
+        """
+        batch_logic = np_autosweeper.BatchLogic(
+            self.map_width, self.map_height, self.num_mines
+        )
+        serial_num = 0
+        while serial_num < self.num_games:
+            num_batch_games = min(
+                self.get_chunk_size(), self.num_games - serial_num
+            )
+            try:
+                batch_result = batch_logic.play(
+                    SeedTools.get_game_seed(
+                        self.master_seed,
+                        self.serial_num_offset + serial_num + 1
+                    ),
+                    num_batch_games
+                )
+            except ValueError:
+                self.raise_init_mine_map_error()
+            serial_num += num_batch_games
+            with self.statistics_lock:
+                self.game_end_time = time.time()
+                self.update_statistics_data_in_batch(batch_result)
+                self.num_finished_games += num_batch_games
+
+    def run_all_games(self):
+        if self.use_batch_logic():
+            self.run_all_games_in_batches()
+            return
+        game = self.get_game()
         for serial_num in range(1, self.num_games + 1):
             if serial_num > 1:
                 time.sleep(self.sleep_per_game_if_displayed)
+            game.seed_game(SeedTools.get_game_seed(
+                self.master_seed, self.serial_num_offset + serial_num
+            ))
             self.run_single_game(game)
-            if serial_num % self.update_freq == 0 \
-                    or serial_num == self.num_games:
-                self.print_statistics_values(serial_num)
+
+    def get_game_chunks(self):
+        chunk_specs = []
+        serial_num_offset = 0
+        while serial_num_offset < self.num_games:
+            num_chunk_games = min(
+                self.get_chunk_size(), self.num_games - serial_num_offset
+            )
+            chunk_specs.append((
+                self.map_width, self.map_height, self.num_mines,
+                num_chunk_games, self.record_mode, self.use_solver,
+                self.master_seed, serial_num_offset
+            ))
+            serial_num_offset += num_chunk_games
+        return chunk_specs
+
+    def merge_chunk_result(self, chunk_result):
+        statistics_sums, recorders, ranking_list, profile_totals = \
+            chunk_result
+        self.merge_statistics_sums(statistics_sums)
+        if profile_totals is not None:
+            PROFILER.merge_totals(profile_totals)
+        for game_recorder in recorders:
+            if self.record_mode > 0:
+                self.record_game_using_recorder(game_recorder)
+            else:
+                self.rank_recorder(0, game_recorder)
+        for num_unknown_boxes, game_recorder in ranking_list:
+            self.rank_recorder(num_unknown_boxes, game_recorder)
+
+    def run_all_games_in_parallel(self):
+        with multiprocessing.Pool(self.num_processes) as pool:
+            for chunk_num_games, chunk_result in pool.imap_unordered(
+                run_game_chunk, self.get_game_chunks()
+            ):
+                with self.statistics_lock:
+                    self.merge_chunk_result(chunk_result)
+                    self.game_end_time = time.time()
+                    self.num_finished_games += chunk_num_games
+
+    def run_whole_process(self):
+        self.begin_process()
+        self.process_begin_time = time.time()
+        statistics_display = None
+        if CONSOLE.is_interactive():
+            statistics_display = StatisticsDisplay(self)
+        if self.num_processes > 1:
+            self.run_all_games_in_parallel()
+        else:
+            self.run_all_games()
+        if statistics_display is not None:
+            statistics_display.close()
         for pair in self.ranking_list:
             game_recorder = pair[1]
             self.record_game_using_recorder(game_recorder)
+        if not CONSOLE.is_interactive():
+            self.print_statistics_summary(self.num_games)
         self.terminate_process()
 
 
-class DisplayRecordedGame(AutoGame):
-    def __init__(self, file_path, display_mode, sleep_per_step):
+class GameChunk(GameStatistics):
+    """
+    Plays a chunk of games inside a worker process. Game records are
+    collected rather than written, so that the main process alone decides
+    their file indexes.
+    """
+    def __init__(self, map_width, map_height, num_mines, num_games,
+            record_mode, use_solver, master_seed, serial_num_offset):
+        GameStatistics.__init__(
+            self, map_width, map_height, num_mines, num_games,
+            3, record_mode, num_games, 0.0, 0.0, use_solver=use_solver,
+            master_seed=master_seed
+        )
+        self.serial_num_offset = serial_num_offset
+        self.recorders = []
+
+    def record_game_using_recorder(self, game_recorder):
+        self.recorders.append(game_recorder)
+
+    def run_chunk(self):
+        self.run_all_games()
+        if PROFILER.enabled:
+            profile_totals = PROFILER.pop_totals()
+        else:
+            profile_totals = None
+        return self.get_statistics_sums(), self.recorders, \
+            self.ranking_list, profile_totals
+
+
+def run_game_chunk(chunk_spec):
+    map_width, map_height, num_mines, num_games, record_mode, use_solver, \
+        master_seed, serial_num_offset = chunk_spec
+    chunk = GameChunk(
+        map_width, map_height, num_mines, num_games, record_mode, use_solver,
+        master_seed, serial_num_offset
+    )
+    return num_games, chunk.run_chunk()
+
+
+class RecordReplay(Core):
+    """
+    Applies the steps of a record to a board without rendering anything.
+    The state after every `KEYFRAME_INTERVAL` steps is kept when it's first
+    reached, so that seeking to any step replays at most that many steps.
+
+    :attr num_applied_steps: int
+        The board shows the state after this many steps of the record.
+    """
+    __slots__ = (
+        "record", "step_indexes", "step_mode_nums", "num_applied_steps",
+        "keyframes",
+    )
+    KEYFRAME_INTERVAL = 32
+
+    def __init__(self, record):
+        Core.__init__(
+            self, record["map_width"], record["map_height"],
+            record["num_mines"]
+        )
+        self.board_source = None
+        self.record = record
+        self.mine_indexes = record["mine_indexes"]
+        self.init_base_map()
+        self.step_indexes = record["step_indexes"]
+        self.step_mode_nums = record["step_mode_nums"]
+        self.num_applied_steps = 0
+        self.keyframes = [self.get_state()]
+
+    @staticmethod
+    def load_json_record(file_path):
         with open(file_path, "r") as input_file:
             json_dict = json.load(input_file)
-        AutoGame.__init__(
-            self, int(json_dict["map_width"]),
-            int(json_dict["map_height"]), int(json_dict["num_mines"]),
-            display_mode, 0, sleep_per_step
+        if "game_seed" in json_dict:
+            game_seed = int(json_dict["game_seed"])
+        else:
+            game_seed = None
+        return {
+            "map_width": int(json_dict["map_width"]),
+            "map_height": int(json_dict["map_height"]),
+            "num_mines": int(json_dict["num_mines"]),
+            "game_result": json_dict["game_result"],
+            "progress": int(json_dict["progress"]),
+            "num_flags": int(json_dict["num_flags"]),
+            "num_steps": int(json_dict["num_steps"]),
+            "num_guesses": int(json_dict["num_guesses"]),
+            "mine_indexes": list(map(int, json_dict["mine_indexes"].split())),
+            "step_indexes": list(map(int, json_dict["step_indexes"].split())),
+            "step_mode_nums": list(map(int, json_dict["step_mode_nums"])),
+            "game_seed": game_seed,
+        }
+
+    @staticmethod
+    def load_record(file_path, game_id=-1):
+        """
+        :param game_id: int
+            -1 if `file_path` is a json file, otherwise `file_path` is the
+            path prefix of a `RecordSegment` and the game with this id is
+            loaded.
+        """
+        if game_id == -1:
+            return RecordReplay.load_json_record(file_path)
+        return RecordSegment.decode(RecordSegment(file_path).read(game_id))
+
+    def get_num_record_steps(self):
+        return len(self.step_indexes)
+
+    def get_state(self):
+        return (
+            bytes(self.view_map), self.num_unknown_boxes,
+            self.num_unknown_mines, self.game_status, self.num_steps,
+            self.num_random_steps, self.previous_index
         )
-        self.mine_indexes = list(map(
-            int, json_dict["mine_indexes"].split()
-        ))
-        self.step_index_iterator = iter(map(
-            int, json_dict["step_indexes"].split()
-        ))
-        self.step_mode_iterator = iter(map(
-            int, json_dict["step_mode_nums"]
+
+    def set_state(self, state):
+        view_map, self.num_unknown_boxes, self.num_unknown_mines, \
+            self.game_status, self.num_steps, self.num_random_steps, \
+            self.previous_index = state
+        self.view_map = bytearray(view_map)
+
+    def update_map(self, index):
+        pass
+
+    def start(self, first_index):
+        self.game_status = 1
+
+    def on_playing(self):
+        self.seek(self.get_num_record_steps())
+
+    def apply_step(self):
+        step_num = self.num_applied_steps
+        index = self.step_indexes[step_num]
+        if self.game_status == 0:
+            self.start(index)
+        self.previous_index = index
+        self.exploit_step((index, self.step_mode_nums[step_num]))
+        self.num_applied_steps = step_num = step_num + 1
+        if step_num == len(self.keyframes) * RecordReplay.KEYFRAME_INTERVAL:
+            self.keyframes.append(self.get_state())
+
+    def seek(self, step_num):
+        """
+        Brings the board to the state after the first `step_num` steps.
+        """
+        if not 0 <= step_num <= self.get_num_record_steps():
+            raise IndexError("step_num out of range")
+        keyframe_index = min(
+            step_num // RecordReplay.KEYFRAME_INTERVAL,
+            len(self.keyframes) - 1
+        )
+        keyframe_step_num = keyframe_index * RecordReplay.KEYFRAME_INTERVAL
+        if step_num < self.num_applied_steps \
+                or keyframe_step_num > self.num_applied_steps:
+            self.set_state(self.keyframes[keyframe_index])
+            self.num_applied_steps = keyframe_step_num
+        while self.num_applied_steps < step_num:
+            self.apply_step()
+
+    def check_next_step(self):
+        """
+        :return: str or None
+            Why the next step can't be played, or None if it can.
+        """
+        step_num = self.num_applied_steps
+        index = self.step_indexes[step_num]
+        step_mode = self.step_mode_nums[step_num]
+        if self.game_status > 1:
+            return "step {0} after the end of the game".format(step_num)
+        if not 0 <= index < self.num_boxes:
+            return "step {0} out of the map".format(step_num)
+        if step_mode == 1:
+            if self.view_map[index] >= 9:
+                return "step {0} explores around a closed box".format(
+                    step_num
+                )
+        elif self.view_map[index] != 9:
+            return "step {0} on an open or flagged box".format(step_num)
+        return None
+
+    def verify(self):
+        """
+        Replays the whole record, checking each step and the final result.
+
+        :return: str or None
+            The first mismatch found, or None if the record is consistent.
+        """
+        record = self.record
+        if len(set(self.mine_indexes)) != self.num_mines:
+            return "duplicate mines"
+        if len(self.step_mode_nums) != self.get_num_record_steps():
+            return "{0} step indexes but {1} step modes".format(
+                self.get_num_record_steps(), len(self.step_mode_nums)
+            )
+        self.seek(0)
+        while self.num_applied_steps < self.get_num_record_steps():
+            error = self.check_next_step()
+            if error is not None:
+                return error
+            self.apply_step()
+        game_result = "won" if self.game_status == 2 else "lost"
+        if self.game_status < 2:
+            return "the game doesn't end"
+        for key, value in (
+            ("game_result", game_result),
+            ("progress", self.num_boxes - self.num_unknown_boxes),
+            ("num_flags", self.num_mines - self.num_unknown_mines),
+            ("num_steps", self.num_steps),
+            ("num_guesses", self.num_random_steps),
+        ):
+            if record[key] != value:
+                return "{0} is {1} but {2} when replayed".format(
+                    key, record[key], value
+                )
+        return None
+
+
+class RecordResolver(Logic):
+    """
+    Plays the board of a record again with the current `Logic`, from the
+    same first click. `random` is seeded with the seed of the record and the
+    mines are drawn as usual before being replaced by the recorded ones, so
+    a record of the python version is played the same way as long as the
+    solver is unchanged.
+    """
+    __slots__ = ("record",)
+
+    def __init__(self, record, use_solver=False):
+        Logic.__init__(
+            self, record["map_width"], record["map_height"],
+            record["num_mines"], use_solver
+        )
+        self.board_source = None
+        self.record = record
+
+    def make_first_choice_index(self):
+        first_index = self.record["step_indexes"][0]
+        self.previous_index = first_index
+        return first_index
+
+    def init_mine_indexes(self, first_index):
+        Logic.init_mine_indexes(self, first_index)
+        self.mine_indexes = list(self.record["mine_indexes"])
+
+    def raise_init_mine_map_error(self):
+        raise ValueError("too many mines")
+
+    def resolve(self):
+        """
+        :return: tuple[bool, int]
+            Whether the game is won and the number of boxes solved.
+        """
+        game_seed = self.record.get("game_seed")
+        random.seed(0 if game_seed is None else game_seed)
+        self.run()
+        return self.game_status == 2, self.num_boxes - self.num_unknown_boxes
+
+
+def verify_record(verify_spec):
+    """
+    :return: tuple[str, str or None, int or None]
+        The file-id, the mismatch found by `RecordReplay.verify` and how the
+        current solver does on the same board: 1 if better, -1 if worse and
+        0 if neither. The comparison is None if the record doesn't replay.
+    """
+    file_id, record, use_solver = verify_spec
+    if record is None:
+        return file_id, "corrupt record", None
+    try:
+        error = RecordReplay(record).verify()
+    except IndexError:
+        error = "index out of the map"
+    if error is not None:
+        return file_id, error, None
+    recorded_outcome = (record["game_result"] == "won", record["progress"])
+    outcome = RecordResolver(record, use_solver).resolve()
+    comparison = (outcome > recorded_outcome) - (outcome < recorded_outcome)
+    return file_id, None, comparison
+
+
+class RecordVerifier(object):
+    """
+    Replays all records of a specification headlessly and reports the
+    records that don't match their own results, see `RecordReplay.verify`.
+    The board of each record is also played again by the current solver,
+    see `RecordResolver`, to tell whether it does better or worse. Records
+    are streamed to a pool of processes if `num_processes` > 1.
+    """
+    MAX_NUM_PRINTED_ERRORS = 20
+    CHUNK_SIZE = 16
+
+    def __init__(self, map_width, map_height, num_mines, use_solver=False,
+            num_processes=1):
+        """
+        :attr num_comparisons: list[int]
+            The numbers of records on which the current solver does the
+            same, better and worse, indexed by the comparison.
+
+        :attr worse_file_ids: list[str]
+            The records on which the current solver does worse.
+        """
+        self.folder_name = "-".join(
+            map(str, (map_width, map_height, num_mines))
+        )
+        self.use_solver = use_solver
+        self.num_processes = num_processes
+        self.num_records = 0
+        self.errors = []
+        self.num_comparisons = [0, 0, 0]
+        self.worse_file_ids = []
+
+    def iter_records(self):
+        """
+        Yields the file-id and the loaded record of each json and binary
+        record of the specification, or None instead of a record that
+        can't be loaded.
+        """
+        folder_path = os.path.join(Interface.FOLDER_NAME, self.folder_name)
+        if os.path.isdir(folder_path):
+            for file_name in sorted(os.listdir(folder_path)):
+                if not file_name.endswith(".json"):
+                    continue
+                file_id = "{0}-{1}".format(self.folder_name, file_name[:-5])
+                try:
+                    record = RecordReplay.load_json_record(
+                        os.path.join(folder_path, file_name)
+                    )
+                except (KeyError, ValueError):
+                    yield file_id, None
+                    continue
+                yield file_id, record
+        segment = RecordSegment(folder_path)
+        if not segment.exists():
+            return
+        for game_id, binary_record in segment.iter_records():
+            file_id = "{0}-b{1}".format(self.folder_name, game_id)
+            try:
+                record = RecordSegment.decode(binary_record)
+            except (IndexError, struct.error):
+                yield file_id, None
+                continue
+            yield file_id, record
+
+    def get_verify_specs(self):
+        for file_id, record in self.iter_records():
+            yield file_id, record, self.use_solver
+
+    def merge_result(self, result):
+        file_id, error, comparison = result
+        self.num_records += 1
+        if error is not None:
+            self.errors.append((file_id, error))
+            return
+        self.num_comparisons[comparison] += 1
+        if comparison == -1:
+            self.worse_file_ids.append(file_id)
+
+    def verify_all(self):
+        if self.num_processes > 1:
+            with multiprocessing.Pool(self.num_processes) as pool:
+                for result in pool.imap(
+                    verify_record, self.get_verify_specs(),
+                    RecordVerifier.CHUNK_SIZE
+                ):
+                    self.merge_result(result)
+        else:
+            for result in map(verify_record, self.get_verify_specs()):
+                self.merge_result(result)
+        return self.errors
+
+    def run_whole_process(self):
+        self.verify_all()
+        print_("{0} record(s) verified, {1} mismatch(es).".format(
+            self.num_records, len(self.errors)
         ))
+        CONSOLE.put_new_line()
+        for file_id, error in self.errors[
+            :RecordVerifier.MAX_NUM_PRINTED_ERRORS
+        ]:
+            print_("{0}: {1}".format(file_id, error))
+            CONSOLE.put_new_line()
+        num_same, num_better, num_worse = self.num_comparisons
+        print_(
+            "Current solver: {0} better, {1} worse, {2} same.".format(
+                num_better, num_worse, num_same
+            )
+        )
+        CONSOLE.put_new_line()
+        for file_id in self.worse_file_ids[
+            :RecordVerifier.MAX_NUM_PRINTED_ERRORS
+        ]:
+            print_("{0}: worse".format(file_id))
+            CONSOLE.put_new_line()
+        CONSOLE.print_with_color(Interface.FINISH_MSG, color=0x0a)
+        CONSOLE.ready_to_quit()
+
+
+class DisplayRecordedGame(AutoGame):
+    def __init__(self, file_path, display_mode, sleep_per_step, game_id=-1,
+            first_step_num=0):
+        """
+        :param game_id: int
+            See `RecordReplay.load_record`.
+
+        :param first_step_num: int
+            The board is brought to the state after this many steps without
+            being displayed, and then displayed from there.
+        """
+        record = RecordReplay.load_record(file_path, game_id)
+        AutoGame.__init__(
+            self, record["map_width"], record["map_height"],
+            record["num_mines"], display_mode, 0, sleep_per_step
+        )
+        self.mine_indexes = record["mine_indexes"]
+        self.board_source = None
+        self.replay = RecordReplay(record)
+        self.first_step_num = first_step_num
+        self.step_index_iterator = iter(record["step_indexes"])
+        self.step_mode_iterator = iter(record["step_mode_nums"])
 
     def init_mine_indexes(self, first_index):
         pass
 
+    def load_replay_state(self):
+        """
+        Takes the board of `replay`, and rebuilds the counts of the unknown
+        boxes and flags around each box and the frontier.
+        """
+        replay = self.replay
+        self.base_map = replay.base_map
+        self.view_map = bytearray(replay.view_map)
+        self.num_unknown_boxes = replay.num_unknown_boxes
+        self.num_unknown_mines = replay.num_unknown_mines
+        self.game_status = replay.game_status
+        self.num_steps = replay.num_steps
+        self.num_random_steps = replay.num_random_steps
+        self.previous_index = replay.previous_index
+        view_map = self.view_map
+        for i in range(self.num_boxes):
+            if view_map[i] == 9:
+                continue
+            for j in self.surrounding_indexes[i]:
+                self.unknown_map[j] -= 1
+                if view_map[i] == 10:
+                    self.flags_map[j] += 1
+        self.frontier = {
+            i for i in range(self.num_boxes)
+            if view_map[i] < 9 and self.unknown_map[i] != 0
+        }
+
+    def on_playing(self):
+        first_step_num = self.first_step_num
+        if first_step_num == 0:
+            AutoGame.on_playing(self)
+            return
+        self.replay.seek(first_step_num)
+        self.load_replay_state()
+        self.step_index_iterator = iter(
+            self.replay.step_indexes[first_step_num:]
+        )
+        self.step_mode_iterator = iter(
+            self.replay.step_mode_nums[first_step_num:]
+        )
+        for i in range(self.num_boxes):
+            if self.view_map[i] != 9:
+                self.update_map(i)
+        if self.game_status != 1:
+            self.end()
+        elif self.display_mode == 0:
+            self.print_game_status()
+            self.print_game_base_info_values()
+        CONSOLE.flush()
+        while self.game_status == 1:
+            next_step = self.make_choice()
+            self.exploit_step(next_step)
+
     def make_choice(self):
         index = next(self.step_index_iterator)
         step_mode = next(self.step_mode_iterator)
@@ -1029,7 +2905,10 @@ class Prompt(object):
     MAP_HEIGHT = "Please input the height of the map."
     NUM_MINES = "Please input the number of mines."
     NUM_GAMES = "Please input times that the game should be played for."
-    FILE_ID = "Please input the file-id of the game to be displayed."
+    FILE_ID = "\n".join([
+        "Please input the file-id of the game to be displayed (put a 'b'",
+        "before the number for a binary record, like 30-16-99-b0)."
+    ])
     DISPLAY_MODE = "\n".join([
         "Please choose a display mode to determine how each game will be",
         "displayed (1 is recommended if the map is too large)."
@@ -1039,8 +2918,21 @@ class Prompt(object):
         "recorded."
     ])
     NUM_RECORDED_GAMES = "How many games shall be recorded (1 at least)?"
-    UPDATE_FREQ = "After how many games should the statistics data be updated?"
+    CHUNK_SIZE = "How many games shall each process play at a time?"
+    NUM_PROCESSES = "How many processes shall be used to play the games?"
+    MASTER_SEED = "\n".join([
+        "Please input the master seed of the games, so that the same games",
+        "can be played again (-1 for a random one)."
+    ])
+    SOLVER_MODE = "\n".join([
+        "Please choose how to guess when no box can be inferred for sure",
+        "(the solver wins more games at the cost of some speed)."
+    ])
     SLEEP_PER_STEP = "How long shall the computer sleep after each step?"
+    FIRST_STEP_NUM = "\n".join([
+        "After how many steps shall the game begin to be displayed (the steps",
+        "before are skipped)?"
+    ])
     SLEEP_PER_GAME = "How long shall the computer sleep after each game?"
 
 
@@ -1048,7 +2940,10 @@ class ChoicesPrompts(object):
     MODE = (
         "Run a single game",
         "Run many times to get statistics data",
-        "Display a recorded game from '{0}' file".format(Interface.FOLDER_NAME)
+        "Display a recorded game from '{0}' file".format(
+            Interface.FOLDER_NAME
+        ),
+        "Verify the recorded games of a specification"
     )
     DISPLAY_MODE_0 = (
         "Display the map and basic information after each step",
@@ -1078,6 +2973,10 @@ class ChoicesPrompts(object):
         "Record only lost games",
         "Record some best-played games"
     )
+    SOLVER_MODE = (
+        "Guess uniformly at random",
+        "Guess the box least likely to be a mine"
+    )
 
 
 class MainProcess(object):
@@ -1119,18 +3018,39 @@ class MainProcess(object):
         return sleep_per_game
 
     @staticmethod
-    def get_file_path(file_id):
+    def input_use_solver():
+        solver_mode = InputTools.prompts_input(
+            Prompt.SOLVER_MODE, 0, ChoicesPrompts.SOLVER_MODE
+        )
+        return solver_mode == 1
+
+    @staticmethod
+    def get_record_location(file_id):
+        """
+        :return: tuple[str, int] or None
+            The arguments `file_path` and `game_id` of `DisplayRecordedGame`,
+            or None if the record doesn't exist.
+        """
         split_index = file_id.rfind("-")
         if split_index == -1:
-            return ""
+            return None
         folder_name = file_id[:split_index]
-        file_name = file_id[split_index + 1:] + ".json"
-        file_path = os.path.join(Interface.FOLDER_NAME, folder_name, file_name)
-        try:
-            open(file_path)
-        except FileNotFoundError:
-            return ""
-        return file_path
+        file_name = file_id[split_index + 1:]
+        if file_name.startswith("b"):
+            try:
+                game_id = int(file_name[1:])
+            except ValueError:
+                return None
+            path_prefix = os.path.join(Interface.FOLDER_NAME, folder_name)
+            if not 0 <= game_id < RecordSegment(path_prefix).get_num_records():
+                return None
+            return path_prefix, game_id
+        file_path = os.path.join(
+            Interface.FOLDER_NAME, folder_name, file_name + ".json"
+        )
+        if not os.path.isfile(file_path):
+            return None
+        return file_path, -1
 
     @staticmethod
     def handle_0():
@@ -1141,13 +3061,14 @@ class MainProcess(object):
         record_mode = InputTools.prompts_input(
             Prompt.RECORD_MODE, 0, ChoicesPrompts.RECORD_MODE_0
         )
+        use_solver = MainProcess.input_use_solver()
         if display_mode != 2:
             sleep_per_step = MainProcess.input_sleep_per_step(0.0)
         else:
             sleep_per_step = 0.0
         return AutoGame(
             map_width, map_height, num_mines,
-            display_mode, record_mode, sleep_per_step
+            display_mode, record_mode, sleep_per_step, use_solver
         )
 
     @staticmethod
@@ -1167,37 +3088,68 @@ class MainProcess(object):
                 int, Prompt.NUM_RECORDED_GAMES, 1, lambda x: 0 < x <= num_games
             )
             record_mode = -num_recorded_games
-        update_freq_default_val = num_games // 100
-        if update_freq_default_val == 0:
-            update_freq_default_val = 1
-        update_freq = InputTools.assertion_input(
-            int, Prompt.UPDATE_FREQ, update_freq_default_val, lambda x: x > 0
-        )
+        use_solver = MainProcess.input_use_solver()
         if display_mode != 3:
             sleep_per_step = MainProcess.input_sleep_per_step(0.0)
             sleep_per_game = MainProcess.input_sleep_per_game(0.0)
+            num_processes = 1
         else:
             sleep_per_step = 0.0
             sleep_per_game = 0.0
+            num_processes = InputTools.assertion_input(
+                int, Prompt.NUM_PROCESSES, multiprocessing.cpu_count(),
+                lambda x: x > 0
+            )
+        chunk_size = num_games
+        if num_processes > 1:
+            chunk_size = InputTools.assertion_input(
+                int, Prompt.CHUNK_SIZE,
+                max(num_games // (num_processes * 10), 1), lambda x: x > 0
+            )
+        master_seed = InputTools.assertion_input(
+            int, Prompt.MASTER_SEED, -1, lambda x: -1 <= x < 1 << 64
+        )
+        if master_seed == -1:
+            master_seed = None
         return GameStatistics(
             map_width, map_height, num_mines, num_games,
-            display_mode, record_mode, update_freq,
-            sleep_per_step, sleep_per_game
+            display_mode, record_mode, chunk_size,
+            sleep_per_step, sleep_per_game, num_processes, use_solver,
+            master_seed
         )
 
     @staticmethod
     def handle_2():
         file_id = InputTools.assertion_input(
             str, Prompt.FILE_ID, MainProcess.EXAMPLE_FILE_ID,
-            MainProcess.get_file_path
+            lambda x: MainProcess.get_record_location(x) is not None
         )
-        file_path = MainProcess.get_file_path(file_id)
+        file_path, game_id = MainProcess.get_record_location(file_id)
         display_mode = InputTools.prompts_input(
             Prompt.DISPLAY_MODE, 0, ChoicesPrompts.DISPLAY_MODE_2
         )
+        num_record_steps = len(
+            RecordReplay.load_record(file_path, game_id)["step_indexes"]
+        )
+        first_step_num = InputTools.assertion_input(
+            int, Prompt.FIRST_STEP_NUM, 0,
+            lambda x: 0 <= x <= num_record_steps
+        )
         sleep_per_step = MainProcess.input_sleep_per_step(0.0)
         return DisplayRecordedGame(
-            file_path, display_mode, sleep_per_step
+            file_path, display_mode, sleep_per_step, game_id, first_step_num
+        )
+
+    @staticmethod
+    def handle_3():
+        map_width, map_height, num_mines = MainProcess.input_specification()
+        use_solver = MainProcess.input_use_solver()
+        num_processes = InputTools.assertion_input(
+            int, Prompt.NUM_PROCESSES, multiprocessing.cpu_count(),
+            lambda x: x > 0
+        )
+        return RecordVerifier(
+            map_width, map_height, num_mines, use_solver, num_processes
         )
 
     @staticmethod
@@ -1209,10 +3161,35 @@ class MainProcess(object):
             process = MainProcess.handle_0()
         elif mode == 1:
             process = MainProcess.handle_1()
-        else:
+        elif mode == 2:
             process = MainProcess.handle_2()
+        else:
+            process = MainProcess.handle_3()
         return process
 
 
+def instrument_game_loop():
+    PROFILER.time_method(Core, "start", "start")
+    PROFILER.time_method(Core, "expand_zero", "expand")
+    PROFILER.time_method(Core, "run", "other")
+    PROFILER.time_method(Logic, "make_choice", "inference")
+    PROFILER.time_method(
+        Logic, "infer_single_box", "inference", "inferences"
+    )
+    PROFILER.time_method(
+        Logic, "two_indexes_logic", "inference", "pair_checks"
+    )
+    PROFILER.time_method(Logic, "make_random_choice", "guess")
+    PROFILER.time_method(Logic, "make_solver_choice", "guess")
+    PROFILER.count_method(StepQueue, "push", "queue_pushes")
+    PROFILER.time_method(Interface, "judge_to_record_game_data", "record")
+    PROFILER.time_method(Interface, "record_game_using_recorder", "record")
+    PROFILER.time_method(GameStatistics, "update_ranking_list", "record")
+
+
+if PROFILER.enabled:
+    instrument_game_loop()
+
+
 if __name__ == "__main__":
     MainProcess()
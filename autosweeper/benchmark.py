@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+# coding: utf-8
+
+# website: https://github.com/Michael1075/autosweeper
+
+# Non-interactive benchmark of the solvers. Every engine plays the same
+# number of games of each specification, seeded from a fixed master seed,
+# and the results are printed as json:
+#     $ python benchmark.py > before.json
+#     $ python benchmark.py --engines python cython --scale 0.1
+#     $ python benchmark.py --profile
+# Each case runs in a fresh process so that its peak RSS is its own.
+# The peak RSS of the standalone binary is polled from /proc on Linux, since
+# the rusage of a child also counts the process that launched it. With
+# --profile, the phase breakdown of AUTOSWEEPER_PROFILE is also reported,
+# though the timers slow the games down.
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+from tools import SeedTools
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+SPECS = (
+    ("beginner", 9, 9, 10, 2000),
+    ("intermediate", 16, 16, 40, 1000),
+    ("expert", 30, 16, 99, 500),
+    ("large", 100, 100, 2000, 20),
+)
+ENGINES = ("python", "bitboard", "numpy", "cython", "binary")
+RSS_POLL_INTERVAL = 0.01
+DEFAULT_BINARY_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    "cpp_autosweeper.exe" if os.name == "nt" else "cpp_autosweeper"
+)
+
+
+class EngineUnavailable(Exception):
+    pass
+
+
+def get_peak_rss_mb(children=False):
+    """
+    :return: float or None
+        The peak RSS of this process, or of its largest waited child if
+        `children`. None if the platform doesn't report it.
+    """
+    if resource is None:
+        return None
+    who = resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF
+    peak_rss = resource.getrusage(who).ru_maxrss
+    if sys.platform == "darwin":
+        return peak_rss / (1 << 20)
+    return peak_rss / (1 << 10)
+
+
+def get_child_peak_rss_mb(pid):
+    """
+    :return: float or None
+        None if /proc is not available or the child has exited.
+    """
+    try:
+        with open("/proc/{0}/status".format(pid)) as status_file:
+            for line in status_file:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / (1 << 10)
+    except OSError:
+        pass
+    return None
+
+
+def get_profile_per_game(profile_totals, num_games):
+    """
+    :param profile_totals: tuple[dict[str, int], dict[str, int]] or None
+        The nanoseconds spent in each phase and the counts.
+
+    :return: dict or None
+    """
+    if profile_totals is None:
+        return None
+    phase_times, counts = profile_totals
+    return {
+        "ms_per_game": {
+            phase: phase_time * 1e-6 / num_games
+            for phase, phase_time in phase_times.items()
+        },
+        "calls_per_game": {
+            counter: count / num_games for counter, count in counts.items()
+        },
+    }
+
+
+def run_python_engine(map_width, map_height, num_mines, num_games,
+        use_solver, master_seed, bitboard=False):
+    from autosweeper import Logic
+    from autosweeper import PROFILER
+    if bitboard:
+        if use_solver:
+            raise EngineUnavailable("the bitboard engine has no solver")
+        from bit_autosweeper import BitLogic
+        game = BitLogic(map_width, map_height, num_mines)
+    else:
+        game = Logic(map_width, map_height, num_mines, use_solver)
+    num_games_won = 0
+    num_steps_sum = 0
+    begin_time = time.perf_counter()
+    for serial_num in range(1, num_games + 1):
+        random.seed(SeedTools.get_game_seed(master_seed, serial_num))
+        game.run()
+        if game.game_status == 2:
+            num_games_won += 1
+        num_steps_sum += game.num_steps
+        game.re_initialize()
+    time_used = time.perf_counter() - begin_time
+    profile = get_profile_per_game(
+        PROFILER.pop_totals() if PROFILER.enabled and not bitboard else None,
+        num_games
+    )
+    return num_games_won, num_steps_sum, time_used, get_peak_rss_mb(), \
+        profile
+
+
+def run_numpy_engine(map_width, map_height, num_mines, num_games,
+        use_solver, master_seed):
+    if use_solver:
+        raise EngineUnavailable("the numpy engine has no solver")
+    try:
+        from np_autosweeper import BatchLogic
+    except ImportError:
+        raise EngineUnavailable("numpy is not installed")
+    won, _, _, num_steps, _, _, time_used = BatchLogic(
+        map_width, map_height, num_mines
+    ).play(master_seed, num_games)
+    return int(won.sum()), int(num_steps.sum()), time_used, \
+        get_peak_rss_mb(), None
+
+
+def run_cython_engine(map_width, map_height, num_mines, num_games,
+        use_solver, master_seed):
+    try:
+        from cython_ext import PySingleGame
+    except ImportError:
+        raise EngineUnavailable("cython_ext is not built")
+    game = PySingleGame(map_width, map_height, num_mines, use_solver)
+    begin_time = time.perf_counter()
+    batch_sums = game.run_batch(num_games, master_seed)
+    time_used = time.perf_counter() - begin_time
+    profile = get_profile_per_game(PySingleGame.pop_profile(), num_games)
+    return batch_sums["num_games_won"], batch_sums["num_steps_sum"], \
+        time_used, get_peak_rss_mb(), profile
+
+
+def parse_statistics_summary(output):
+    """
+    :return: dict[str, str]
+        The values of the statistics summary printed by a headless run.
+    """
+    values = {}
+    for line in output.splitlines():
+        key, _, value = line.partition("  ")
+        if value:
+            values[key] = value.strip()
+    return values
+
+
+def parse_profile_rows(values, num_games):
+    """
+    :return: dict or None
+        The profile of a headless run, or None if it has no profile rows.
+    """
+    from autosweeper import GameStatistics
+    from autosweeper import PROFILER
+    if GameStatistics.PROFILE_KEYS[0] not in values:
+        return None
+    per_game_values = [
+        float(values[key].split()[0]) for key in GameStatistics.PROFILE_KEYS
+    ]
+    num_phases = len(PROFILER.phases)
+    return get_profile_per_game((
+        {
+            phase: value * 1e6 * num_games
+            for phase, value in zip(PROFILER.phases, per_game_values)
+        },
+        {
+            counter: value * num_games
+            for counter, value in zip(
+                PROFILER.counters, per_game_values[num_phases:]
+            )
+        }
+    ), num_games)
+
+
+def run_binary_engine(map_width, map_height, num_mines, num_games,
+        use_solver, master_seed, binary_path):
+    if not os.path.isfile(binary_path):
+        raise EngineUnavailable("{0} not found".format(binary_path))
+    env = dict(os.environ, AUTOSWEEPER_CONSOLE="headless")
+    peak_rss_mb = None
+    with tempfile.TemporaryDirectory() as working_dir:
+        process = subprocess.Popen(
+            [binary_path] + list(map(str, (
+                map_width, map_height, num_mines, num_games, 0, 1,
+                int(use_solver), master_seed
+            ))),
+            cwd=working_dir, env=env, stdout=subprocess.PIPE,
+            universal_newlines=True
+        )
+        while process.poll() is None:
+            peak_rss_mb = get_child_peak_rss_mb(process.pid) or peak_rss_mb
+            time.sleep(RSS_POLL_INTERVAL)
+        output = process.stdout.read()
+        process.stdout.close()
+    if process.returncode != 0:
+        raise subprocess.CalledProcessError(process.returncode, binary_path)
+    if peak_rss_mb is None:
+        peak_rss_mb = get_peak_rss_mb(children=True)
+    values = parse_statistics_summary(output)
+    num_games_won = int(values["Games won"].split()[0])
+    avg_num_steps = float(values["Avg. steps"].split()[0])
+    total_avg_time = float(values["Total avg. time"].split()[0]) * 1e-3
+    return num_games_won, round(avg_num_steps * num_games), \
+        total_avg_time * num_games, peak_rss_mb, \
+        parse_profile_rows(values, num_games)
+
+
+def run_case(case):
+    engine, spec_name, map_width, map_height, num_mines, num_games, \
+        use_solver, master_seed, binary_path = case
+    result = {
+        "engine": engine,
+        "spec": spec_name,
+        "map_width": map_width,
+        "map_height": map_height,
+        "num_mines": num_mines,
+        "num_games": num_games,
+    }
+    args = (
+        map_width, map_height, num_mines, num_games, use_solver, master_seed
+    )
+    try:
+        if engine == "python":
+            case_result = run_python_engine(*args)
+        elif engine == "bitboard":
+            case_result = run_python_engine(*args, bitboard=True)
+        elif engine == "numpy":
+            case_result = run_numpy_engine(*args)
+        elif engine == "cython":
+            case_result = run_cython_engine(*args)
+        else:
+            case_result = run_binary_engine(*args, binary_path)
+    except EngineUnavailable as error:
+        result["skipped"] = str(error)
+        return result
+    num_games_won, num_steps_sum, time_used, peak_rss_mb, profile = \
+        case_result
+    result.update({
+        "games_per_s": num_games / time_used,
+        "ms_per_game": time_used * 1e3 / num_games,
+        "ms_per_step": time_used * 1e3 / max(num_steps_sum, 1),
+        "peak_rss_mb": peak_rss_mb,
+        "win_rate": num_games_won / num_games,
+    })
+    if profile is not None:
+        result["profile"] = profile
+    return result
+
+
+def get_cases(engines, scale, use_solver, master_seed, binary_path):
+    cases = []
+    for spec_name, map_width, map_height, num_mines, num_games in SPECS:
+        num_games = max(int(num_games * scale), 1)
+        for engine in engines:
+            cases.append((
+                engine, spec_name, map_width, map_height, num_mines,
+                num_games, use_solver, master_seed, binary_path
+            ))
+    return cases
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(
+        description="Benchmark the solvers and print the results as json."
+    )
+    parser.add_argument(
+        "--engines", nargs="+", choices=ENGINES, default=list(ENGINES)
+    )
+    parser.add_argument(
+        "--scale", type=float, default=1.0,
+        help="multiplier of the number of games of each specification"
+    )
+    parser.add_argument(
+        "--solver", action="store_true",
+        help="guess with the probability solver"
+    )
+    parser.add_argument(
+        "--profile", action="store_true",
+        help="also report the time of each phase of the games"
+    )
+    parser.add_argument("--seed", type=int, default=0, help="master seed")
+    parser.add_argument(
+        "--binary", default=DEFAULT_BINARY_PATH,
+        help="path of the compiled cpp_autosweeper"
+    )
+    parser.add_argument("--output", help="write the json to this file")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.profile:
+        os.environ["AUTOSWEEPER_PROFILE"] = "1"
+    else:
+        os.environ.pop("AUTOSWEEPER_PROFILE", None)
+    results = []
+    context = multiprocessing.get_context("spawn")
+    for case in get_cases(
+        args.engines, args.scale, args.solver, args.seed,
+        os.path.abspath(args.binary)
+    ):
+        with context.Pool(1) as pool:
+            result = pool.apply(run_case, (case,))
+        print(
+            "{engine} {spec}: {status}".format(
+                status=result.get("skipped") or "{0:.3f} ms/game".format(
+                    result["ms_per_game"]
+                ),
+                **result
+            ),
+            file=sys.stderr
+        )
+        results.append(result)
+    report = {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "seed": args.seed,
+        "use_solver": args.solver,
+        "profile": args.profile,
+        "results": results,
+    }
+    report_str = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as output_file:
+            output_file.write(report_str + "\n")
+    else:
+        print(report_str)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,467 @@
+#!/usr/bin/env python3
+# coding: utf-8
+
+# website: https://github.com/Michael1075/autosweeper
+
+# Bitboard backend of autosweeper. A map is kept as python ints with one bit
+# per box (bit i for box i), so that a rule is tested on all boxes at once
+# by a few shifts, ANDs and ORs instead of one interpreter dispatch per box.
+# Counts of boxes around each box are kept bit-sliced: a count is a list of
+# masks, where the k-th mask holds the k-th bit of the count of every box.
+
+from collections import deque
+import random
+import time
+
+
+try:
+    popcount = int.bit_count
+except AttributeError:
+    def popcount(mask):
+        return bin(mask).count("1")
+
+
+def iter_bits(mask):
+    """
+    Yields the indexes of the set bits of `mask` in ascending order.
+    """
+    bits_str = bin(mask)[:1:-1]
+    index = bits_str.find("1")
+    while index != -1:
+        yield index
+        index = bits_str.find("1", index + 1)
+
+
+class BitBoard(object):
+    """
+    Shifts and bit-sliced arithmetic on masks of one map size, built once
+    for each map size and shared by all games of that size.
+    """
+    BOARDS = {}
+    MAX_SHIFT = 3
+
+    def __init__(self, map_width, map_height):
+        self.map_width = map_width
+        self.map_height = map_height
+        self.full_mask = full_mask = (1 << map_width * map_height) - 1
+        row_masks = {}
+        for dx in range(-BitBoard.MAX_SHIFT, BitBoard.MAX_SHIFT + 1):
+            row_mask = 0
+            for x in range(max(-dx, 0), min(map_width - dx, map_width)):
+                row_mask |= 1 << x
+            row_masks[dx] = row_mask
+        self.column_masks = {
+            dx: full_mask // ((1 << map_width) - 1) * row_mask
+            for dx, row_mask in row_masks.items()
+        }
+        self.suburb_offsets = {}
+        for dy in range(-2, 3):
+            for dx in range(-2, 3):
+                if dx != 0 or dy != 0:
+                    self.suburb_offsets[(dx, dy)] = (
+                        BitBoard.get_suburb_offsets(dx, dy),
+                        BitBoard.get_suburb_offsets(-dx, -dy, dx, dy)
+                    )
+
+    @staticmethod
+    def get(map_width, map_height):
+        size = (map_width, map_height)
+        board = BitBoard.BOARDS.get(size)
+        if board is None:
+            board = BitBoard(map_width, map_height)
+            BitBoard.BOARDS[size] = board
+        return board
+
+    @staticmethod
+    def get_suburb_offsets(dx, dy, base_dx=0, base_dy=0):
+        """
+        :return: list[tuple[int, int]]
+            The offsets of the boxes around (base_dx, base_dy) which are not
+            around (base_dx + dx, base_dy + dy).
+        """
+        return [
+            (base_dx + x, base_dy + y)
+            for y in range(-1, 2) for x in range(-1, 2)
+            if (x != 0 or y != 0) and (abs(x - dx) > 1 or abs(y - dy) > 1)
+        ]
+
+    def shift(self, mask, dx, dy):
+        """
+        :return: int
+            The mask with each box moved by (dx, dy). Boxes moved out of the
+            map are dropped.
+        """
+        mask &= self.column_masks[dx]
+        offset = dx + dy * self.map_width
+        if offset >= 0:
+            return (mask << offset) & self.full_mask
+        return mask >> -offset
+
+    def dilate(self, mask):
+        """
+        :return: int
+            The boxes of `mask` and the boxes around them.
+        """
+        mask |= self.shift(mask, 1, 0) | self.shift(mask, -1, 0)
+        map_width = self.map_width
+        return (mask | (mask << map_width) | (mask >> map_width)) \
+            & self.full_mask
+
+    def dilate_by(self, mask, offsets):
+        result = 0
+        for dx, dy in offsets:
+            result |= self.shift(mask, dx, dy)
+        return result
+
+    @staticmethod
+    def add_mask(planes, mask):
+        """
+        Adds 1 to the count of each box of `mask` in place.
+        """
+        for k in range(len(planes)):
+            carry = planes[k] & mask
+            planes[k] ^= mask
+            mask = carry
+            if not mask:
+                return
+        planes.append(mask)
+
+    @staticmethod
+    def add_planes(planes0, planes1):
+        result = []
+        carry = 0
+        for k in range(max(len(planes0), len(planes1))):
+            plane0 = planes0[k] if k < len(planes0) else 0
+            plane1 = planes1[k] if k < len(planes1) else 0
+            plane_xor = plane0 ^ plane1
+            result.append(plane_xor ^ carry)
+            carry = (plane0 & plane1) | (carry & plane_xor)
+        if carry:
+            result.append(carry)
+        return result
+
+    def equal_planes(self, planes0, planes1):
+        """
+        :return: int
+            The boxes whose counts are the same in both.
+        """
+        result = self.full_mask
+        for k in range(max(len(planes0), len(planes1))):
+            plane0 = planes0[k] if k < len(planes0) else 0
+            plane1 = planes1[k] if k < len(planes1) else 0
+            result &= ~(plane0 ^ plane1)
+        return result
+
+    def shift_planes(self, planes, dx, dy):
+        return [self.shift(plane, dx, dy) for plane in planes]
+
+    def count_by(self, mask, offsets):
+        """
+        :return: list[int]
+            The counts of boxes of `mask` at `offsets` from each box.
+        """
+        planes = []
+        for dx, dy in offsets:
+            BitBoard.add_mask(planes, self.shift(mask, -dx, -dy))
+        return planes
+
+    def count_surrounding(self, mask):
+        planes = []
+        for dy in range(-1, 2):
+            for dx in range(-1, 2):
+                if dx != 0 or dy != 0:
+                    BitBoard.add_mask(planes, self.shift(mask, dx, dy))
+        return planes
+
+
+class BitLogic(object):
+    """
+    Plays games with the same rules as `Logic` in autosweeper.py: a box is
+    explored around when all its mines are flagged, the boxes around it are
+    flagged when they must all be mines, and two boxes within 2 layers are
+    compared to find mines and safe boxes around one of them but not the
+    other. Each rule is tested on every box at once, and all steps found are
+    queued before testing again. A box is guessed uniformly at random when
+    nothing is found.
+
+    Boards are drawn from `random` the same way as in `Core`, so a seed gives
+    the same board as `Logic`, but the steps may differ.
+    """
+    def __init__(self, map_width, map_height, num_mines, record_steps=False):
+        """
+        :param record_steps: bool
+            Whether to keep the steps in `step_index_list` and
+            `step_mode_list`, the same as in a record.
+
+        :attr game_status: int in range(4)
+            See `Core`.
+
+        :attr number_planes: list[int]
+            The number of mines around each box, bit-sliced.
+
+        :attr known_mask: int
+            Boxes that are explored or flagged.
+        """
+        self.map_width = map_width
+        self.map_height = map_height
+        self.num_mines = num_mines
+        self.num_boxes = map_width * map_height
+        self.board = BitBoard.get(map_width, map_height)
+        self.record_steps = record_steps
+        self.cached_steps = deque()
+
+        self.num_unknown_boxes = self.num_boxes
+        self.num_unknown_mines = num_mines
+        self.mine_indexes = [-1] * num_mines
+        self.mine_mask = 0
+        self.number_planes = []
+        self.zero_mask = 0
+        self.explored_mask = 0
+        self.flag_mask = 0
+        self.known_mask = 0
+        self.step_index_list = []
+        self.step_mode_list = []
+
+        self.game_status = 0
+        self.num_steps = 0
+        self.num_random_steps = 0
+        self.previous_index = 0
+        self.time_used = 0.0
+
+    def re_initialize(self):
+        self.cached_steps.clear()
+        self.num_unknown_boxes = self.num_boxes
+        self.num_unknown_mines = self.num_mines
+        self.mine_indexes = [-1] * self.num_mines
+        self.mine_mask = 0
+        self.number_planes = []
+        self.zero_mask = 0
+        self.explored_mask = 0
+        self.flag_mask = 0
+        self.known_mask = 0
+        self.step_index_list = []
+        self.step_mode_list = []
+
+        self.game_status = 0
+        self.num_steps = 0
+        self.num_random_steps = 0
+        self.previous_index = 0
+        self.time_used = 0.0
+
+    def raise_init_mine_map_error(self):
+        raise ValueError("too many mines")
+
+    def init_mine_indexes(self, first_index):
+        first_x = first_index % self.map_width
+        first_y = first_index // self.map_width
+        map_index_choices = [
+            i for i in range(self.num_boxes)
+            if abs(i % self.map_width - first_x) > 1
+            or abs(i // self.map_width - first_y) > 1
+        ]
+        try:
+            self.mine_indexes = random.sample(
+                map_index_choices, self.num_mines
+            )
+        except ValueError:
+            self.raise_init_mine_map_error()
+
+    def init_board(self, first_index):
+        self.init_mine_indexes(first_index)
+        mine_mask = 0
+        for mine_index in self.mine_indexes:
+            mine_mask |= 1 << mine_index
+        self.mine_mask = mine_mask
+        self.number_planes = self.board.count_surrounding(mine_mask)
+        nonzero_mask = mine_mask
+        for plane in self.number_planes:
+            nonzero_mask |= plane
+        self.zero_mask = self.board.full_mask & ~nonzero_mask
+
+    def start(self, first_index):
+        self.init_board(first_index)
+        self.game_status = 1
+
+    def explore_mask(self, mask):
+        """
+        Explores the safe boxes of `mask`, and expands the zeros among them
+        like `Core.expand_zero`.
+        """
+        board = self.board
+        known_mask = self.known_mask
+        mask &= ~known_mask
+        explored_mask = mask
+        zero_mask = mask & self.zero_mask
+        while zero_mask:
+            known_mask |= mask
+            mask = board.dilate(zero_mask) & ~known_mask
+            explored_mask |= mask
+            zero_mask = mask & self.zero_mask
+        self.explored_mask |= explored_mask
+        self.known_mask |= explored_mask
+        self.num_unknown_boxes -= popcount(explored_mask)
+
+    def flag_mask_boxes(self, mask):
+        mask &= ~self.known_mask
+        self.flag_mask |= mask
+        self.known_mask |= mask
+        num_flags = popcount(mask)
+        self.num_unknown_boxes -= num_flags
+        self.num_unknown_mines -= num_flags
+
+    def exploit_step(self, step):
+        self.num_steps += 1
+        index, step_mode = step
+        if self.record_steps:
+            self.step_index_list.append(index)
+            self.step_mode_list.append(step_mode)
+        box_mask = 1 << index
+        if step_mode == 0 or step_mode == 3:
+            if step_mode == 3:
+                self.num_random_steps += 1
+            if box_mask & self.mine_mask:
+                self.game_status = 3
+            else:
+                self.explore_mask(box_mask)
+        elif step_mode == 1:
+            surrounding_mask = self.board.dilate(box_mask) & ~self.known_mask
+            if surrounding_mask & self.mine_mask:
+                self.game_status = 3
+            else:
+                self.explore_mask(surrounding_mask)
+        elif step_mode == 2:
+            self.flag_mask_boxes(box_mask)
+        self.check_if_win()
+
+    def check_if_win(self):
+        if self.game_status == 1 \
+                and self.num_unknown_boxes == self.num_unknown_mines:
+            self.flag_mask_boxes(self.board.full_mask & ~self.known_mask)
+            self.game_status = 2
+
+    def is_stale(self, step):
+        index, step_mode = step
+        if step_mode == 1:
+            return not self.board.dilate(1 << index) & ~self.known_mask
+        return self.known_mask >> index & 1 == 1
+
+    def infer_single_boxes(self, unknown_planes, flag_planes):
+        """
+        Queues the boxes all of whose mines are flagged to be explored
+        around, and the unknown boxes around boxes whose unknown boxes must
+        all be mines to be flagged.
+        """
+        board = self.board
+        unknown_mask = board.full_mask & ~self.known_mask
+        valuable_mask = 0
+        for plane in unknown_planes:
+            valuable_mask |= plane
+        valuable_mask &= self.explored_mask
+        if not valuable_mask:
+            return
+        satisfied_mask = valuable_mask & board.equal_planes(
+            flag_planes, self.number_planes
+        )
+        filled_mask = valuable_mask & board.equal_planes(
+            BitBoard.add_planes(flag_planes, unknown_planes),
+            self.number_planes
+        )
+        for index in iter_bits(satisfied_mask):
+            self.cached_steps.append((index, 1))
+        for index in iter_bits(board.dilate(filled_mask) & unknown_mask):
+            self.cached_steps.append((index, 2))
+
+    def infer_box_pairs(self, unknown_planes, flag_planes):
+        """
+        For each box a and each box b within 2 layers, if
+            number(a) - number(b)
+                == unknown(around a but not b) + flags(a) - flags(b),
+        the unknown boxes around a but not b are mines, and the unknown
+        boxes around b but not a are safe. The equation is tested with both
+        sides made nonnegative.
+        """
+        board = self.board
+        unknown_mask = board.full_mask & ~self.known_mask
+        valuable_mask = 0
+        for plane in unknown_planes:
+            valuable_mask |= plane
+        valuable_mask &= self.explored_mask
+        if not valuable_mask:
+            return
+        number_planes = self.number_planes
+        mine_mask = 0
+        safe_mask = 0
+        for (dx, dy), (suburb_offsets, other_suburb_offsets) in \
+                board.suburb_offsets.items():
+            pair_mask = valuable_mask & board.shift(valuable_mask, -dx, -dy)
+            if not pair_mask:
+                continue
+            left_planes = BitBoard.add_planes(
+                number_planes, board.shift_planes(flag_planes, -dx, -dy)
+            )
+            right_planes = BitBoard.add_planes(
+                BitBoard.add_planes(
+                    board.count_by(unknown_mask, suburb_offsets), flag_planes
+                ),
+                board.shift_planes(number_planes, -dx, -dy)
+            )
+            pair_mask &= board.equal_planes(left_planes, right_planes)
+            if pair_mask:
+                mine_mask |= board.dilate_by(pair_mask, suburb_offsets)
+                safe_mask |= board.dilate_by(pair_mask, other_suburb_offsets)
+        for index in iter_bits(safe_mask & unknown_mask):
+            self.cached_steps.append((index, 0))
+        for index in iter_bits(mine_mask & unknown_mask):
+            self.cached_steps.append((index, 2))
+
+    def infer(self):
+        unknown_mask = self.board.full_mask & ~self.known_mask
+        unknown_planes = self.board.count_surrounding(unknown_mask)
+        flag_planes = self.board.count_surrounding(self.flag_mask)
+        self.infer_single_boxes(unknown_planes, flag_planes)
+        if not self.cached_steps:
+            self.infer_box_pairs(unknown_planes, flag_planes)
+
+    def make_random_choice(self):
+        blank_indexes = list(
+            iter_bits(self.board.full_mask & ~self.known_mask)
+        )
+        random_index = random.choice(blank_indexes)
+        self.previous_index = random_index
+        random_step = (random_index, 3)
+        return random_step
+
+    def make_choice(self):
+        cached_steps = self.cached_steps
+        while cached_steps and self.is_stale(cached_steps[0]):
+            cached_steps.popleft()
+        if not cached_steps:
+            self.infer()
+            while cached_steps and self.is_stale(cached_steps[0]):
+                cached_steps.popleft()
+        if cached_steps:
+            next_step = cached_steps.popleft()
+            self.previous_index = next_step[0]
+            return next_step
+        return self.make_random_choice()
+
+    def make_first_choice_index(self):
+        first_index = self.map_width // 2 \
+            + self.map_width * (self.map_height // 2)
+        self.previous_index = first_index
+        return first_index
+
+    def on_playing(self):
+        first_index = self.make_first_choice_index()
+        self.start(first_index)
+        first_step = (first_index, 0)
+        self.exploit_step(first_step)
+        while self.game_status == 1:
+            next_step = self.make_choice()
+            self.exploit_step(next_step)
+
+    def run(self):
+        begin_time = time.time()
+        self.on_playing()
+        end_time = time.time()
+        self.time_used = end_time - begin_time
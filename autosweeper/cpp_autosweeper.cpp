@@ -4,6 +4,249 @@
 using namespace std;
 
 
+Profile::Profile():
+	phase_times(),
+	counts()
+{}
+
+void Profile::merge(const Profile &other) {
+	for (int i = 0; i < NUM_PROFILE_PHASES; ++i) {
+		phase_times[i] += other.phase_times[i];
+	}
+	for (int i = 0; i < NUM_PROFILE_COUNTERS; ++i) {
+		counts[i] += other.counts[i];
+	}
+}
+
+void Profile::clear() {
+	fill(phase_times, phase_times + NUM_PROFILE_PHASES, 0);
+	fill(counts, counts + NUM_PROFILE_COUNTERS, 0);
+}
+
+
+const char *Profiler::ENABLED_VAR("AUTOSWEEPER_PROFILE");
+const bool Profiler::enabled(Profiler::get_enabled());
+thread_local Profile Profiler::profile;
+thread_local int Profiler::current_phase(-1);
+thread_local long long Profiler::mark_time(0);
+
+const bool Profiler::get_enabled() {
+	const char *value(getenv(ENABLED_VAR));
+	return value != nullptr && *value != '\0' && strcmp(value, "0") != 0;
+}
+
+const long long Profiler::get_time_ns() {
+	return chrono::duration_cast<chrono::nanoseconds>(chrono::steady_clock::now().time_since_epoch()).count();
+}
+
+void Profiler::count(int counter) {
+	if (enabled) {
+		++profile.counts[counter];
+	}
+}
+
+
+PhaseTimer::PhaseTimer(int phase):
+	previous_phase(-1)
+{
+	if (!Profiler::enabled) {
+		return;
+	}
+	long long now(Profiler::get_time_ns());
+	previous_phase = Profiler::current_phase;
+	if (previous_phase != -1) {
+		Profiler::profile.phase_times[previous_phase] += now - Profiler::mark_time;
+	}
+	Profiler::current_phase = phase;
+	Profiler::mark_time = now;
+}
+
+PhaseTimer::~PhaseTimer() {
+	if (!Profiler::enabled) {
+		return;
+	}
+	long long now(Profiler::get_time_ns());
+	Profiler::profile.phase_times[Profiler::current_phase] += now - Profiler::mark_time;
+	Profiler::current_phase = previous_phase;
+	Profiler::mark_time = now;
+}
+
+
+SpiralTable::SpiralTable(int mw, int mh):
+	map_width(mw),
+	map_height(mh),
+	max_layer(max(mw, mh) - 1),
+	sides()
+{
+	sides.reserve(4 * max_layer);
+	for (int l = 1; l <= max_layer; ++l) {
+		const int side_params[4][4] = {
+			{l, 1 - l, 0, 1},
+			{l - 1, l, -1, 0},
+			{-l, l - 1, 0, -1},
+			{1 - l, -l, 1, 0}
+		};
+		for (const int (&p)[4] : side_params) {
+			sides.push_back({p[0], p[1], p[2], p[3], p[0] + map_width * p[1], p[2] + map_width * p[3]});
+		}
+	}
+}
+
+const shared_ptr<const SpiralTable> SpiralTable::get(int mw, int mh) {
+	static map<pair<int, int>, shared_ptr<const SpiralTable>> tables;
+	static mutex tables_mutex;
+	lock_guard<mutex> lock(tables_mutex);
+	shared_ptr<const SpiralTable> &table(tables[{mw, mh}]);
+	if (!table) {
+		table = make_shared<const SpiralTable>(mw, mh);
+	}
+	return table;
+}
+
+void SpiralTable::clip_side(int begin_val, int direction, int side_length, int limit, int &begin, int &end) {
+	if (direction == 1) {
+		begin = max(0, -begin_val);
+		end = min(side_length, limit - begin_val);
+	} else {
+		begin = max(0, begin_val - limit + 1);
+		end = min(side_length, begin_val + 1);
+	}
+}
+
+const SpiralSide &SpiralTable::get_side(int layer, int side_index) const {
+	return sides[4 * (layer - 1) + side_index];
+}
+
+
+const int *IndexRange::begin() const {
+	return first;
+}
+
+const int *IndexRange::end() const {
+	return last;
+}
+
+const int IndexRange::size() const {
+	return static_cast<int>(last - first);
+}
+
+
+const int SurroundingTable::MAX_CACHED_TABLES(8);
+
+SurroundingTable::SurroundingTable(Core &core, int l):
+	map_width(core.map_width),
+	map_height(core.map_height),
+	layer(l),
+	offsets(),
+	indexes()
+{
+	offsets.reserve(core.num_boxes + 1);
+	offsets.push_back(0);
+	for (int i = 0; i < core.num_boxes; ++i) {
+		vector<int> row_indexes(core.get_surrounding_indexes(i, layer));
+		indexes.insert(indexes.end(), row_indexes.cbegin(), row_indexes.cend());
+		offsets.push_back(static_cast<int>(indexes.size()));
+	}
+}
+
+const shared_ptr<const SurroundingTable> SurroundingTable::get(Core &core, int l) {
+	static list<shared_ptr<const SurroundingTable>> tables;
+	static mutex tables_mutex;
+	lock_guard<mutex> lock(tables_mutex);
+	for (auto iter = tables.begin(); iter != tables.end(); ++iter) {
+		const SurroundingTable &table(**iter);
+		if (table.map_width == core.map_width && table.map_height == core.map_height && table.layer == l) {
+			tables.splice(tables.begin(), tables, iter);
+			return tables.front();
+		}
+	}
+	tables.push_front(make_shared<const SurroundingTable>(core, l));
+	if (static_cast<int>(tables.size()) > MAX_CACHED_TABLES) {
+		tables.pop_back();
+	}
+	return tables.front();
+}
+
+const IndexRange SurroundingTable::row(int index) const {
+	return {indexes.data() + offsets[index], indexes.data() + offsets[index + 1]};
+}
+
+
+const int PairTable::MAX_DISTANCE(3);
+const int PairTable::MAX_CACHED_TABLES(8);
+
+PairTable::PairTable(Core &core):
+	map_width(core.map_width),
+	map_height(core.map_height),
+	num_position_classes(0),
+	row_firsts(),
+	pairs(),
+	offsets()
+{
+	const int num_distances(MAX_DISTANCE + 1);
+	vector<int> class_firsts(num_distances * num_distances * num_distances * num_distances, -1);
+	row_firsts.reserve(core.num_boxes);
+	for (int i = 0; i < core.num_boxes; ++i) {
+		int x(i % map_width);
+		int y(i / map_width);
+		int class_key(min(x, MAX_DISTANCE));
+		class_key = class_key * num_distances + min(map_width - 1 - x, MAX_DISTANCE);
+		class_key = class_key * num_distances + min(y, MAX_DISTANCE);
+		class_key = class_key * num_distances + min(map_height - 1 - y, MAX_DISTANCE);
+		if (class_firsts[class_key] == -1) {
+			class_firsts[class_key] = static_cast<int>(pairs.size());
+			++num_position_classes;
+			IndexRange surrounding0(core.surrounding_table->row(i));
+			for (int j : core.sub_surrounding_table->row(i)) {
+				IndexRange surrounding1(core.surrounding_table->row(j));
+				PairOffsets pair_offsets;
+				pair_offsets.first = static_cast<int>(offsets.size());
+				for (int k : core.get_union(surrounding0, surrounding1)) {
+					offsets.push_back(k - i);
+				}
+				pair_offsets.suburb0_first = static_cast<int>(offsets.size());
+				for (int k : core.get_difference(surrounding0, surrounding1)) {
+					offsets.push_back(k - i);
+				}
+				pair_offsets.suburb1_first = static_cast<int>(offsets.size());
+				for (int k : core.get_difference(surrounding1, surrounding0)) {
+					offsets.push_back(k - i);
+				}
+				pair_offsets.last = static_cast<int>(offsets.size());
+				pairs.push_back(pair_offsets);
+			}
+		}
+		row_firsts.push_back(class_firsts[class_key]);
+	}
+}
+
+const shared_ptr<const PairTable> PairTable::get(Core &core) {
+	static list<shared_ptr<const PairTable>> tables;
+	static mutex tables_mutex;
+	lock_guard<mutex> lock(tables_mutex);
+	for (auto iter = tables.begin(); iter != tables.end(); ++iter) {
+		const PairTable &table(**iter);
+		if (table.map_width == core.map_width && table.map_height == core.map_height) {
+			tables.splice(tables.begin(), tables, iter);
+			return tables.front();
+		}
+	}
+	tables.push_front(make_shared<const PairTable>(core));
+	if (static_cast<int>(tables.size()) > MAX_CACHED_TABLES) {
+		tables.pop_back();
+	}
+	return tables.front();
+}
+
+const PairOffsets *PairTable::row(int index) const {
+	return pairs.data() + row_firsts[index];
+}
+
+const IndexRange PairTable::range(int first, int last) const {
+	return {offsets.data() + first, offsets.data() + last};
+}
+
+
 Core::Core() = default;
 
 Core::Core(int mw, int mh, int nm):
@@ -23,49 +266,73 @@ Core::Core(int mw, int mh, int nm):
 	previous_index(),
 	time_used(),
 
-	surrounding_indexes(vector<vector<int>>(num_boxes)),
-	sub_surrounding_indexes(vector<vector<int>>(num_boxes)),
+	surrounding_table(),
+	sub_surrounding_table(),
+	box_marks(vector<char>(num_boxes, 0)),
 
+	spiral_table(SpiralTable::get(mw, mh)),
 	trace_lock(false),
-	layer(),
+	trace_center(),
+	trace_max_layer(),
+	trace_layer(),
+	trace_side_index(),
+	trace_remaining(),
+	trace_step(),
 	x0(),
 	y0(),
-	dx(),
-	dy(),
-	next_coord(),
 	next_index()
 {
-	init_surrounding_indexes();
+	surrounding_table = SurroundingTable::get(*this, 1);
+	sub_surrounding_table = SurroundingTable::get(*this, 2);
 }
 
 Core::~Core() = default;
 
-void Core::init_surrounding_indexes() {
-	for (int i = 0; i < num_boxes; ++i) {
-		surrounding_indexes[i] = get_surrounding_indexes(i);
-		sub_surrounding_indexes[i] = get_surrounding_indexes(i, 2);
-	}
+void Core::reset() {
+	num_unknown_boxes = num_boxes;
+	num_unknown_mines = num_mines;
+	fill(mine_indexes.begin(), mine_indexes.end(), -1);
+	fill(base_map.begin(), base_map.end(), 0);
+	fill(view_map.begin(), view_map.end(), 9);
+
+	game_status = 0;
+	num_steps = 0;
+	num_random_steps = 0;
+	previous_index = 0;
+	time_used = 0.0;
 }
 
-const vector<int> Core::get_union(const vector<int> &list0, const vector<int> &list1) const {
+const vector<int> Core::get_union(const IndexRange &list0, const IndexRange &list1) const {
 	vector<int> result;
 	result.reserve(min(list0.size(), list1.size()));
+	for (int i : list1) {
+		box_marks[i] = 1;
+	}
 	for (int i : list0) {
-		if (contains(i, list1)) {
+		if (box_marks[i]) {
 			result.push_back(i);
 		}
 	}
+	for (int i : list1) {
+		box_marks[i] = 0;
+	}
 	return result;
 }
 
-const vector<int> Core::get_difference(const vector<int> &list0, const vector<int> &list1) const {
+const vector<int> Core::get_difference(const IndexRange &list0, const IndexRange &list1) const {
 	vector<int> result;
 	result.reserve(list0.size());
+	for (int i : list1) {
+		box_marks[i] = 1;
+	}
 	for (int i : list0) {
-		if (!contains(i, list1)) {
+		if (!box_marks[i]) {
 			result.push_back(i);
 		}
 	}
+	for (int i : list1) {
+		box_marks[i] = 0;
+	}
 	return result;
 }
 
@@ -86,36 +353,55 @@ const bool Core::in_map(const coord_t &coord) const {
 void Core::set_spiral_trace_generator(int center_index, int l) {
 	assert(!trace_lock);
 	trace_lock = true;
-	layer = l;
 	x0 = center_index % map_width;
 	y0 = center_index / map_width;
-	dx = 0;
-	dy = 0;
-	coord_t next_coord = index_to_coord(center_index);
 	if (l == -1) {
-		layer = max_of({x0, map_width - x0 - 1, y0, map_height - y0 - 1});
+		l = max_of({x0, map_width - x0 - 1, y0, map_height - y0 - 1});
 	}
+	trace_center = center_index;
+	trace_max_layer = min(l, spiral_table->max_layer);
+	trace_layer = 0;
+	trace_side_index = 3;
+	trace_remaining = 1;
+	trace_step = 0;
 	next_index = center_index;
 }
 
 void Core::move_to_next_index() {
-	do {
-		if (dx + dy <= 0 && dx - dy >= 0) {
-			++dx;
-		} else if (dx + dy > 0 && dx - dy <= 0) {
-			--dx;
-		} else if (dx + dy > 0 && dx - dy > 0) {
-			++dy;
-		} else if (dx + dy <= 0 && dx - dy < 0) {
-			--dy;
-		}
-		if (max(abs(dx), abs(dy)) > layer) {
-			next_index = -1;
+	if (--trace_remaining > 0) {
+		next_index += trace_step;
+		return;
+	}
+	int begin, end;
+	while (true) {
+		if (++trace_side_index == 4) {
+			trace_side_index = 0;
+			if (++trace_layer > trace_max_layer) {
+				next_index = -1;
+				return;
+			}
+		}
+		const SpiralSide &side(spiral_table->get_side(trace_layer, trace_side_index));
+		int x(x0 + side.x);
+		int y(y0 + side.y);
+		if (side.dx == 0) {
+			if (x < 0 || x >= map_width) {
+				continue;
+			}
+			SpiralTable::clip_side(y, side.dy, 2 * trace_layer, map_height, begin, end);
+		} else {
+			if (y < 0 || y >= map_height) {
+				continue;
+			}
+			SpiralTable::clip_side(x, side.dx, 2 * trace_layer, map_width, begin, end);
+		}
+		if (begin < end) {
+			trace_remaining = end - begin;
+			trace_step = side.step;
+			next_index = trace_center + side.offset + begin * side.step;
 			return;
 		}
-		next_coord = {x0 + dx, y0 + dy};
-	} while (!in_map(next_coord));
-	next_index = coord_to_index(next_coord);
+	}
 }
 
 void Core::unlock_spiral_trace_generator() {
@@ -141,34 +427,55 @@ const vector<int> Core::get_surrounding_indexes(int index, int layer) {
 	return result;
 }
 
+const int Core::get_num_surrounding_indexes(int index) const {
+	return surrounding_table->row(index).size();
+}
+
 const vector<int> Core::get_common_indexes(int index0, int index1) const {
-	vector<int> surrounding0(surrounding_indexes[index0]);
-	vector<int> surrounding1(surrounding_indexes[index1]);
+	IndexRange surrounding0(surrounding_table->row(index0));
+	IndexRange surrounding1(surrounding_table->row(index1));
 	vector<int> result(get_union(surrounding0, surrounding1));
 	return result;
 }
 
 const vector<int> Core::get_suburb_indexes(int index0, int index1) const {
-	vector<int> surrounding0(surrounding_indexes[index0]);
-	vector<int> surrounding1(surrounding_indexes[index1]);
+	IndexRange surrounding0(surrounding_table->row(index0));
+	IndexRange surrounding1(surrounding_table->row(index1));
 	vector<int> result(get_difference(surrounding0, surrounding1));
 	return result;
 }
 
-const vector<int> Core::indexes_ordered_in_spiral(int index, vector<int> index_list) {
-	set_spiral_trace_generator(index);
-	vector<int> result;
-	result.reserve(index_list.size());
-	vector<int>::const_iterator find_result;
-	while (index_list.size()) {
-		if (contains(next_index, index_list, find_result)) {
-			index_list.erase(find_result);
-			result.push_back(next_index);
-		}
-		move_to_next_index();
+const int Core::get_spiral_rank(int center_index, int index) const {
+	int dx(index % map_width - center_index % map_width);
+	int dy(index / map_width - center_index / map_width);
+	int l(max(abs(dx), abs(dy)));
+	if (l == 0) {
+		return 0;
 	}
-	unlock_spiral_trace_generator();
-	return result;
+	int position;
+	if (dx == l && dy > -l) {
+		position = dy + l - 1;
+	} else if (dy == l) {
+		position = 3 * l - 1 - dx;
+	} else if (dx == -l) {
+		position = 5 * l - 1 - dy;
+	} else {
+		position = 7 * l - 1 + dx;
+	}
+	return (2 * l - 1) * (2 * l - 1) + position;
+}
+
+const vector<int> Core::indexes_ordered_in_spiral(int index, vector<int> index_list) const {
+	vector<pair<int, int>> ranked_indexes;
+	ranked_indexes.reserve(index_list.size());
+	for (int i : index_list) {
+		ranked_indexes.push_back({get_spiral_rank(index, i), i});
+	}
+	sort(ranked_indexes.begin(), ranked_indexes.end());
+	for (int k = 0; k < static_cast<int>(ranked_indexes.size()); ++k) {
+		index_list[k] = ranked_indexes[k].second;
+	}
+	return index_list;
 }
 
 void Core::init_mine_indexes(int first_index) {
@@ -183,7 +490,7 @@ void Core::init_mine_indexes(int first_index) {
 	if (map_index_choices.size() < num_mines) {
 		raise_init_mine_map_error();
 	}
-	mine_indexes = random::random_choices(map_index_choices, num_mines);
+	mine_indexes = rng::random_choices(map_index_choices, num_mines);
 }
 
 void Core::init_base_map() {
@@ -191,7 +498,7 @@ void Core::init_base_map() {
 		base_map[mine_index] = -1;
 	}
 	for (int mine_index : mine_indexes) {
-		for (int i : surrounding_indexes[mine_index]) {
+		for (int i : surrounding_table->row(mine_index)) {
 			if (base_map[i] != -1) {
 				++base_map[i];
 			}
@@ -208,28 +515,28 @@ void Core::reduce_num_unknown_mines() {
 }
 
 void Core::expand_zero(int index) {
-	vector<int> pre_updated_zero_region;
-	vector<int> zero_region {index};
-	vector<int> zero_region_difference;
-	while (pre_updated_zero_region.size() != zero_region.size()) {
-		zero_region_difference = get_difference(zero_region, pre_updated_zero_region);
-		pre_updated_zero_region = zero_region;
-		for (int i : zero_region_difference) {
-			for (int j : surrounding_indexes[i]) {
-				if (base_map[j] == 0 && !contains(j, zero_region)) {
-					zero_region.push_back(j);
-				}
+	PhaseTimer timer(EXPAND_PHASE);
+	vector<int> zero_queue {index};
+	vector<int> expand_region {index};
+	box_marks[index] = 1;
+	for (int k = 0; k < static_cast<int>(zero_queue.size()); ++k) {
+		for (int j : surrounding_table->row(zero_queue[k])) {
+			if (box_marks[j]) {
+				continue;
 			}
-		}
-	}
-	vector<int> expand_region(zero_region);
-	for (int i : zero_region) {
-		for (int j : surrounding_indexes[i]) {
-			if (view_map[j] == 9 && !contains(j, expand_region)) {
+			if (base_map[j] == 0) {
+				box_marks[j] = 1;
+				zero_queue.push_back(j);
+				expand_region.push_back(j);
+			} else if (view_map[j] == 9) {
+				box_marks[j] = 1;
 				expand_region.push_back(j);
 			}
 		}
 	}
+	for (int i : expand_region) {
+		box_marks[i] = 0;
+	}
 	for (int i : indexes_ordered_in_spiral(index, expand_region)) {
 		explore_single_safe_box(i);
 	}
@@ -241,7 +548,7 @@ void Core::explore_single_safe_box(int index) {
 }
 
 void Core::explore_surrounding(int index) {
-	vector<int> indexes(surrounding_indexes[index]);
+	IndexRange indexes(surrounding_table->row(index));
 	int flags_count(0);
 	for (int i : indexes) {
 		if (view_map[i] == 10) {
@@ -316,6 +623,7 @@ void Core::exploit_step(const step_t &step) {
 }
 
 void Core::start(int first_index) {
+	PhaseTimer timer(START_PHASE);
 	init_mine_indexes(first_index);
 	init_base_map();
 	game_status = 1;
@@ -353,13 +661,13 @@ void Core::win() {
 }
 
 void Core::check_if_win() {
-	int mines_count(static_cast<int>(count(view_map.cbegin(), view_map.cend(), 9)));
-	if (game_status == 1 && mines_count == num_unknown_mines) {
+	if (game_status == 1 && num_unknown_boxes == num_unknown_mines) {
 		win();
 	}
 }
 
 void Core::run() {
+	PhaseTimer timer(OTHER_PHASE);
 	double begin_time(get_current_time());
 	on_playing();
 	double end_time(get_current_time());
@@ -367,31 +675,509 @@ void Core::run() {
 }
 
 
+ComponentSearch::ComponentSearch(int num_variables, const constraints_t &constraints):
+	groups(),
+	needs(),
+	rests(),
+	group_mines(),
+	num_nodes(),
+	solutions()
+{
+	vector<vector<int>> variable_signatures(num_variables);
+	for (int c = 0; c < static_cast<int>(constraints.size()); ++c) {
+		for (int i : constraints[c].first) {
+			variable_signatures[i].push_back(c);
+		}
+		needs.push_back(constraints[c].second);
+		rests.push_back(static_cast<int>(constraints[c].first.size()));
+	}
+	map<vector<int>, int> group_indexes;
+	for (int i = 0; i < num_variables; ++i) {
+		auto iter = group_indexes.find(variable_signatures[i]);
+		if (iter == group_indexes.end()) {
+			group_indexes[variable_signatures[i]] = static_cast<int>(groups.size());
+			groups.push_back({variable_signatures[i], {i}});
+		} else {
+			groups[iter->second].second.push_back(i);
+		}
+	}
+	group_mines = vector<int>(groups.size());
+}
+
+void ComponentSearch::record_solution(int num_mines, double weight) {
+	auto iter = solutions.find(num_mines);
+	if (iter == solutions.end()) {
+		iter = solutions.insert({num_mines, {0.0, vector<double>(groups.size())}}).first;
+	}
+	iter->second.first += weight;
+	for (int g = 0; g < static_cast<int>(groups.size()); ++g) {
+		iter->second.second[g] += weight * group_mines[g];
+	}
+}
+
+const bool ComponentSearch::backtrack(int group_index, int num_mines, double weight) {
+	if (++num_nodes > ProbabilitySolver::MAX_SEARCH_NODES) {
+		return false;
+	}
+	if (group_index == static_cast<int>(groups.size())) {
+		record_solution(num_mines, weight);
+		return true;
+	}
+	const vector<int> &signature(groups[group_index].first);
+	int group_size(static_cast<int>(groups[group_index].second.size()));
+	for (int c : signature) {
+		rests[c] -= group_size;
+	}
+	bool completed(true);
+	for (int group_num_mines = 0; completed && group_num_mines <= group_size; ++group_num_mines) {
+		bool consistent(true);
+		for (int c : signature) {
+			int need(needs[c] - group_num_mines);
+			if (need < 0 || need > rests[c]) {
+				consistent = false;
+				break;
+			}
+		}
+		if (!consistent) {
+			continue;
+		}
+		for (int c : signature) {
+			needs[c] -= group_num_mines;
+		}
+		group_mines[group_index] = group_num_mines;
+		completed = backtrack(group_index + 1, num_mines + group_num_mines, weight * ProbabilitySolver::choose(group_size, group_num_mines));
+		for (int c : signature) {
+			needs[c] += group_num_mines;
+		}
+	}
+	for (int c : signature) {
+		rests[c] += group_size;
+	}
+	return completed;
+}
+
+const shared_ptr<const solutions_t> ComponentSearch::get_solutions(int num_variables) const {
+	shared_ptr<solutions_t> result(make_shared<solutions_t>());
+	for (const auto &item : solutions) {
+		vector<double> mine_counts(num_variables);
+		for (int g = 0; g < static_cast<int>(groups.size()); ++g) {
+			const vector<int> &positions(groups[g].second);
+			for (int i : positions) {
+				mine_counts[i] = item.second.second[g] / positions.size();
+			}
+		}
+		(*result)[item.first] = {item.second.first, mine_counts};
+	}
+	return result;
+}
+
+
+const int ProbabilitySolver::MAX_COMPONENT_SIZE(48);
+const int ProbabilitySolver::MAX_SEARCH_NODES(200000);
+const int ProbabilitySolver::MAX_CACHED_COMPONENTS(4096);
+
+map<constraints_t, shared_ptr<const solutions_t>> &ProbabilitySolver::get_component_cache() {
+	static thread_local map<constraints_t, shared_ptr<const solutions_t>> component_cache;
+	return component_cache;
+}
+
+const double ProbabilitySolver::choose(int n, int k) {
+	double result(1.0);
+	for (int i = 1; i <= k; ++i) {
+		result = result * (n - k + i) / i;
+	}
+	return result;
+}
+
+const constraints_t ProbabilitySolver::get_constraints(const Logic &game) {
+	constraints_t constraints;
+	for (int index = 0; index < game.num_boxes; ++index) {
+		if (!game.frontier_marks[index]) {
+			continue;
+		}
+		vector<int> variables;
+		for (int i : game.surrounding_table->row(index)) {
+			if (game.view_map[i] == 9) {
+				variables.push_back(i);
+			}
+		}
+		constraints.push_back({variables, game.base_map[index] - game.flags_map[index]});
+	}
+	return constraints;
+}
+
+const vector<constraints_t> ProbabilitySolver::split_components(const constraints_t &constraints) {
+	map<int, int> parents;
+	auto find = [&parents](int i) {
+		while (parents[i] != i) {
+			parents[i] = parents[parents[i]];
+			i = parents[i];
+		}
+		return i;
+	};
+	for (const auto &constraint : constraints) {
+		for (int i : constraint.first) {
+			parents.insert({i, i});
+		}
+		int root(find(constraint.first[0]));
+		for (int i : constraint.first) {
+			int other_root(find(i));
+			if (other_root != root) {
+				parents[other_root] = root;
+			}
+		}
+	}
+	map<int, int> component_indexes;
+	vector<constraints_t> components;
+	for (const auto &constraint : constraints) {
+		int root(find(constraint.first[0]));
+		auto iter = component_indexes.find(root);
+		if (iter == component_indexes.end()) {
+			component_indexes[root] = static_cast<int>(components.size());
+			components.push_back({constraint});
+		} else {
+			components[iter->second].push_back(constraint);
+		}
+	}
+	return components;
+}
+
+const vector<int> ProbabilitySolver::order_variables(const constraints_t &constraints) {
+	map<int, set<int>> neighbours;
+	for (const auto &constraint : constraints) {
+		for (int i : constraint.first) {
+			neighbours[i].insert(constraint.first.cbegin(), constraint.first.cend());
+		}
+	}
+	int first_index(neighbours.cbegin()->first);
+	vector<int> ordered_variables({first_index});
+	set<int> visited({first_index});
+	for (int k = 0; k < static_cast<int>(ordered_variables.size()); ++k) {
+		for (int i : neighbours[ordered_variables[k]]) {
+			if (visited.insert(i).second) {
+				ordered_variables.push_back(i);
+			}
+		}
+	}
+	return ordered_variables;
+}
+
+const shared_ptr<const solutions_t> ProbabilitySolver::solve_component(const constraints_t &constraints, vector<int> &variables) {
+	variables = order_variables(constraints);
+	int num_variables(static_cast<int>(variables.size()));
+	if (num_variables > MAX_COMPONENT_SIZE) {
+		return nullptr;
+	}
+	map<int, int> positions;
+	for (int k = 0; k < num_variables; ++k) {
+		positions[variables[k]] = k;
+	}
+	constraints_t normalized_constraints;
+	for (const auto &constraint : constraints) {
+		vector<int> constraint_positions;
+		for (int i : constraint.first) {
+			constraint_positions.push_back(positions[i]);
+		}
+		sort(constraint_positions.begin(), constraint_positions.end());
+		normalized_constraints.push_back({constraint_positions, constraint.second});
+	}
+	sort(normalized_constraints.begin(), normalized_constraints.end());
+	map<constraints_t, shared_ptr<const solutions_t>> &component_cache(get_component_cache());
+	auto iter = component_cache.find(normalized_constraints);
+	if (iter != component_cache.end()) {
+		return iter->second;
+	}
+	if (static_cast<int>(component_cache.size()) >= MAX_CACHED_COMPONENTS) {
+		component_cache.clear();
+	}
+	ComponentSearch search(num_variables, normalized_constraints);
+	shared_ptr<const solutions_t> solutions;
+	if (search.backtrack(0, 0, 1.0)) {
+		solutions = search.get_solutions(num_variables);
+	}
+	component_cache[normalized_constraints] = solutions;
+	return solutions;
+}
+
+const map<int, double> ProbabilitySolver::convolve(const map<int, double> &distribution0, const map<int, double> &distribution1) {
+	map<int, double> result;
+	for (const auto &item0 : distribution0) {
+		for (const auto &item1 : distribution1) {
+			result[item0.first + item1.first] += item0.second * item1.second;
+		}
+	}
+	return result;
+}
+
+const int ProbabilitySolver::solve(const Logic &game, vector<int> &safe_indexes, vector<int> &mine_indexes) {
+	vector<component_t> solved_components;
+	bool all_solved(true);
+	for (const constraints_t &constraints : split_components(get_constraints(game))) {
+		vector<int> variables;
+		shared_ptr<const solutions_t> solutions(solve_component(constraints, variables));
+		if (solutions) {
+			solved_components.push_back({variables, solutions});
+		} else {
+			all_solved = false;
+		}
+	}
+	if (!all_solved) {
+		return get_local_deductions(solved_components, safe_indexes, mine_indexes);
+	}
+	return get_global_solution(game, solved_components, safe_indexes, mine_indexes);
+}
+
+const int ProbabilitySolver::get_local_deductions(const vector<component_t> &components, vector<int> &safe_indexes, vector<int> &mine_indexes) {
+	for (const component_t &component : components) {
+		const vector<int> &variables(component.first);
+		double num_solutions_sum(0.0);
+		for (const auto &item : *component.second) {
+			num_solutions_sum += item.second.first;
+		}
+		for (int k = 0; k < static_cast<int>(variables.size()); ++k) {
+			double mine_count(0.0);
+			for (const auto &item : *component.second) {
+				mine_count += item.second.second[k];
+			}
+			if (mine_count == 0.0) {
+				safe_indexes.push_back(variables[k]);
+			} else if (mine_count == num_solutions_sum) {
+				mine_indexes.push_back(variables[k]);
+			}
+		}
+	}
+	return -1;
+}
+
+const int ProbabilitySolver::get_global_solution(const Logic &game, const vector<component_t> &components, vector<int> &safe_indexes, vector<int> &mine_indexes) {
+	int num_mines(game.num_unknown_mines);
+	vector<char> frontier_variable_marks(game.num_boxes);
+	for (const component_t &component : components) {
+		for (int i : component.first) {
+			frontier_variable_marks[i] = 1;
+		}
+	}
+	vector<int> outside_indexes;
+	for (int i = 0; i < game.num_boxes; ++i) {
+		if (game.view_map[i] == 9 && !frontier_variable_marks[i]) {
+			outside_indexes.push_back(i);
+		}
+	}
+	int num_outside(static_cast<int>(outside_indexes.size()));
+	// Ways to place the other mines outside the frontier, relative to the
+	// largest one, indexed by the number of mines on the frontier.
+	vector<double> outside_ways(num_mines + 1);
+	double max_log_ways(-HUGE_VAL);
+	for (int t = max(num_mines - num_outside, 0); t <= num_mines; ++t) {
+		outside_ways[t] = lgamma(num_outside + 1.0) - lgamma(num_mines - t + 1.0) - lgamma(num_outside - num_mines + t + 1.0);
+		max_log_ways = max(max_log_ways, outside_ways[t]);
+	}
+	for (int t = 0; t <= num_mines; ++t) {
+		outside_ways[t] = num_mines - t > num_outside ? 0.0 : exp(outside_ways[t] - max_log_ways);
+	}
+	auto get_num_outside_ways = [&outside_ways, num_mines](int num_frontier_mines) {
+		return num_frontier_mines > num_mines ? 0.0 : outside_ways[num_frontier_mines];
+	};
+	vector<map<int, double>> distributions;
+	for (const component_t &component : components) {
+		map<int, double> distribution;
+		for (const auto &item : *component.second) {
+			distribution[item.first] = item.second.first;
+		}
+		distributions.push_back(distribution);
+	}
+	int best_index(-1);
+	double best_probability(2.0);
+	for (int component_index = 0; component_index < static_cast<int>(components.size()); ++component_index) {
+		const vector<int> &variables(components[component_index].first);
+		const solutions_t &solutions(*components[component_index].second);
+		map<int, double> others_distribution({{0, 1.0}});
+		for (int other_index = 0; other_index < static_cast<int>(distributions.size()); ++other_index) {
+			if (other_index != component_index) {
+				others_distribution = convolve(others_distribution, distributions[other_index]);
+			}
+		}
+		map<int, double> weights;
+		double total_weight(0.0);
+		for (const auto &item : solutions) {
+			double weight(0.0);
+			for (const auto &other_item : others_distribution) {
+				weight += other_item.second * get_num_outside_ways(item.first + other_item.first);
+			}
+			weights[item.first] = weight;
+			total_weight += item.second.first * weight;
+		}
+		for (int k = 0; k < static_cast<int>(variables.size()); ++k) {
+			double mine_weight(0.0);
+			bool certain_mine(true);
+			for (const auto &item : solutions) {
+				mine_weight += item.second.second[k] * weights[item.first];
+				if (weights[item.first] > 0.0 && item.second.second[k] != item.second.first) {
+					certain_mine = false;
+				}
+			}
+			if (mine_weight == 0.0) {
+				safe_indexes.push_back(variables[k]);
+			} else if (certain_mine) {
+				mine_indexes.push_back(variables[k]);
+			} else if (mine_weight / total_weight < best_probability) {
+				best_index = variables[k];
+				best_probability = mine_weight / total_weight;
+			}
+		}
+	}
+	if (num_outside) {
+		map<int, double> total_distribution({{0, 1.0}});
+		for (const map<int, double> &distribution : distributions) {
+			total_distribution = convolve(total_distribution, distribution);
+		}
+		double total_weight(0.0);
+		double outside_mine_weight(0.0);
+		bool certain_mines(true);
+		for (const auto &item : total_distribution) {
+			double weight(item.second * get_num_outside_ways(item.first));
+			total_weight += weight;
+			outside_mine_weight += weight * (num_mines - item.first);
+			if (weight > 0.0 && num_mines - item.first != num_outside) {
+				certain_mines = false;
+			}
+		}
+		if (outside_mine_weight == 0.0) {
+			safe_indexes.insert(safe_indexes.end(), outside_indexes.cbegin(), outside_indexes.cend());
+		} else if (certain_mines) {
+			mine_indexes.insert(mine_indexes.end(), outside_indexes.cbegin(), outside_indexes.cend());
+		} else if (outside_mine_weight / (total_weight * num_outside) < best_probability) {
+			best_index = rng::random_choice(outside_indexes);
+		}
+	}
+	return best_index;
+}
+
+
+StepQueue::StepQueue() = default;
+
+StepQueue::StepQueue(int num_boxes):
+	steps(),
+	head(0),
+	queued_modes(vector<char>(num_boxes, 0))
+{}
+
+const int StepQueue::size() const {
+	return static_cast<int>(steps.size()) - head;
+}
+
+void StepQueue::push(int index, int step_mode) {
+	Profiler::count(QUEUE_PUSH_COUNTER);
+	char mode_bit(static_cast<char>(1 << step_mode));
+	if (!(queued_modes[index] & mode_bit)) {
+		queued_modes[index] |= mode_bit;
+		steps.push_back({index, step_mode});
+	}
+}
+
+const step_t StepQueue::pop() {
+	step_t step(steps[head++]);
+	queued_modes[step.first] ^= static_cast<char>(1 << step.second);
+	if (head == static_cast<int>(steps.size())) {
+		steps.clear();
+		head = 0;
+	}
+	return step;
+}
+
+void StepQueue::skip_stale_steps(const vector<int> &view_map) {
+	while (size() && view_map[steps[head].first] != 9) {
+		pop();
+	}
+}
+
+void StepQueue::clear() {
+	for (int i = head; i < static_cast<int>(steps.size()); ++i) {
+		queued_modes[steps[i].first] = 0;
+	}
+	steps.clear();
+	head = 0;
+}
+
+
+const int Logic::DIRTY_LAYER(3);
+
 Logic::Logic() = default;
 
-Logic::Logic(int mw, int mh, int nm):
+Logic::Logic(int mw, int mh, int nm, bool us):
 	Core(mw, mh, nm),
+	use_solver(us),
 	unknown_map(vector<int>(num_boxes)),
 	flags_map(vector<int>(num_boxes)),
-	cached_steps(list<step_t>())
+	cached_steps(StepQueue(num_boxes)),
+	frontier_marks(vector<char>(num_boxes)),
+	dirty_marks(vector<char>(num_boxes)),
+	dirty_indexes(vector<int>()),
+	pair_table()
 {
+	pair_table = PairTable::get(*this);
 	init_unknown_map();
 }
 
+void Logic::reset() {
+	Core::reset();
+	init_unknown_map();
+	fill(flags_map.begin(), flags_map.end(), 0);
+	cached_steps.clear();
+	fill(frontier_marks.begin(), frontier_marks.end(), 0);
+	fill(dirty_marks.begin(), dirty_marks.end(), 0);
+	dirty_indexes.clear();
+}
+
 void Logic::init_unknown_map() {
 	for (int i = 0; i < num_boxes; ++i) {
-		unknown_map[i] = static_cast<int>(surrounding_indexes[i].size());
+		unknown_map[i] = surrounding_table->row(i).size();
 	}
 }
 
 void Logic::modify_surrounding_unknown_map(int index) {
-	for (int i : surrounding_indexes[index]) {
-		--unknown_map[i];
+	for (int i : surrounding_table->row(index)) {
+		if (--unknown_map[i] == 0) {
+			frontier_marks[i] = 0;
+		}
 	}
 }
 
+void Logic::mark_dirty_region(int index) {
+	coord_t coord(index_to_coord(index));
+	int x_begin(max(coord.first - DIRTY_LAYER, 0));
+	int x_end(min(coord.first + DIRTY_LAYER + 1, map_width));
+	int y_begin(max(coord.second - DIRTY_LAYER, 0));
+	int y_end(min(coord.second + DIRTY_LAYER + 1, map_height));
+	for (int y = y_begin; y < y_end; ++y) {
+		for (int i = y * map_width + x_begin; i < y * map_width + x_end; ++i) {
+			if (!dirty_marks[i]) {
+				dirty_marks[i] = 1;
+				dirty_indexes.push_back(i);
+			}
+		}
+	}
+}
+
+const int Logic::update_dirty_indexes() {
+	auto iter = dirty_indexes.begin();
+	for (int i : dirty_indexes) {
+		if (dirty_marks[i] == 1 && frontier_marks[i]) {
+			dirty_marks[i] = 2;
+			*iter++ = i;
+		} else if (dirty_marks[i] != 2) {
+			dirty_marks[i] = 0;
+		}
+	}
+	dirty_indexes.erase(iter, dirty_indexes.end());
+	for (int i : dirty_indexes) {
+		dirty_marks[i] = 1;
+	}
+	return static_cast<int>(dirty_indexes.size());
+}
+
 void Logic::modify_surrounding_flags_map(int index) {
-	for (int i : surrounding_indexes[index]) {
+	for (int i : surrounding_table->row(index)) {
 		++flags_map[i];
 	}
 }
@@ -399,104 +1185,142 @@ void Logic::modify_surrounding_flags_map(int index) {
 void Logic::explore_single_safe_box(int index) {
 	Core::explore_single_safe_box(index);
 	modify_surrounding_unknown_map(index);
+	if (unknown_map[index] != 0) {
+		frontier_marks[index] = 1;
+	}
+	mark_dirty_region(index);
 }
 
 void Logic::flag_blank_box(int index) {
 	Core::flag_blank_box(index);
 	modify_surrounding_unknown_map(index);
 	modify_surrounding_flags_map(index);
+	mark_dirty_region(index);
 }
 
 const bool Logic::is_valuable(int index) const {
 	return unknown_map[index] != 0 && view_map[index] < 9;
 }
 
-void Logic::two_indexes_logic(int index0, int index1) {
+void Logic::two_indexes_logic(int index0, int index1, const PairOffsets &pair_offsets) {
+	PhaseTimer timer(INFERENCE_PHASE);
+	Profiler::count(PAIR_CHECK_COUNTER);
 	int num_common_unknown(0);
-	for (int i : get_common_indexes(index0, index1)) {
-		if (view_map[i] == 9) {
+	for (int offset : pair_table->range(pair_offsets.first, pair_offsets.suburb0_first)) {
+		if (view_map[index0 + offset] == 9) {
 			++num_common_unknown;
 		}
 	}
-	vector<int> suburb_indexes0(get_suburb_indexes(index0, index1));
-	vector<int> suburb_indexes1(get_suburb_indexes(index1, index0));
 	int num_unknown0(unknown_map[index0] - num_common_unknown);
 	if (base_map[index0] - base_map[index1] == num_unknown0 + flags_map[index0] - flags_map[index1]) {
-		for (int i : suburb_indexes0) {
-			if (view_map[i] == 9) {
-				cached_steps.push_back({i, 2});
+		for (int offset : pair_table->range(pair_offsets.suburb0_first, pair_offsets.suburb1_first)) {
+			if (view_map[index0 + offset] == 9) {
+				cached_steps.push(index0 + offset, 2);
 			}
 		}
-		for (int i : suburb_indexes1) {
-			if (view_map[i] == 9) {
-				cached_steps.push_back({i, 0});
+		for (int offset : pair_table->range(pair_offsets.suburb1_first, pair_offsets.last)) {
+			if (view_map[index0 + offset] == 9) {
+				cached_steps.push(index0 + offset, 0);
 			}
 		}
 	}
 }
 
 void Logic::infer_single_box(int index) {
+	PhaseTimer timer(INFERENCE_PHASE);
+	Profiler::count(INFERENCE_COUNTER);
 	if (!is_valuable(index)) {
 		return;
 	}
 	if (flags_map[index] == base_map[index]) {
-		cached_steps.push_back({index, 1});
+		cached_steps.push(index, 1);
 	}
 	if (unknown_map[index] + flags_map[index] == base_map[index]) {
-		for (int i : surrounding_indexes[index]) {
+		for (int i : surrounding_table->row(index)) {
 			if (view_map[i] == 9) {
-				cached_steps.push_back({i, 2});
+				cached_steps.push(i, 2);
 			}
 		}
 	}
-	vector<int> exp_indexes(sub_surrounding_indexes[index]);
-	for (int exp_index : exp_indexes) {
+	const PairOffsets *pair_offsets(pair_table->row(index));
+	for (int exp_index : sub_surrounding_table->row(index)) {
 		if (is_valuable(exp_index)) {
-			two_indexes_logic(index, exp_index);
+			two_indexes_logic(index, exp_index, *pair_offsets);
 		}
+		++pair_offsets;
 	}
 }
 
 const step_t Logic::make_random_choice() {
+	PhaseTimer timer(GUESS_PHASE);
 	vector<int> blank_indexes;
 	for (int i = 0; i < num_boxes; ++i) {
 		if (view_map[i] == 9) {
 			blank_indexes.push_back(i);
 		}
 	}
-	int random_index(random::random_choice(blank_indexes));
+	int random_index(rng::random_choice(blank_indexes));
 	previous_index = random_index;
 	step_t random_step {random_index, 3};
 	return random_step;
 }
 
-const step_t Logic::make_choice() {
-	auto iter = cached_steps.cbegin();
-	while (iter != cached_steps.cend()) {
-		if (view_map[iter->first] != 9) {
-			iter = cached_steps.erase(iter);
-		} else {
-			++iter;
-		}
+const step_t Logic::make_solver_choice() {
+	PhaseTimer timer(GUESS_PHASE);
+	vector<int> safe_indexes;
+	vector<int> mine_indexes;
+	int guess_index(ProbabilitySolver::solve(*this, safe_indexes, mine_indexes));
+	for (int i : safe_indexes) {
+		cached_steps.push(i, 0);
+	}
+	for (int i : mine_indexes) {
+		cached_steps.push(i, 2);
 	}
 	if (cached_steps.size()) {
-		step_t result(cached_steps.front());
-		cached_steps.pop_front();
+		step_t result(cached_steps.pop());
+		previous_index = result.first;
 		return result;
 	}
-	set_spiral_trace_generator(previous_index);
-	for (int _ = 0; _ < num_boxes; ++_) {
-		infer_single_box(next_index);
-		if (cached_steps.size()) {
-			unlock_spiral_trace_generator();
-			previous_index = next_index;
-			step_t result(cached_steps.front());
-			cached_steps.pop_front();
-			return result;
+	if (guess_index == -1) {
+		return make_random_choice();
+	}
+	previous_index = guess_index;
+	step_t guess_step {guess_index, 3};
+	return guess_step;
+}
+
+const step_t Logic::make_choice() {
+	PhaseTimer timer(INFERENCE_PHASE);
+	cached_steps.skip_stale_steps(view_map);
+	if (cached_steps.size()) {
+		step_t result(cached_steps.pop());
+		return result;
+	}
+	int num_dirty(update_dirty_indexes());
+	if (num_dirty) {
+		set_spiral_trace_generator(previous_index);
+		for (int _ = 0; _ < num_boxes; ++_) {
+			if (dirty_marks[next_index]) {
+				dirty_marks[next_index] = 0;
+				--num_dirty;
+				infer_single_box(next_index);
+				if (cached_steps.size()) {
+					unlock_spiral_trace_generator();
+					previous_index = next_index;
+					step_t result(cached_steps.pop());
+					return result;
+				}
+				if (!num_dirty) {
+					break;
+				}
+			}
+			move_to_next_index();
 		}
-		move_to_next_index();
+		unlock_spiral_trace_generator();
+	}
+	if (use_solver) {
+		return make_solver_choice();
 	}
-	unlock_spiral_trace_generator();
 	step_t random_step(make_random_choice());
 	return random_step;
 }
@@ -523,14 +1347,26 @@ const char *SingleGame::INIT_FAILURE_MSG("Fatal: Too many mines!");
 
 SingleGame::SingleGame() = default;
 
-SingleGame::SingleGame(int mw, int mh, int nm, int rm):
-	Logic(mw, mh, nm),
+SingleGame::SingleGame(int mw, int mh, int nm, int rm, bool us):
+	Logic(mw, mh, nm, us),
 	record_mode(rm),
+	game_seed(),
 
 	step_index_list(),
 	step_mode_list()
 {}
 
+void SingleGame::seed_game(unsigned long long gs) {
+	game_seed = gs;
+	rng::seed(gs);
+}
+
+void SingleGame::reset() {
+	Logic::reset();
+	step_index_list.clear();
+	step_mode_list.clear();
+}
+
 void SingleGame::exploit_step(const step_t &step) {
 	if (record_mode != 0) {
 		step_index_list.push_back(step.first);
@@ -558,41 +1394,55 @@ GameRecorder::GameRecorder(const SingleGame &game):
 	num_steps(game.num_steps),
 	num_guesses(game.num_random_steps),
 	time_used(game.time_used),
+	game_seed(game.game_seed),
 	mine_indexes(game.mine_indexes),
 	step_index_list(game.step_index_list),
 	step_mode_list(game.step_mode_list),
-	output_file()
+	output_file(),
+	num_items()
 {}
 
 GameRecorder::~GameRecorder() = default;
 
+void GameRecorder::begin_item(const char *key) {
+	if (num_items++) {
+		fprintf(output_file, ",\n");
+	}
+	fprintf(output_file, "\"%s\": \"", key);
+}
+
 void GameRecorder::add_item(const char *key, int value) {
-	fprintf(output_file, "\"%s\": \"%d\",\n", key, value);
+	begin_item(key);
+	fprintf(output_file, "%d\"", value);
 }
 
 void GameRecorder::add_item(const char *key, const char *value) {
-	fprintf(output_file, "\"%s\": \"%s\",\n", key, value);
+	begin_item(key);
+	fprintf(output_file, "%s\"", value);
 }
 
 void GameRecorder::add_grouped_item(const char *key, const vector<int> &ints) {
-	fprintf(output_file, "\"%s\": \"", key);
-	for (auto iter = ints.cbegin(), last_iter = ints.cend() - 1; iter != last_iter; ++iter) {
-		fprintf(output_file, "%d ", *iter);
+	begin_item(key);
+	for (auto iter = ints.cbegin(); iter != ints.cend(); ++iter) {
+		fprintf(output_file, iter == ints.cbegin() ? "%d" : " %d", *iter);
 	}
-	fprintf(output_file, "%d\",\n", ints.back());
+	fprintf(output_file, "\"");
 }
 
 void GameRecorder::add_joined_item(const char *key, const vector<int> &ints) {
-	fprintf(output_file, "\"%s\": \"", key);
+	begin_item(key);
 	for (auto iter = ints.cbegin(), last_iter = ints.cend(); iter != last_iter; ++iter) {
 		fprintf(output_file, "%d", *iter);
 	}
-	fprintf(output_file, "\",\n");
+	fprintf(output_file, "\"");
 }
 
 void GameRecorder::write_file() {
 	char time_used_str[64];
+	char game_seed_str[64];
 	sprintf(time_used_str, "%6f ms", time_used * 1e3);
+	sprintf(game_seed_str, "%llu", game_seed);
+	num_items = 0;
 	fprintf(output_file, "{\n");
 	add_item("map_width", map_width);
 	add_item("map_height", map_height);
@@ -606,21 +1456,197 @@ void GameRecorder::write_file() {
 	add_grouped_item("mine_indexes", mine_indexes);
 	add_grouped_item("step_indexes", step_index_list);
 	add_joined_item("step_mode_nums", step_mode_list);
-	fprintf(output_file, "}");
+	add_item("game_seed", game_seed_str);
+	fprintf(output_file, "\n}");
 }
 
 void GameRecorder::record(int game_file_index, const char *path) {
 	char file_path[64];
-	sprintf(file_path, "%s\\%d.json", path, game_file_index);
+	sprintf(file_path, "%s%c%d.json", path, os::SEP, game_file_index);
 	assert(!os::exists(file_path));
 	output_file = fopen(file_path, "w");
 	write_file();
 	fclose(output_file);
 }
 
+void GameRecorder::encode(vector<unsigned char> &buffer) const {
+	for (int value : {map_width, map_height, num_mines, game_status, progress, num_flags, num_steps, num_guesses}) {
+		binary::put_varint(buffer, value);
+	}
+	binary::put_double(buffer, time_used);
+	vector<int> sorted_mine_indexes(mine_indexes);
+	sort(sorted_mine_indexes.begin(), sorted_mine_indexes.end());
+	int previous_index(0);
+	for (int i : sorted_mine_indexes) {
+		binary::put_varint(buffer, i - previous_index);
+		previous_index = i;
+	}
+	binary::put_varint(buffer, step_index_list.size());
+	for (int i : step_index_list) {
+		binary::put_varint(buffer, i);
+	}
+	binary::put_2bit(buffer, step_mode_list);
+	binary::put_varint(buffer, game_seed);
+}
+
+
+const char *RecordSegment::MAGIC("ASWSEG01");
+const char *RecordSegment::SEGMENT_SUFFIX(".seg");
+const char *RecordSegment::INDEX_SUFFIX(".idx");
+const int RecordSegment::OFFSET_SIZE(8);
+
+RecordSegment::RecordSegment(const char *path_prefix):
+	segment_path(),
+	index_path()
+{
+	sprintf(segment_path, "%s%s", path_prefix, SEGMENT_SUFFIX);
+	sprintf(index_path, "%s%s", path_prefix, INDEX_SUFFIX);
+}
+
+const int RecordSegment::get_num_records() const {
+	return static_cast<int>(os::get_file_size(index_path) / OFFSET_SIZE);
+}
+
+
+const char *RecordArchive::SUMMARY_SUFFIX(".sum");
+const int RecordArchive::SUMMARY_ROW_SIZE(13);
+const int RecordArchive::BUFFER_SIZE(1 << 20);
+
+RecordArchive::RecordArchive(const char *path_prefix, bool ws):
+	RecordSegment(path_prefix),
+	summary_path(),
+	with_summary(ws),
+	segment_file(nullptr),
+	index_file(nullptr),
+	summary_file(nullptr),
+	segment_size(0),
+	num_records(0)
+{
+	sprintf(summary_path, "%s%s", path_prefix, SUMMARY_SUFFIX);
+}
+
+RecordArchive::~RecordArchive() {
+	close();
+}
+
+FILE *RecordArchive::open_file(const char *path) {
+	FILE *output_file(fopen(path, "ab"));
+	setvbuf(output_file, nullptr, _IOFBF, BUFFER_SIZE);
+	return output_file;
+}
+
+void RecordArchive::open() {
+	num_records = get_num_records();
+	segment_size = os::get_file_size(segment_path);
+	segment_file = open_file(segment_path);
+	if (segment_size == 0) {
+		segment_size = static_cast<long long>(strlen(MAGIC));
+		fwrite(MAGIC, 1, segment_size, segment_file);
+	}
+	index_file = open_file(index_path);
+	if (with_summary) {
+		int num_rows(static_cast<int>(os::get_file_size(summary_path) / SUMMARY_ROW_SIZE));
+		summary_file = open_file(summary_path);
+		if (num_rows < num_records) {
+			vector<unsigned char> padding((num_records - num_rows) * SUMMARY_ROW_SIZE, 0);
+			fwrite(padding.data(), 1, padding.size(), summary_file);
+		}
+	}
+}
+
+const int RecordArchive::add(const GameRecorder &game_recorder) {
+	vector<unsigned char> record;
+	game_recorder.encode(record);
+	vector<unsigned char> buffer;
+	binary::put_varint(buffer, record.size());
+	buffer.insert(buffer.end(), record.cbegin(), record.cend());
+	vector<unsigned char> offset_bytes;
+	binary::put_uint64(offset_bytes, segment_size);
+	fwrite(offset_bytes.data(), 1, offset_bytes.size(), index_file);
+	fwrite(buffer.data(), 1, buffer.size(), segment_file);
+	segment_size += static_cast<long long>(buffer.size());
+	if (summary_file != nullptr) {
+		vector<unsigned char> row({static_cast<unsigned char>(game_recorder.game_status)});
+		for (int value : {game_recorder.progress, game_recorder.num_steps, game_recorder.num_guesses}) {
+			binary::put_uint32(row, value);
+		}
+		fwrite(row.data(), 1, row.size(), summary_file);
+	}
+	return num_records++;
+}
+
+void RecordArchive::close() {
+	for (FILE **output_file : {&segment_file, &index_file, &summary_file}) {
+		if (*output_file != nullptr) {
+			fclose(*output_file);
+			*output_file = nullptr;
+		}
+	}
+}
+
+
+const int RecordWriter::CAPACITY(256);
+
+RecordWriter::RecordWriter(const Interface &i):
+	owner(i),
+	ring(CAPACITY),
+	head(0),
+	num_pending(0),
+	closing(false),
+	ring_mutex(),
+	not_empty(),
+	not_full(),
+	writer_thread()
+{
+	writer_thread = thread(&RecordWriter::run, this);
+}
+
+RecordWriter::~RecordWriter() {
+	close();
+}
+
+void RecordWriter::put(const GameRecorder &game_recorder) {
+	unique_lock<mutex> lock(ring_mutex);
+	not_full.wait(lock, [this] { return num_pending < CAPACITY; });
+	ring[(head + num_pending) % CAPACITY] = game_recorder;
+	++num_pending;
+	not_empty.notify_one();
+}
+
+void RecordWriter::run() {
+	GameRecorder game_recorder;
+	while (true) {
+		{
+			unique_lock<mutex> lock(ring_mutex);
+			not_empty.wait(lock, [this] { return num_pending > 0 || closing; });
+			if (num_pending == 0) {
+				return;
+			}
+			swap(game_recorder, ring[head]);
+			head = (head + 1) % CAPACITY;
+			--num_pending;
+			not_full.notify_one();
+		}
+		owner.write_record(game_recorder);
+	}
+}
+
+void RecordWriter::close() {
+	if (!writer_thread.joinable()) {
+		return;
+	}
+	{
+		lock_guard<mutex> lock(ring_mutex);
+		closing = true;
+		not_empty.notify_one();
+	}
+	writer_thread.join();
+}
+
 
 const char *Interface::FINISH_MSG("Finished!");
 const char *Interface::FOLDER_NAME("game_savings");
+const char *Interface::RECORD_FORMAT_VAR("AUTOSWEEPER_RECORD_FORMAT");
 
 
 Interface::Interface() = default;
@@ -631,8 +1657,11 @@ Interface::Interface(int mw, int mh, int nm, int rm):
 	num_mines(nm),
 	num_boxes(mw * mh),
 	record_mode(rm),
+	record_format(get_record_format()),
 
 	game_file_index(-1),
+	record_archive(),
+	record_writer(),
 
 	console_cols(static_cast<int>(strlen(COPYRIGHT_STR))),
 	console_lines(3),
@@ -643,11 +1672,25 @@ Interface::Interface(int mw, int mh, int nm, int rm):
 
 Interface::~Interface() = default;
 
+const RecordFormat Interface::get_record_format() {
+	const char *record_format(getenv(RECORD_FORMAT_VAR));
+	if (record_format == nullptr) {
+		return JSON_FORMAT;
+	}
+	if (strcmp(record_format, "binary") == 0 || strcmp(record_format, "BINARY") == 0) {
+		return BINARY_FORMAT;
+	}
+	if (strcmp(record_format, "archive") == 0 || strcmp(record_format, "ARCHIVE") == 0) {
+		return ARCHIVE_FORMAT;
+	}
+	return JSON_FORMAT;
+}
+
 void Interface::init_folder_path() {
 	if (!os::exists(FOLDER_NAME)) {
 		os::make_dir(FOLDER_NAME);
 	}
-	sprintf(folder_path, "%s\\%d-%d-%d", FOLDER_NAME, map_width, map_height, num_mines);
+	sprintf(folder_path, "%s%c%d-%d-%d", FOLDER_NAME, os::SEP, map_width, map_height, num_mines);
 }
 
 const int Interface::get_num_of_files() const {
@@ -662,7 +1705,41 @@ const GameRecorder Interface::get_recorder(const SingleGame &game) const {
 	return GameRecorder(game);
 }
 
+RecordArchive &Interface::get_record_archive() const {
+	if (!record_archive) {
+		record_archive = make_shared<RecordArchive>(folder_path, record_format == ARCHIVE_FORMAT);
+		record_archive->open();
+	}
+	return *record_archive;
+}
+
+void Interface::close_record_archive() const {
+	if (record_archive) {
+		record_archive->close();
+		record_archive.reset();
+	}
+}
+
+void Interface::close_record_writer() const {
+	if (record_writer) {
+		record_writer->close();
+		record_writer.reset();
+	}
+}
+
 void Interface::record_game_using_recorder(GameRecorder &game_recorder) const {
+	PhaseTimer timer(RECORD_PHASE);
+	if (!record_writer) {
+		record_writer = make_shared<RecordWriter>(*this);
+	}
+	record_writer->put(game_recorder);
+}
+
+void Interface::write_record(GameRecorder &game_recorder) const {
+	if (record_format != JSON_FORMAT) {
+		game_file_index = get_record_archive().add(game_recorder);
+		return;
+	}
 	if (game_file_index == -1) {
 		game_file_index = get_num_of_files();
 	} else {
@@ -677,6 +1754,7 @@ void Interface::record_game_data(const SingleGame &game) const {
 }
 
 void Interface::judge_to_record_game_data(const SingleGame &game) const {
+	PhaseTimer timer(RECORD_PHASE);
 	if (record_mode == 1 || record_mode == 2 && game.game_status == 2 || record_mode == 3 && game.game_status == 3) {
 		record_game_data(game);
 	}
@@ -684,7 +1762,7 @@ void Interface::judge_to_record_game_data(const SingleGame &game) const {
 
 void Interface::prepare_console(int cols, int lines) const {
 	CONSOLE.ready_to_begin(cols, lines);
-	printf(COPYRIGHT_STR);
+	CONSOLE.print_at({0, 0}, COPYRIGHT_STR);
 }
 
 void Interface::begin_process() const {
@@ -692,28 +1770,83 @@ void Interface::begin_process() const {
 }
 
 void Interface::terminate_process() const {
+	close_record_writer();
+	close_record_archive();
 	CONSOLE.move_cursor_to_end_line(1);
 	CONSOLE.printf_with_color(FINISH_MSG, 0x0a);
 	CONSOLE.ready_to_quit();
 }
 
 
+const int StatisticsDisplay::REFRESH_INTERVAL_MS(100);
+
+StatisticsDisplay::StatisticsDisplay(const GameStatistics &g):
+	owner(g),
+	num_shown_games(g.get_num_finished_games()),
+	closing(false),
+	display_mutex(),
+	wake(),
+	display_thread()
+{
+	display_thread = thread(&StatisticsDisplay::run, this);
+}
+
+StatisticsDisplay::~StatisticsDisplay() {
+	close();
+}
+
+void StatisticsDisplay::run() {
+	unique_lock<mutex> lock(display_mutex);
+	while (!wake.wait_for(lock, chrono::milliseconds(REFRESH_INTERVAL_MS), [this] { return closing; })) {
+		lock.unlock();
+		int num_finished_games(owner.get_num_finished_games());
+		if (num_finished_games != num_shown_games) {
+			num_shown_games = num_finished_games;
+			owner.print_statistics_values();
+		}
+		lock.lock();
+	}
+}
+
+void StatisticsDisplay::close() {
+	if (!display_thread.joinable()) {
+		return;
+	}
+	{
+		lock_guard<mutex> lock(display_mutex);
+		closing = true;
+		wake.notify_one();
+	}
+	display_thread.join();
+	owner.print_statistics_values();
+}
+
+
 const char *GameStatistics::STATISTICS_TITLE("- Statistics -");
 const vector<const char*> GameStatistics::STATISTICS_KEYS({
 	"Specification", "Main progress", "Games won", "Without guesses",
 	"Avg. progress", "Avg. flags", "Avg. steps", "Avg. steps (won)",
-	"Avg. guesses", "Avg. time", "Avg. time (won)", "Total avg. time"
+	"Avg. guesses", "Avg. time", "Avg. time (won)", "Total avg. time",
+	"Master seed"
 });
+const vector<const char*> GameStatistics::PROFILE_KEYS({
+	"Start time", "Expand time", "Inference time", "Guess time",
+	"Other time", "Record time", "Inferences", "Pair checks", "Queue pushes"
+});
+const int GameStatistics::MAX_NUM_STATISTICS_ROWS(22);
 const int GameStatistics::KEY_VAL_SEPARATOR_WIDTH(1);
 
 GameStatistics::GameStatistics() = default;
 
-GameStatistics::GameStatistics(int mw, int mh, int nm, int ng, int rm, int uf):
+GameStatistics::GameStatistics(int mw, int mh, int nm, int ng, int rm, int nt, bool us, bool rs, unsigned long long sd):
 	Interface(mw, mh, nm, rm),
-	single_game(SingleGame(mw, mh, nm, rm)),
+	single_game(SingleGame(mw, mh, nm, rm, us)),
 	num_games(ng),
-	update_freq(uf),
+	num_threads(nt > 0 ? nt : max(static_cast<int>(thread::hardware_concurrency()), 1)),
+	master_seed(rs ? rng::get_random_seed() : sd),
 	serial_num(),
+	next_serial_num(),
+	statistics_mutex(),
 	num_games_won(),
 	num_games_won_without_guesses(),
 	progress_sum(),
@@ -727,6 +1860,9 @@ GameStatistics::GameStatistics(int mw, int mh, int nm, int ng, int rm, int uf):
     game_end_time(),
 	num_recorded_games(record_mode < 0 ? -record_mode : 0),
 	ranking_list(),
+	profile(),
+	statistics_keys(STATISTICS_KEYS),
+	statistics_display(),
 
 	key_info_width(),
 	value_info_width(),
@@ -736,10 +1872,13 @@ GameStatistics::GameStatistics(int mw, int mh, int nm, int ng, int rm, int uf):
 }
 
 void GameStatistics::init_statistics_params() {
-	for (const char *key : STATISTICS_KEYS) {
+	if (Profiler::enabled) {
+		statistics_keys.insert(statistics_keys.end(), PROFILE_KEYS.begin(), PROFILE_KEYS.end());
+	}
+	for (const char *key : statistics_keys) {
 		key_info_width = max(key_info_width, static_cast<int>(strlen(key)));
 	}
-	char arr[6][64];
+	char arr[8][64];
 	double max_time(1e1);
 	sprintf(arr[0], "%d * %d / %d (%.2f%%)", map_width, map_height, num_mines, f_div(num_mines, num_boxes) * 1e2);
 	sprintf(arr[1], "%d / %d (%.2f%%)", num_games, num_games, 1e2);
@@ -747,24 +1886,28 @@ void GameStatistics::init_statistics_params() {
 	sprintf(arr[3], "%.3f / %d (%.2f%%)", static_cast<double>(num_mines), num_mines, 1e2);
 	sprintf(arr[4], "%.3f step(s)", static_cast<double>(num_boxes));
 	sprintf(arr[5], "%.6f ms", max_time * 1e3);
-	for (int i = 0; i < 6; ++i) {
+	sprintf(arr[6], "%.6f ms (%.2f%%)", max_time * 1e3, 1e2);
+	sprintf(arr[7], "%.3f call(s)", static_cast<double>(num_boxes) * 1e2);
+	for (int i = 0; i < (Profiler::enabled ? 8 : 6); ++i) {
 		value_info_width = max(value_info_width, static_cast<int>(strlen(arr[i])));
 	}
+	sprintf(arr[0], "%llu", master_seed);
+	value_info_width = max(value_info_width, static_cast<int>(strlen(arr[0])));
 	statistic_info_width = key_info_width + KEY_VAL_SEPARATOR_WIDTH + value_info_width;
 	assert(static_cast<int>(strlen(STATISTICS_TITLE)) <= statistic_info_width);
 	console_cols = max(console_cols, statistic_info_width);
-	console_lines += static_cast<int>(STATISTICS_KEYS.size()) + 1;
+	assert(static_cast<int>(statistics_keys.size()) <= MAX_NUM_STATISTICS_ROWS);
+	console_lines += static_cast<int>(statistics_keys.size()) + 1;
 }
 
 void GameStatistics::print_statistics_keys() const {
-	CONSOLE.move_cursor_to({(statistic_info_width - static_cast<int>(strlen(STATISTICS_TITLE))) / 2, 1});
-	printf("%s\n", STATISTICS_TITLE);
-	for (const char *key : STATISTICS_KEYS) {
-		printf("%s\n", key);
+	CONSOLE.print_at({(statistic_info_width - static_cast<int>(strlen(STATISTICS_TITLE))) / 2, 1}, STATISTICS_TITLE);
+	for (int i = 0; i < static_cast<int>(statistics_keys.size()); ++i) {
+		CONSOLE.print_at({0, i + 2}, statistics_keys[i]);
 	}
 }
 
-void GameStatistics::print_statistics_values() const {
+void GameStatistics::format_statistics_values(char values[][64]) const {
 	double avg_progress(f_div(progress_sum, serial_num));
 	double avg_num_flags(f_div(num_flags_sum, serial_num));
 	double avg_num_steps(f_div(num_steps_sum, serial_num));
@@ -774,7 +1917,7 @@ void GameStatistics::print_statistics_values() const {
 	double avg_won_games_time(f_div(won_games_time_sum, num_games_won));
 	double total_avg_time(f_div(game_end_time - process_begin_time, serial_num));
 
-	char arr[12][64];
+	char (*arr)[64](values);
 	sprintf(arr[0], "%d * %d / %d (%.2f%%)", map_width, map_height, num_mines, f_div(num_mines, num_boxes) * 1e2);
 	sprintf(arr[1], "%d / %d (%.2f%%)", serial_num, num_games, f_div(serial_num, num_games) * 1e2);
 	sprintf(arr[2], "%d / %d (%.2f%%)", num_games_won, serial_num, f_div(num_games_won, serial_num) * 1e2);
@@ -787,14 +1930,53 @@ void GameStatistics::print_statistics_values() const {
 	sprintf(arr[9], "%.6f ms", avg_time * 1e3);
 	sprintf(arr[10], "%.6f ms", avg_won_games_time * 1e3);
 	sprintf(arr[11], "%.6f ms", total_avg_time * 1e3);
+	sprintf(arr[12], "%llu", master_seed);
+	if (!Profiler::enabled) {
+		return;
+	}
+	long long profiled_time(0);
+	for (long long phase_time : profile.phase_times) {
+		profiled_time += phase_time;
+	}
+	for (int i = 0; i < NUM_PROFILE_PHASES; ++i) {
+		sprintf(arr[13 + i], "%.6f ms (%.2f%%)", f_div(profile.phase_times[i] * 1e-6, serial_num), static_cast<double>(profile.phase_times[i]) / max(profiled_time, 1LL) * 1e2);
+	}
+	for (int i = 0; i < NUM_PROFILE_COUNTERS; ++i) {
+		sprintf(arr[13 + NUM_PROFILE_PHASES + i], "%.3f call(s)", f_div(static_cast<double>(profile.counts[i]), serial_num));
+	}
+}
 
+void GameStatistics::print_statistics_values() const {
+	if (CONSOLE.is_headless()) {
+		return;
+	}
+	char arr[MAX_NUM_STATISTICS_ROWS][64];
+	char value_str[64];
+	{
+		lock_guard<mutex> lock(statistics_mutex);
+		format_statistics_values(arr);
+	}
 	int begin_col_index(key_info_width + KEY_VAL_SEPARATOR_WIDTH);
-	for (int i = 0; i < 12; ++i) {
-		CONSOLE.move_cursor_to({begin_col_index, i + 2});
-		printf("%*s", value_info_width, arr[i]);
+	for (int i = 0; i < static_cast<int>(statistics_keys.size()); ++i) {
+		sprintf(value_str, "%*s", value_info_width, arr[i]);
+		CONSOLE.print_at({begin_col_index, i + 2}, value_str);
+	}
+}
+
+void GameStatistics::print_statistics_summary() const {
+	char arr[MAX_NUM_STATISTICS_ROWS][64];
+	format_statistics_values(arr);
+	printf("%s\n", STATISTICS_TITLE);
+	for (int i = 0; i < static_cast<int>(statistics_keys.size()); ++i) {
+		printf("%-*s %*s\n", key_info_width, statistics_keys[i], value_info_width, arr[i]);
 	}
 }
 
+const int GameStatistics::get_num_finished_games() const {
+	lock_guard<mutex> lock(statistics_mutex);
+	return serial_num;
+}
+
 void GameStatistics::update_statistics_data(const SingleGame &game) {
 	if (game.game_status == 2) {
 		++num_games_won;
@@ -812,6 +1994,7 @@ void GameStatistics::update_statistics_data(const SingleGame &game) {
 }
 
 void GameStatistics::update_ranking_list(const SingleGame &game) {
+	PhaseTimer timer(RECORD_PHASE);
 	if (num_recorded_games == 0) {
 		return;
 	}
@@ -832,15 +2015,20 @@ void GameStatistics::update_ranking_list(const SingleGame &game) {
 	}
 }
 
+void GameStatistics::collect_profile() {
+	if (Profiler::enabled) {
+		profile.merge(Profiler::profile);
+		Profiler::profile.clear();
+	}
+}
+
 void GameStatistics::begin_process() const {
 	Interface::begin_process();
 	print_statistics_keys();
 	print_statistics_values();
 }
 
-void GameStatistics::run_single_game(SingleGame &game) {
-	game = single_game;
-	game.run();
+void GameStatistics::finish_single_game(const SingleGame &game) {
 	if (record_mode > 0) {
 		judge_to_record_game_data(game);
 	} else if (record_mode < 0) {
@@ -848,45 +2036,93 @@ void GameStatistics::run_single_game(SingleGame &game) {
 	}
 	game_end_time = get_current_time();
 	update_statistics_data(game);
+	collect_profile();
+	++serial_num;
+}
+
+void GameStatistics::run_single_game(SingleGame &game) {
+	game.seed_game(rng::get_game_seed(master_seed, serial_num + 1));
+	game.run();
+	{
+		lock_guard<mutex> lock(statistics_mutex);
+		finish_single_game(game);
+	}
+	game.reset();
 }
 
 void GameStatistics::run_all_games() {
-	SingleGame game;
+	SingleGame game(single_game);
 	while (serial_num < num_games) {
 		run_single_game(game);
-		++serial_num;
-		if (serial_num % update_freq == 0 || serial_num == num_games) {
-			print_statistics_values();
+	}
+}
+
+void GameStatistics::run_games_in_thread() {
+	SingleGame game(single_game);
+	int game_serial_num;
+	while ((game_serial_num = ++next_serial_num) <= num_games) {
+		game.seed_game(rng::get_game_seed(master_seed, game_serial_num));
+		game.run();
+		{
+			lock_guard<mutex> lock(statistics_mutex);
+			finish_single_game(game);
 		}
+		game.reset();
+	}
+}
+
+void GameStatistics::run_all_games_in_parallel() {
+	vector<thread> threads;
+	threads.reserve(num_threads);
+	for (int i = 0; i < num_threads; ++i) {
+		threads.emplace_back(&GameStatistics::run_games_in_thread, this);
+	}
+	for (thread &t : threads) {
+		t.join();
 	}
 }
 
 void GameStatistics::run_whole_process() {
 	begin_process();
-	srand((unsigned)time(NULL));
-    process_begin_time = get_current_time();
-	run_all_games();
+	process_begin_time = get_current_time();
+	if (!CONSOLE.is_headless()) {
+		statistics_display = make_shared<StatisticsDisplay>(*this);
+	}
+	if (num_threads > 1) {
+		run_all_games_in_parallel();
+	} else {
+		run_all_games();
+	}
+	if (statistics_display) {
+		statistics_display->close();
+	}
 	for (pair<int, GameRecorder> &pair_obj : ranking_list) {
 		record_game_using_recorder(pair_obj.second);
 	}
+	collect_profile();
+	if (CONSOLE.is_headless()) {
+		print_statistics_summary();
+	}
 	terminate_process();
 }
 
 
-void cpp_main(int mw, int mh, int nm, int ng, int rm, int uf) {
-	GameStatistics process(mw, mh, nm, ng, rm, uf);
+void cpp_main(int mw, int mh, int nm, int ng, int rm, int nt, bool us, bool rs, unsigned long long sd) {
+	GameStatistics process(mw, mh, nm, ng, rm, nt, us, rs, sd);
 	process.run_whole_process();
 }
 
 
 int main(int argc, char const *argv[]) {
-	if (argc != 1 && (argc < 4 || argc > 7)) {
-		printf("Please type in 0 or 3-6 attributes.\n");
+	if (argc != 1 && (argc < 4 || argc > 9)) {
+		printf("Please type in 0 or 3-8 attributes.\n");
 		CONSOLE.pause();
 		printf("\n");
 		return 0;
 	}
-	int mw, mh, nm, ng, rm, uf;
+	int mw, mh, nm, ng, rm, nt;
+	bool us, rs;
+	unsigned long long sd;
 	if (argc > 3) {
 		mw = atoi(argv[1]);
 		mh = atoi(argv[2]);
@@ -907,13 +2143,17 @@ int main(int argc, char const *argv[]) {
 		rm = 0;
 	}
 	if (argc > 6) {
-		uf = atoi(argv[6]);
+		nt = atoi(argv[6]);
 	} else {
-		uf = ng / 100;
-		if (uf == 0) {
-			uf = 1;
-		}
+		nt = 1;
+	}
+	if (argc > 7) {
+		us = atoi(argv[7]) != 0;
+	} else {
+		us = false;
 	}
-	cpp_main(mw, mh, nm, ng, rm, uf);
+	rs = argc <= 8 || strcmp(argv[8], "-1") == 0;
+	sd = rs ? 0 : strtoull(argv[8], nullptr, 10);
+	cpp_main(mw, mh, nm, ng, rm, nt, us, rs, sd);
 	return 0;
 }
@@ -2,9 +2,17 @@
 #define _CPP_EXT_H
 
 #include "tools.h"
+#include <atomic>
+#include <cmath>
+#include <condition_variable>
 #include <cstring>
 #include <iomanip>
 #include <list>
+#include <map>
+#include <memory>
+#include <mutex>
+#include <set>
+#include <thread>
 
 
 using namespace std;
@@ -12,16 +20,194 @@ using namespace std;
 
 typedef pair<int, int> coord_t;
 typedef pair<int, int> step_t;
+typedef vector<pair<vector<int>, int>> constraints_t;
+typedef map<int, pair<double, vector<double>>> solutions_t;
+typedef pair<vector<int>, shared_ptr<const solutions_t>> component_t;
 
 
+enum RecordFormat {
+	JSON_FORMAT,
+	BINARY_FORMAT,
+	ARCHIVE_FORMAT
+};
+
+enum ProfilePhase {
+	START_PHASE,
+	EXPAND_PHASE,
+	INFERENCE_PHASE,
+	GUESS_PHASE,
+	OTHER_PHASE,
+	RECORD_PHASE,
+	NUM_PROFILE_PHASES
+};
+
+enum ProfileCounter {
+	INFERENCE_COUNTER,
+	PAIR_CHECK_COUNTER,
+	QUEUE_PUSH_COUNTER,
+	NUM_PROFILE_COUNTERS
+};
+
+
+struct Profile;
+struct Profiler;
+struct PhaseTimer;
+struct SpiralSide;
+struct SpiralTable;
+struct IndexRange;
+struct SurroundingTable;
+struct PairOffsets;
+struct PairTable;
 struct Core;
+struct ComponentSearch;
+struct ProbabilitySolver;
+struct StepQueue;
 struct Logic;
 struct SingleGame;
 struct GameRecorder;
+struct RecordSegment;
+struct RecordArchive;
+struct RecordWriter;
 struct Interface;
+struct StatisticsDisplay;
 struct GameStatistics;
 
 
+struct Profile {
+public:
+	long long phase_times[NUM_PROFILE_PHASES];
+	long long counts[NUM_PROFILE_COUNTERS];
+
+	Profile();
+
+	void merge(const Profile &other);
+	void clear();
+};
+
+
+// Opt-in timers and counters of the phases of a game, enabled by the
+// environment variable `ENABLED_VAR`. Each thread keeps its own profile,
+// and time is charged to the innermost running `PhaseTimer`.
+struct Profiler {
+public:
+	static const char *ENABLED_VAR;
+	static const bool enabled;
+	static thread_local Profile profile;
+	static thread_local int current_phase;
+	static thread_local long long mark_time;
+
+	static const bool get_enabled();
+	static const long long get_time_ns();
+	static void count(int counter);
+};
+
+
+struct PhaseTimer {
+public:
+	int previous_phase;
+
+	PhaseTimer(int phase);
+	~PhaseTimer();
+};
+
+
+struct SpiralSide {
+public:
+	int x;
+	int y;
+	int dx;
+	int dy;
+	int offset;
+	int step;
+};
+
+
+struct SpiralTable {
+public:
+	int map_width;
+	int map_height;
+	int max_layer;
+	vector<SpiralSide> sides;
+
+	SpiralTable(int mw, int mh);
+
+	static const shared_ptr<const SpiralTable> get(int mw, int mh);
+	static void clip_side(int begin_val, int direction, int side_length, int limit, int &begin, int &end);
+
+	const SpiralSide &get_side(int layer, int side_index) const;
+};
+
+
+struct IndexRange {
+public:
+	const int *first;
+	const int *last;
+
+	const int *begin() const;
+	const int *end() const;
+	const int size() const;
+};
+
+
+struct SurroundingTable {
+public:
+	static const int MAX_CACHED_TABLES;
+
+	int map_width;
+	int map_height;
+	int layer;
+	vector<int> offsets;
+	vector<int> indexes;
+
+	SurroundingTable(Core &core, int l);
+
+	static const shared_ptr<const SurroundingTable> get(Core &core, int l);
+
+	const IndexRange row(int index) const;
+};
+
+
+// Offsets from the first box of a pair of the boxes compared by
+// `Logic::two_indexes_logic`, stored in `PairTable::offsets`: the common
+// boxes in [first, suburb0_first), the boxes around the first box but not
+// the second in [suburb0_first, suburb1_first), and the other way around in
+// [suburb1_first, last).
+struct PairOffsets {
+public:
+	int first;
+	int suburb0_first;
+	int suburb1_first;
+	int last;
+};
+
+
+// The `PairOffsets` of every box and every box within 2 layers around it.
+// Boxes with the same distances to the 4 sides of the map, counted up to
+// `MAX_DISTANCE`, share one row of offsets, built once from the surrounding
+// rows of the first of them. Only the positions of the boxes are kept; what
+// the boxes show is read by each comparison. Tables are cached like
+// `SurroundingTable`.
+struct PairTable {
+public:
+	static const int MAX_DISTANCE;
+	static const int MAX_CACHED_TABLES;
+
+	int map_width;
+	int map_height;
+	int num_position_classes;
+	vector<int> row_firsts;
+	vector<PairOffsets> pairs;
+	vector<int> offsets;
+
+	PairTable(Core &core);
+
+	static const shared_ptr<const PairTable> get(Core &core);
+
+	const PairOffsets *row(int index) const;
+	const IndexRange range(int first, int last) const;
+};
+
+
 struct Core {
 public:
 	int map_width;
@@ -40,26 +226,29 @@ public:
 	int previous_index;
 	double time_used;
 
-	vector<vector<int>> surrounding_indexes;
-	vector<vector<int>> sub_surrounding_indexes;
+	shared_ptr<const SurroundingTable> surrounding_table;
+	shared_ptr<const SurroundingTable> sub_surrounding_table;
+	mutable vector<char> box_marks;
 
+	shared_ptr<const SpiralTable> spiral_table;
 	bool trace_lock;
-	int layer;
+	int trace_center;
+	int trace_max_layer;
+	int trace_layer;
+	int trace_side_index;
+	int trace_remaining;
+	int trace_step;
 	int x0;
 	int y0;
-	int dx;
-	int dy;
-	coord_t next_coord;
 	int next_index;
 
 	Core();
 	Core(int mw, int mh, int nm);
 	virtual ~Core();
 
-	void init_surrounding_indexes();
-
-	const vector<int> get_union(const vector<int> &list0, const vector<int> &list1) const;
-	const vector<int> get_difference(const vector<int> &list0, const vector<int> &list1) const;
+	virtual void reset();
+	const vector<int> get_union(const IndexRange &list0, const IndexRange &list1) const;
+	const vector<int> get_difference(const IndexRange &list0, const IndexRange &list1) const;
 	const int coord_to_index(const coord_t &coord) const;
 	const coord_t index_to_coord(int index) const;
 	const bool in_map(const coord_t &coord) const;
@@ -70,9 +259,11 @@ public:
 
 	const vector<int> get_surrounding_indexes_with_self(int index, int layer=1);
 	const vector<int> get_surrounding_indexes(int index, int layer=1);
+	const int get_num_surrounding_indexes(int index) const;
 	const vector<int> get_common_indexes(int index0, int index1) const;
 	const vector<int> get_suburb_indexes(int index0, int index1) const;
-	const vector<int> indexes_ordered_in_spiral(int index, vector<int> index_list);
+	const int get_spiral_rank(int center_index, int index) const;
+	const vector<int> indexes_ordered_in_spiral(int index, vector<int> index_list) const;
 
 	virtual void raise_init_mine_map_error() = 0;
 	void init_mine_indexes(int first_index);
@@ -94,25 +285,90 @@ public:
 };
 
 
+struct ComponentSearch {
+public:
+	vector<pair<vector<int>, vector<int>>> groups;
+	vector<int> needs;
+	vector<int> rests;
+	vector<int> group_mines;
+	int num_nodes;
+	solutions_t solutions;
+
+	ComponentSearch(int num_variables, const constraints_t &constraints);
+
+	void record_solution(int num_mines, double weight);
+	const bool backtrack(int group_index, int num_mines, double weight);
+	const shared_ptr<const solutions_t> get_solutions(int num_variables) const;
+};
+
+
+struct ProbabilitySolver {
+public:
+	static const int MAX_COMPONENT_SIZE;
+	static const int MAX_SEARCH_NODES;
+	static const int MAX_CACHED_COMPONENTS;
+
+	static map<constraints_t, shared_ptr<const solutions_t>> &get_component_cache();
+	static const double choose(int n, int k);
+	static const constraints_t get_constraints(const Logic &game);
+	static const vector<constraints_t> split_components(const constraints_t &constraints);
+	static const vector<int> order_variables(const constraints_t &constraints);
+	static const shared_ptr<const solutions_t> solve_component(const constraints_t &constraints, vector<int> &variables);
+	static const map<int, double> convolve(const map<int, double> &distribution0, const map<int, double> &distribution1);
+	static const int solve(const Logic &game, vector<int> &safe_indexes, vector<int> &mine_indexes);
+	static const int get_local_deductions(const vector<component_t> &components, vector<int> &safe_indexes, vector<int> &mine_indexes);
+	static const int get_global_solution(const Logic &game, const vector<component_t> &components, vector<int> &safe_indexes, vector<int> &mine_indexes);
+};
+
+
+struct StepQueue {
+public:
+	vector<step_t> steps;
+	int head;
+	vector<char> queued_modes;
+
+	StepQueue();
+	StepQueue(int num_boxes);
+
+	const int size() const;
+	void push(int index, int step_mode);
+	const step_t pop();
+	void skip_stale_steps(const vector<int> &view_map);
+	void clear();
+};
+
+
 struct Logic: public Core {
 public:
+	static const int DIRTY_LAYER;
+
+	bool use_solver;
+
 	vector<int> unknown_map;
 	vector<int> flags_map;
-	list<step_t> cached_steps;
+	StepQueue cached_steps;
+	vector<char> frontier_marks;
+	vector<char> dirty_marks;
+	vector<int> dirty_indexes;
+	shared_ptr<const PairTable> pair_table;
 
 	Logic();
-	Logic(int mw, int mh, int nm);
+	Logic(int mw, int mh, int nm, bool us=false);
 
+	void reset() override;
 	void init_unknown_map();
 
 	void modify_surrounding_unknown_map(int index);
+	void mark_dirty_region(int index);
+	const int update_dirty_indexes();
 	void modify_surrounding_flags_map(int index);
 	void explore_single_safe_box(int index) override;
 	void flag_blank_box(int index) override;
 	const bool is_valuable(int index) const;
-	void two_indexes_logic(int index0, int index1);
+	void two_indexes_logic(int index0, int index1, const PairOffsets &pair_offsets);
 	void infer_single_box(int index);
 	const step_t make_random_choice();
+	const step_t make_solver_choice();
 	const step_t make_choice();
 	const int make_first_choice_index();
 	void on_playing() override;
@@ -124,13 +380,16 @@ public:
 	static const char *INIT_FAILURE_MSG;
 
 	int record_mode;
+	unsigned long long game_seed;
 
 	vector<int> step_index_list;
 	vector<int> step_mode_list;
 
 	SingleGame();
-	SingleGame(int mw, int mh, int nm, int rm);
+	SingleGame(int mw, int mh, int nm, int rm, bool us=false);
 
+	void seed_game(unsigned long long gs);
+	void reset() override;
 	void exploit_step(const step_t &step) override;
 	void raise_init_mine_map_error() override;
 };
@@ -147,21 +406,89 @@ public:
 	int num_steps;
 	int num_guesses;
 	double time_used;
+	unsigned long long game_seed;
 	vector<int> mine_indexes;
 	vector<int> step_index_list;
 	vector<int> step_mode_list;
 	FILE *output_file;
+	int num_items;
 
 	GameRecorder();
 	GameRecorder(const SingleGame &game);
 	virtual ~GameRecorder();
 
+	void begin_item(const char *key);
 	void add_item(const char *key, int value);
 	void add_item(const char *key, const char *value);
 	void add_grouped_item(const char *key, const vector<int> &ints);
 	void add_joined_item(const char *key, const vector<int> &ints);
 	void write_file();
 	void record(int game_file_index, const char *path);
+	void encode(vector<unsigned char> &buffer) const;
+};
+
+
+struct RecordSegment {
+public:
+	static const char *MAGIC;
+	static const char *SEGMENT_SUFFIX;
+	static const char *INDEX_SUFFIX;
+	static const int OFFSET_SIZE;
+
+	char segment_path[64];
+	char index_path[64];
+
+	RecordSegment(const char *path_prefix);
+
+	const int get_num_records() const;
+};
+
+
+struct RecordArchive: public RecordSegment {
+public:
+	static const char *SUMMARY_SUFFIX;
+	static const int SUMMARY_ROW_SIZE;
+	static const int BUFFER_SIZE;
+
+	char summary_path[64];
+	bool with_summary;
+	FILE *segment_file;
+	FILE *index_file;
+	FILE *summary_file;
+	long long segment_size;
+	int num_records;
+
+	RecordArchive(const char *path_prefix, bool ws);
+	~RecordArchive();
+
+	static FILE *open_file(const char *path);
+
+	void open();
+	const int add(const GameRecorder &game_recorder);
+	void close();
+};
+
+
+struct RecordWriter {
+public:
+	static const int CAPACITY;
+
+	const Interface &owner;
+	vector<GameRecorder> ring;
+	int head;
+	int num_pending;
+	bool closing;
+	mutex ring_mutex;
+	condition_variable not_empty;
+	condition_variable not_full;
+	thread writer_thread;
+
+	RecordWriter(const Interface &i);
+	~RecordWriter();
+
+	void put(const GameRecorder &game_recorder);
+	void run();
+	void close();
 };
 
 
@@ -169,14 +496,18 @@ struct Interface {
 public:
 	static const char *FINISH_MSG;
 	static const char *FOLDER_NAME;
+	static const char *RECORD_FORMAT_VAR;
 
 	int map_width;
 	int map_height;
 	int num_mines;
 	int num_boxes;
 	int record_mode;
+	RecordFormat record_format;
 
 	mutable int game_file_index;
+	mutable shared_ptr<RecordArchive> record_archive;
+	mutable shared_ptr<RecordWriter> record_writer;
 
 	int console_cols;
 	int console_lines;
@@ -186,11 +517,16 @@ public:
 	Interface(int mw, int mh, int nm, int rm);
 	virtual ~Interface();
 
+	static const RecordFormat get_record_format();
 	void init_folder_path();
 
 	const int get_num_of_files() const;
 	const GameRecorder get_recorder(const SingleGame &game) const;
+	RecordArchive &get_record_archive() const;
+	void close_record_archive() const;
+	void close_record_writer() const;
 	void record_game_using_recorder(GameRecorder &game_recorder) const;
+	void write_record(GameRecorder &game_recorder) const;
 	void record_game_data(const SingleGame &game) const;
 	void judge_to_record_game_data(const SingleGame &game) const;
 
@@ -200,16 +536,40 @@ public:
 };
 
 
+struct StatisticsDisplay {
+public:
+	static const int REFRESH_INTERVAL_MS;
+
+	const GameStatistics &owner;
+	int num_shown_games;
+	bool closing;
+	mutex display_mutex;
+	condition_variable wake;
+	thread display_thread;
+
+	StatisticsDisplay(const GameStatistics &g);
+	~StatisticsDisplay();
+
+	void run();
+	void close();
+};
+
+
 struct GameStatistics: public Interface {
 public:
 	static const char *STATISTICS_TITLE;
 	static const vector<const char*> STATISTICS_KEYS;
+	static const vector<const char*> PROFILE_KEYS;
+	static const int MAX_NUM_STATISTICS_ROWS;
 	static const int KEY_VAL_SEPARATOR_WIDTH;
 
 	SingleGame single_game;
 	int num_games;
-	int update_freq;
+	int num_threads;
+	unsigned long long master_seed;
 	int serial_num;
+	atomic<int> next_serial_num;
+	mutable mutex statistics_mutex;
 	int num_games_won;
 	int num_games_won_without_guesses;
 	int progress_sum;
@@ -223,27 +583,37 @@ public:
     double game_end_time;
 	int num_recorded_games;
 	list<pair<int, GameRecorder>> ranking_list;
+	Profile profile;
+	vector<const char*> statistics_keys;
+	shared_ptr<StatisticsDisplay> statistics_display;
 
 	int key_info_width;
 	int value_info_width;
 	int statistic_info_width;
 
 	GameStatistics();
-	GameStatistics(int mw, int mh, int nm, int ng, int rm, int uf);
+	GameStatistics(int mw, int mh, int nm, int ng, int rm, int nt, bool us, bool rs=true, unsigned long long sd=0);
 
 	void init_statistics_params();
 	void print_statistics_keys() const;
+	void format_statistics_values(char values[][64]) const;
 	void print_statistics_values() const;
+	void print_statistics_summary() const;
+	const int get_num_finished_games() const;
 	void update_statistics_data(const SingleGame &game);
 	void update_ranking_list(const SingleGame &game);
+	void collect_profile();
 	void begin_process() const override;
+	void finish_single_game(const SingleGame &game);
 	void run_single_game(SingleGame &game);
 	void run_all_games();
+	void run_games_in_thread();
+	void run_all_games_in_parallel();
 	void run_whole_process();
 };
 
 
-void cpp_main(int mw, int mh, int nm, int ng, int rm, int uf);
+void cpp_main(int mw, int mh, int nm, int ng, int rm, int nt, bool us, bool rs=true, unsigned long long sd=0);
 
 
 #endif
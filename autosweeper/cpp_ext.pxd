@@ -1,9 +1,58 @@
 # distutils: language=c++
 
+from libcpp.utility cimport pair
+from libcpp.vector cimport vector
+
+
 cdef extern from "cpp_autosweeper.cpp":
-    cpdef void cpp_main(int, int, int, int, int, int)
+    cpdef void cpp_main(int, int, int, int, int, int, bint, bint, unsigned long long)
 
     cdef cppclass ConsoleTools:
         void clear_console()
         void printf_with_color(char*, int)
         void set_console_size_to_default()
+
+
+cdef extern from "cpp_autosweeper.cpp" nogil:
+    ctypedef pair[int, int] step_t
+
+    cdef cppclass Profile:
+        long long phase_times[6]
+        long long counts[3]
+
+        void clear()
+
+    bint profiler_enabled "Profiler::enabled"
+    Profile thread_profile "Profiler::profile"
+
+    void seed_random "rng::seed"(unsigned long long)
+    unsigned long long get_game_seed "rng::get_game_seed"(
+        unsigned long long, int
+    )
+
+    cdef cppclass SingleGame:
+        int map_width
+        int map_height
+        int num_mines
+        int num_boxes
+        int num_unknown_boxes
+        int num_unknown_mines
+        vector[int] mine_indexes
+        vector[int] view_map
+        int game_status
+        int num_steps
+        int num_random_steps
+        int previous_index
+        double time_used
+        unsigned long long game_seed
+
+        SingleGame()
+        SingleGame(int, int, int, int, bint)
+        void seed_game(unsigned long long)
+        void reset()
+        void start(int)
+        void exploit_step(const step_t &)
+        const step_t make_choice()
+        const int get_num_surrounding_indexes(int)
+        const int make_first_choice_index()
+        void run()
@@ -3,6 +3,8 @@
 
 # website: https://github.com/Michael1075/autosweeper
 
+import multiprocessing
+
 from cython_ext import py_main
 from cython_ext import PyConsoleTools
 
@@ -106,7 +108,15 @@ class Prompt(object):
         "recorded."
     ])
     NUM_RECORDED_GAMES = "How many games shall be recorded (1 at least)?"
-    UPDATE_FREQ = "After how many games should the statistics data be updated?"
+    NUM_THREADS = "How many threads shall be used to play the games?"
+    MASTER_SEED = "\n".join([
+        "Please input the master seed of the games, so that the same games",
+        "can be played again (-1 for a random one)."
+    ])
+    SOLVER_MODE = "\n".join([
+        "Please choose how to guess when no box can be inferred for sure",
+        "(the solver wins more games at the cost of some speed)."
+    ])
 
 
 class ChoicesPrompts(object):
@@ -117,6 +127,10 @@ class ChoicesPrompts(object):
         "Record only lost games",
         "Record some best-played games"
     )
+    SOLVER_MODE = (
+        "Guess uniformly at random",
+        "Guess the box least likely to be a mine"
+    )
 
 
 class MainProcess(object):
@@ -168,15 +182,20 @@ class MainProcess(object):
                 int, Prompt.NUM_RECORDED_GAMES, 1, lambda x: 0 < x <= num_games
             )
             record_mode = -num_recorded_games
-        update_freq_default_val = num_games // 100
-        if update_freq_default_val == 0:
-            update_freq_default_val = 1
-        update_freq = InputTools.assertion_input(
-            int, Prompt.UPDATE_FREQ, update_freq_default_val, lambda x: x > 0
+        num_threads = InputTools.assertion_input(
+            int, Prompt.NUM_THREADS, multiprocessing.cpu_count(),
+            lambda x: x > 0
+        )
+        solver_mode = InputTools.prompts_input(
+            Prompt.SOLVER_MODE, 0, ChoicesPrompts.SOLVER_MODE
+        )
+        master_seed = InputTools.assertion_input(
+            int, Prompt.MASTER_SEED, -1, lambda x: -1 <= x < 1 << 64
         )
         py_main(
             map_width, map_height, num_mines,
-            num_games, record_mode, update_freq
+            num_games, record_mode, num_threads,
+            solver_mode == 1, master_seed
         )
 
     @staticmethod
@@ -2,10 +2,28 @@
 
 from cpp_ext cimport cpp_main
 from cpp_ext cimport ConsoleTools
+from cpp_ext cimport get_game_seed
+from cpp_ext cimport profiler_enabled
+from cpp_ext cimport seed_random
+from cpp_ext cimport SingleGame
+from cpp_ext cimport step_t
+from cpp_ext cimport thread_profile
 
 
-cpdef py_main(int mw, int mh, int nm, int ng, int rm, int uf):
-    cpp_main(mw, mh, nm, ng, rm, uf)
+PROFILE_PHASES = ("start", "expand", "inference", "guess", "other", "record")
+PROFILE_COUNTERS = ("inferences", "pair_checks", "queue_pushes")
+
+
+cpdef py_main(int mw, int mh, int nm, int ng, int rm, int nt,
+        bint us=False, sd=-1):
+    """
+    :param sd: int
+        The master seed, from 0 to 2 ** 64 - 1, or -1 for a random one.
+    """
+    if sd == -1:
+        cpp_main(mw, mh, nm, ng, rm, nt, us, True, 0)
+    else:
+        cpp_main(mw, mh, nm, ng, rm, nt, us, False, sd)
 
 
 cdef class PyConsoleTools:
@@ -25,3 +43,191 @@ cdef class PyConsoleTools:
 
     def set_console_size_to_default(self):
         self.thisptr.set_console_size_to_default()
+
+
+cdef class PySingleGame:
+    """
+    A single game played by the C++ solver.
+
+    :param use_solver: bool
+        Whether to guess with the probability solver instead of uniformly.
+
+    :attr game_status: int in range(4)
+        0: preparing
+        1: processing
+        2: won
+        3: lost
+    """
+    cdef SingleGame *thisptr
+
+    def __cinit__(self, int map_width, int map_height, int num_mines,
+            bint use_solver=False):
+        if map_width <= 0 or map_height <= 0 or num_mines <= 0:
+            raise ValueError("Illegal specification")
+        self.thisptr = new SingleGame(
+            map_width, map_height, num_mines, 0, use_solver
+        )
+
+    def __dealloc__(self):
+        del self.thisptr
+
+    @staticmethod
+    def seed(unsigned long long seed):
+        seed_random(seed)
+
+    @staticmethod
+    def pop_profile():
+        """
+        :return: tuple[dict[str, int], dict[str, int]] or None
+            The nanoseconds spent in each phase and the counts of the games
+            played by this thread since the last call, or None if profiling
+            is not enabled by the environment variable AUTOSWEEPER_PROFILE.
+        """
+        if not profiler_enabled:
+            return None
+        totals = (
+            {
+                phase: thread_profile.phase_times[i]
+                for i, phase in enumerate(PROFILE_PHASES)
+            },
+            {
+                counter: thread_profile.counts[i]
+                for i, counter in enumerate(PROFILE_COUNTERS)
+            }
+        )
+        thread_profile.clear()
+        return totals
+
+    def seed_game(self, unsigned long long game_seed):
+        """
+        Seeds the next game, so that a recorded game is played again from
+        its `game_seed`.
+        """
+        self.thisptr.seed_game(game_seed)
+
+    def reset(self):
+        self.thisptr.reset()
+
+    cdef int check_first_index(self, int first_index) except -1:
+        if not 0 <= first_index < self.thisptr.num_boxes:
+            raise IndexError("first_index out of range")
+        if self.thisptr.num_boxes - self.thisptr.num_mines \
+                <= self.thisptr.get_num_surrounding_indexes(first_index):
+            raise ValueError("Too many mines")
+        return 0
+
+    def start(self, int first_index=-1):
+        if self.thisptr.game_status != 0:
+            raise RuntimeError("The game has already started")
+        if first_index == -1:
+            first_index = self.thisptr.make_first_choice_index()
+        else:
+            self.thisptr.previous_index = first_index
+        self.check_first_index(first_index)
+        cdef step_t first_step = step_t(first_index, 0)
+        self.thisptr.start(first_index)
+        self.thisptr.exploit_step(first_step)
+        return first_step.first, first_step.second
+
+    def step(self):
+        if self.thisptr.game_status == 0:
+            return self.start()
+        if self.thisptr.game_status != 1:
+            raise RuntimeError("The game has finished")
+        cdef step_t next_step = self.thisptr.make_choice()
+        self.thisptr.exploit_step(next_step)
+        return next_step.first, next_step.second
+
+    def run(self):
+        if self.thisptr.game_status != 0:
+            raise RuntimeError("The game has already started")
+        self.check_first_index(self.thisptr.make_first_choice_index())
+        self.thisptr.run()
+
+    def run_batch(self, int num_games, unsigned long long master_seed):
+        """
+        Plays games seeded the same way as the games of a `py_main` run
+        with the same master seed.
+        """
+        cdef int i
+        cdef int num_games_won = 0
+        cdef int num_games_won_without_guesses = 0
+        cdef long long progress_sum = 0
+        cdef long long num_flags_sum = 0
+        cdef long long num_steps_sum = 0
+        cdef long long num_won_games_steps_sum = 0
+        cdef long long num_random_steps_sum = 0
+        cdef double time_sum = 0.0
+        cdef double won_games_time_sum = 0.0
+        cdef SingleGame *game = self.thisptr
+        self.check_first_index(game.make_first_choice_index())
+        with nogil:
+            for i in range(num_games):
+                game.reset()
+                game.seed_game(get_game_seed(master_seed, i + 1))
+                game.run()
+                if game.game_status == 2:
+                    num_games_won += 1
+                    if game.num_random_steps == 0:
+                        num_games_won_without_guesses += 1
+                    num_won_games_steps_sum += game.num_steps
+                    won_games_time_sum += game.time_used
+                progress_sum += game.num_boxes - game.num_unknown_boxes
+                num_flags_sum += game.num_mines - game.num_unknown_mines
+                num_steps_sum += game.num_steps
+                num_random_steps_sum += game.num_random_steps
+                time_sum += game.time_used
+        return {
+            "num_games": num_games,
+            "num_games_won": num_games_won,
+            "num_games_won_without_guesses": num_games_won_without_guesses,
+            "progress_sum": progress_sum,
+            "num_flags_sum": num_flags_sum,
+            "num_steps_sum": num_steps_sum,
+            "num_won_games_steps_sum": num_won_games_steps_sum,
+            "num_random_steps_sum": num_random_steps_sum,
+            "time_sum": time_sum,
+            "won_games_time_sum": won_games_time_sum,
+        }
+
+    @property
+    def map_width(self):
+        return self.thisptr.map_width
+
+    @property
+    def map_height(self):
+        return self.thisptr.map_height
+
+    @property
+    def num_mines(self):
+        return self.thisptr.num_mines
+
+    @property
+    def view_map(self):
+        return list(self.thisptr.view_map)
+
+    @property
+    def mine_indexes(self):
+        if self.thisptr.game_status == 0:
+            return []
+        return list(self.thisptr.mine_indexes)
+
+    @property
+    def num_steps(self):
+        return self.thisptr.num_steps
+
+    @property
+    def num_random_steps(self):
+        return self.thisptr.num_random_steps
+
+    @property
+    def game_status(self):
+        return self.thisptr.game_status
+
+    @property
+    def time_used(self):
+        return self.thisptr.time_used
+
+    @property
+    def game_seed(self):
+        return self.thisptr.game_seed
@@ -0,0 +1,369 @@
+#!/usr/bin/env python3
+# coding: utf-8
+
+# website: https://github.com/Michael1075/autosweeper
+
+# NumPy backend of autosweeper. Boards of the same specification and first
+# click are generated as `(num_games, height, width)` arrays: mines are
+# chosen by a vectorized choice that excludes the 3 * 3 safe region, and the
+# numbers are summed from shifted copies of the mine masks.
+# `BatchLogic` plays many games of one specification in lockstep, testing
+# the rules of `Logic` on the boards of all games with array operations.
+
+from array import array
+import random
+import time
+
+import numpy as np
+
+from bit_autosweeper import BitBoard
+
+
+def get_safe_mask(map_width, map_height, first_index):
+    """
+    :return: np.ndarray[bool], shape (map_height, map_width)
+        True in the 3 * 3 region around the first click.
+    """
+    y, x = divmod(first_index, map_width)
+    safe_mask = np.zeros((map_height, map_width), dtype=bool)
+    safe_mask[max(y - 1, 0):y + 2, max(x - 1, 0):x + 2] = True
+    return safe_mask
+
+
+def generate_mine_masks(rng, num_games, map_width, map_height, num_mines,
+        first_index):
+    """
+    :param rng: np.random.Generator
+
+    :return: np.ndarray[bool], shape (num_games, map_height, map_width)
+
+    :raise ValueError:
+        If the mines cannot fit outside the safe region.
+    """
+    candidate_indexes = np.flatnonzero(
+        ~get_safe_mask(map_width, map_height, first_index).ravel()
+    )
+    num_candidates = candidate_indexes.size
+    if not 0 <= num_mines <= num_candidates:
+        raise ValueError("too many mines")
+    mine_masks = np.zeros((num_games, map_width * map_height), dtype=bool)
+    if num_mines == num_candidates:
+        mine_masks[:, candidate_indexes] = True
+    elif num_mines > 0:
+        keys = rng.random((num_games, num_candidates))
+        chosen = np.argpartition(keys, num_mines - 1, axis=1)[:, :num_mines]
+        mine_masks[
+            np.arange(num_games)[:, np.newaxis], candidate_indexes[chosen]
+        ] = True
+    return mine_masks.reshape(num_games, map_height, map_width)
+
+
+def count_surrounding(masks):
+    """
+    :param masks: np.ndarray[bool], shape (num_games, height, width)
+
+    :return: np.ndarray[int8], shape (num_games, height, width)
+        The number of boxes of `masks` around each box.
+    """
+    num_games, map_height, map_width = masks.shape
+    padded_masks = np.zeros(
+        (num_games, map_height + 2, map_width + 2), dtype=np.int8
+    )
+    padded_masks[:, 1:-1, 1:-1] = masks
+    counts = np.zeros((num_games, map_height, map_width), dtype=np.int8)
+    for dy in range(3):
+        for dx in range(3):
+            if dy != 1 or dx != 1:
+                counts += padded_masks[
+                    :, dy:dy + map_height, dx:dx + map_width
+                ]
+    return counts
+
+
+def compute_base_maps(mine_masks):
+    """
+    :param mine_masks: np.ndarray[bool], shape (num_games, height, width)
+
+    :return: np.ndarray[int8], shape (num_games, height, width)
+        The number of surrounding mines of each box, or -1 for mines.
+    """
+    base_maps = count_surrounding(mine_masks)
+    base_maps[mine_masks] = -1
+    return base_maps
+
+
+class BoardSource(object):
+    """
+    Hands out boards of one specification, each drawn by NumPy from a seed
+    taken from `random`, so seeding `random` makes the boards reproducible.
+    """
+    def __init__(self, map_width, map_height, num_mines):
+        self.map_width = map_width
+        self.map_height = map_height
+        self.num_mines = num_mines
+
+    def get_board(self, first_index):
+        """
+        :return: tuple[list[int], array[int]]
+            The mine indexes and the base map of the next board.
+
+        :raise ValueError:
+            If the mines cannot fit outside the safe region.
+        """
+        rng = np.random.default_rng(random.getrandbits(64))
+        mine_masks = generate_mine_masks(
+            rng, 1, self.map_width, self.map_height, self.num_mines,
+            first_index
+        )
+        return (
+            np.flatnonzero(mine_masks[0]).tolist(),
+            array("b", compute_base_maps(mine_masks)[0].tobytes())
+        )
+
+
+def dilate(masks):
+    """
+    :param masks: np.ndarray[bool], shape (num_games, height, width)
+
+    :return: np.ndarray[bool], shape (num_games, height, width)
+        The boxes of `masks` and the boxes around them.
+    """
+    line_masks = masks.copy()
+    line_masks[:, :, 1:] |= masks[:, :, :-1]
+    line_masks[:, :, :-1] |= masks[:, :, 1:]
+    result = line_masks.copy()
+    result[:, 1:] |= line_masks[:, :-1]
+    result[:, :-1] |= line_masks[:, 1:]
+    return result
+
+
+class BatchLogic(object):
+    """
+    Plays games of one specification in lockstep, each game held as a slice
+    of `(num_games, height, width)` arrays. In each round, every box all of
+    whose mines are flagged is explored around and the unknown boxes
+    around every box which must all be mines are flagged, in all games at
+    once. The games where nothing is found compare the boxes within 2
+    layers like `Logic.two_indexes_logic`, and the games where still
+    nothing is found guess a box uniformly at random. Zeros are expanded
+    by dilating the explored zeros until nothing changes. Finished games
+    are retired from the arrays after each round.
+
+    The first click is in the center of the map like `Logic`, but boards
+    are drawn by NumPy, so they differ from the boards of `Logic` for the
+    same seed. Steps are counted as one for each box explored around,
+    flagged, explored or guessed, like `bit_autosweeper.BitLogic`.
+    """
+    MAX_BATCH_SIZE = 2048
+    PAD_WIDTH = BitBoard.MAX_SHIFT
+
+    def __init__(self, map_width, map_height, num_mines):
+        self.map_width = map_width
+        self.map_height = map_height
+        self.num_mines = num_mines
+        self.num_boxes = map_width * map_height
+        self.first_index = map_width // 2 + map_width * (map_height // 2)
+        self.pair_offsets = [
+            (dx, dy, suburb_offsets, other_suburb_offsets)
+            for (dx, dy), (suburb_offsets, other_suburb_offsets)
+            in BitBoard.get(map_width, map_height).suburb_offsets.items()
+        ]
+
+    def pad(self, arrays):
+        pad_width = BatchLogic.PAD_WIDTH
+        return np.pad(
+            arrays, ((0, 0), (pad_width, pad_width), (pad_width, pad_width))
+        )
+
+    def get_shifted(self, padded_arrays, dx, dy):
+        """
+        :return: np.ndarray
+            The values of the boxes at (dx, dy) from each box, or 0 out of
+            the map.
+        """
+        y = BatchLogic.PAD_WIDTH + dy
+        x = BatchLogic.PAD_WIDTH + dx
+        return padded_arrays[:, y:y + self.map_height, x:x + self.map_width]
+
+    @staticmethod
+    def explore(explored_masks, flag_masks, zero_masks, safe_masks):
+        """
+        :return: np.ndarray[bool]
+            `explored_masks` after exploring `safe_masks` and expanding the
+            zeros among them.
+        """
+        expand_masks = safe_masks & ~explored_masks
+        explored_masks = explored_masks | expand_masks
+        expand_masks &= zero_masks
+        while expand_masks.any():
+            expand_masks = dilate(expand_masks) & ~explored_masks \
+                & ~flag_masks
+            explored_masks |= expand_masks
+            expand_masks &= zero_masks
+        return explored_masks
+
+    def infer_box_pairs(self, number_maps, flag_counts, unknown_masks,
+            valuable_masks):
+        """
+        :return: tuple[np.ndarray[bool], np.ndarray[bool]]
+            The safe boxes and the mines found, see
+            `bit_autosweeper.BitLogic.infer_box_pairs`.
+        """
+        padded_valuable_masks = self.pad(valuable_masks)
+        padded_unknown_masks = self.pad(unknown_masks.view(np.int8))
+        padded_number_maps = self.pad(number_maps)
+        padded_flag_counts = self.pad(flag_counts)
+        safe_masks = np.zeros_like(unknown_masks)
+        mine_masks = np.zeros_like(unknown_masks)
+        for dx, dy, suburb_offsets, other_suburb_offsets in \
+                self.pair_offsets:
+            pair_masks = valuable_masks & self.get_shifted(
+                padded_valuable_masks, dx, dy
+            )
+            if not pair_masks.any():
+                continue
+            left_maps = number_maps + self.get_shifted(
+                padded_flag_counts, dx, dy
+            )
+            right_maps = flag_counts + self.get_shifted(
+                padded_number_maps, dx, dy
+            )
+            for x, y in suburb_offsets:
+                right_maps += self.get_shifted(padded_unknown_masks, x, y)
+            pair_masks &= left_maps == right_maps
+            if not pair_masks.any():
+                continue
+            padded_pair_masks = self.pad(pair_masks)
+            for x, y in suburb_offsets:
+                mine_masks |= self.get_shifted(padded_pair_masks, -x, -y)
+            for x, y in other_suburb_offsets:
+                safe_masks |= self.get_shifted(padded_pair_masks, -x, -y)
+        return safe_masks & unknown_masks, mine_masks & unknown_masks
+
+    def play_batch(self, rng, num_games):
+        """
+        :return: tuple[np.ndarray]
+            Whether each game is won, and its progress, number of flags,
+            number of steps, number of guesses and time used. The time of
+            setting up the boards is shared by all games, and the time of
+            each round by the games played in it.
+        """
+        round_begin_time = time.time()
+        num_boxes = self.num_boxes
+        mine_masks = generate_mine_masks(
+            rng, num_games, self.map_width, self.map_height, self.num_mines,
+            self.first_index
+        )
+        number_maps = count_surrounding(mine_masks)
+        zero_masks = (number_maps == 0) & ~mine_masks
+        flag_masks = np.zeros_like(mine_masks)
+        first_masks = np.zeros_like(mine_masks)
+        first_masks.reshape(num_games, -1)[:, self.first_index] = True
+        explored_masks = BatchLogic.explore(
+            flag_masks, flag_masks, zero_masks, first_masks
+        )
+        game_ids = np.arange(num_games)
+        won = np.zeros(num_games, dtype=bool)
+        progress = np.zeros(num_games, dtype=np.int64)
+        num_flags = np.zeros(num_games, dtype=np.int64)
+        num_steps = np.ones(num_games, dtype=np.int64)
+        num_guesses = np.zeros(num_games, dtype=np.int64)
+        time_used = np.zeros(num_games)
+        while game_ids.size:
+            unknown_masks = ~(explored_masks | flag_masks)
+            unknown_counts = count_surrounding(unknown_masks)
+            flag_counts = count_surrounding(flag_masks)
+            valuable_masks = explored_masks & (unknown_counts != 0)
+            chord_masks = valuable_masks & (flag_counts == number_maps)
+            filled_masks = valuable_masks \
+                & (flag_counts + unknown_counts == number_maps)
+            safe_masks = dilate(chord_masks) & unknown_masks
+            new_flag_masks = dilate(filled_masks) & unknown_masks
+            round_steps = chord_masks.sum(axis=(1, 2)) \
+                + new_flag_masks.sum(axis=(1, 2))
+            stuck = ~(safe_masks | new_flag_masks).any(axis=(1, 2))
+            if stuck.any():
+                pair_safe_masks, pair_mine_masks = self.infer_box_pairs(
+                    number_maps[stuck], flag_counts[stuck],
+                    unknown_masks[stuck], valuable_masks[stuck]
+                )
+                safe_masks[stuck] = pair_safe_masks
+                new_flag_masks[stuck] = pair_mine_masks
+                round_steps[stuck] = pair_safe_masks.sum(axis=(1, 2)) \
+                    + pair_mine_masks.sum(axis=(1, 2))
+                stuck &= ~(safe_masks | new_flag_masks).any(axis=(1, 2))
+            lost = np.zeros(game_ids.size, dtype=bool)
+            if stuck.any():
+                stuck_indexes = np.flatnonzero(stuck)
+                guess_keys = rng.random((stuck_indexes.size, num_boxes))
+                guess_keys[
+                    ~unknown_masks[stuck].reshape(-1, num_boxes)
+                ] = -1.0
+                guess_box_indexes = guess_keys.argmax(axis=1)
+                lost[stuck_indexes] = mine_masks.reshape(-1, num_boxes)[
+                    stuck_indexes, guess_box_indexes
+                ]
+                safe_masks.reshape(-1, num_boxes)[
+                    stuck_indexes, guess_box_indexes
+                ] = True
+                round_steps[stuck] += 1
+                num_guesses[game_ids[stuck]] += 1
+            num_steps[game_ids] += round_steps
+            flag_masks |= new_flag_masks
+            explored_masks = BatchLogic.explore(
+                explored_masks, flag_masks, zero_masks, safe_masks & ~lost[
+                    :, np.newaxis, np.newaxis
+                ]
+            )
+            num_explored = explored_masks.sum(axis=(1, 2))
+            num_flagged = flag_masks.sum(axis=(1, 2))
+            won_now = ~lost & (
+                num_boxes - num_explored - num_flagged
+                == self.num_mines - num_flagged
+            )
+            finished = lost | won_now
+            round_end_time = time.time()
+            time_used[game_ids] += (round_end_time - round_begin_time) \
+                / game_ids.size
+            round_begin_time = round_end_time
+            if not finished.any():
+                continue
+            finished_ids = game_ids[finished]
+            won[finished_ids] = won_now[finished]
+            progress[finished_ids] = np.where(
+                won_now, num_boxes, num_explored + num_flagged
+            )[finished]
+            num_flags[finished_ids] = np.where(
+                won_now, self.num_mines, num_flagged
+            )[finished]
+            playing = ~finished
+            game_ids = game_ids[playing]
+            mine_masks = mine_masks[playing]
+            number_maps = number_maps[playing]
+            zero_masks = zero_masks[playing]
+            explored_masks = explored_masks[playing]
+            flag_masks = flag_masks[playing]
+        return won, progress, num_flags, num_steps, num_guesses, time_used
+
+    def play(self, seed, num_games):
+        """
+        Plays `num_games` games in batches of at most `MAX_BATCH_SIZE`.
+
+        :param seed: int
+            The seed of the generator of all boards and guesses.
+
+        :return: tuple[np.ndarray, ..., float]
+            The arrays of `play_batch` and the total time used.
+
+        :raise ValueError:
+            If the mines cannot fit outside the safe region.
+        """
+        begin_time = time.time()
+        rng = np.random.default_rng(seed)
+        batch_results = []
+        for batch_offset in range(0, num_games, BatchLogic.MAX_BATCH_SIZE):
+            batch_results.append(self.play_batch(
+                rng, min(BatchLogic.MAX_BATCH_SIZE, num_games - batch_offset)
+            ))
+        results = tuple(map(np.concatenate, zip(*batch_results)))
+        return results + (time.time() - begin_time,)
@@ -3,13 +3,20 @@
 
 #include <algorithm>
 #include <assert.h>
-#include <direct.h>
+#include <chrono>
+#include <cstdlib>
+#include <cstring>
 #include <fstream>
+#include <random>
+#include <sys/stat.h>
 #include <vector>
-#include <windows.h>
 
-#if !defined(_WIN32)
-#include <conio.h>
+#if defined(_WIN32)
+#include <direct.h>
+#include <io.h>
+#include <windows.h>
+#else
+#include <unistd.h>
 #endif
 
 
@@ -59,16 +66,95 @@ const bool contains(int num, const vector<int> &vals, vector<int>::const_iterato
 
 
 const double get_current_time() {
-	LARGE_INTEGER n_freq, current_time;
-	QueryPerformanceFrequency(&n_freq);
-	QueryPerformanceCounter(&current_time);
-	return static_cast<double>(current_time.QuadPart) / n_freq.QuadPart;
+	return chrono::duration<double>(chrono::steady_clock::now().time_since_epoch()).count();
 }
 
 
-namespace random {
+namespace rng {
+const unsigned long long GOLDEN_GAMMA(0x9e3779b97f4a7c15ULL);
+
+const unsigned long long splitmix64(unsigned long long value) {
+	value = (value ^ (value >> 30)) * 0xbf58476d1ce4e5b9ULL;
+	value = (value ^ (value >> 27)) * 0x94d049bb133111ebULL;
+	return value ^ (value >> 31);
+}
+
+// The seed of the n-th game (counted from 1) of a run, which is the n-th
+// output of a SplitMix64 generator seeded with the master seed. Thus each
+// game gets its own stream whichever thread plays it.
+const unsigned long long get_game_seed(unsigned long long master_seed, int serial_num) {
+	return splitmix64(master_seed + GOLDEN_GAMMA * static_cast<unsigned long long>(serial_num));
+}
+
+// xoshiro256** generator, cheap enough to be re-seeded before every game.
+struct Xoshiro256 {
+public:
+	typedef unsigned long long result_type;
+
+	result_type state[4];
+
+	Xoshiro256() {
+		seed(0);
+	}
+
+	static constexpr result_type min() {
+		return 0;
+	}
+
+	static constexpr result_type max() {
+		return ~0ULL;
+	}
+
+	static const result_type rotl(result_type value, int shift) {
+		return (value << shift) | (value >> (64 - shift));
+	}
+
+	void seed(result_type seed_val) {
+		for (int i = 0; i < 4; ++i) {
+			state[i] = get_game_seed(seed_val, i + 1);
+		}
+	}
+
+	result_type operator()() {
+		result_type result(rotl(state[1] * 5, 7) * 9);
+		result_type t(state[1] << 17);
+		state[2] ^= state[0];
+		state[3] ^= state[1];
+		state[1] ^= state[2];
+		state[0] ^= state[3];
+		state[2] ^= t;
+		state[3] = rotl(state[3], 45);
+		return result;
+	}
+};
+
+thread_local Xoshiro256 engine;
+
+void seed(unsigned long long seed_val) {
+	engine.seed(seed_val);
+}
+
+const unsigned long long get_random_seed() {
+	random_device device;
+	return (static_cast<unsigned long long>(device()) << 32) ^ device();
+}
+
+// Maps the upper 32 bits of the engine output to [0, range_maximum) by
+// Lemire's multiply-shift, rejecting the few values which would bias it.
+// Unlike `uniform_int_distribution`, whose mapping differs between standard
+// libraries, the result only depends on the seed.
 const int randint(int range_maximum) {
-	return rand() % range_maximum;
+	const unsigned int range(static_cast<unsigned int>(range_maximum));
+	unsigned long long product((engine() >> 32) * range);
+	unsigned int low(static_cast<unsigned int>(product));
+	if (low < range) {
+		const unsigned int threshold((0U - range) % range);
+		while (low < threshold) {
+			product = (engine() >> 32) * range;
+			low = static_cast<unsigned int>(product);
+		}
+	}
+	return static_cast<int>(product >> 32);
 }
 
 const int random_choice(vector<int> vals) {
@@ -93,17 +179,27 @@ const vector<int> random_choices(vector<int> vals, int num_choices) {
 
 
 namespace os {
+#if defined(_WIN32)
+const char SEP('\\');
+#else
+const char SEP('/');
+#endif
+
 const bool exists(const char *path) {
+#if defined(_WIN32)
 	return _access(path, 0) == 0;
+#else
+	return access(path, F_OK) == 0;
+#endif
 }
 
 const int count_num_files(const char *path) {
 	char file_path[64];
-	sprintf(file_path, "%s\\0.json", path);
+	sprintf(file_path, "%s%c0.json", path, SEP);
 	if (!exists(file_path)) {
 		return 0;
 	}
-	sprintf(file_path, "%s\\1.json", path);
+	sprintf(file_path, "%s%c1.json", path, SEP);
 	if (!exists(file_path)) {
 		return 1;
 	}
@@ -111,13 +207,13 @@ const int count_num_files(const char *path) {
 	bool current_file_exists(true);
 	while (current_file_exists) {
 		upper_bound *= 2;
-		sprintf(file_path, "%s\\%d.json", path, upper_bound);
+		sprintf(file_path, "%s%c%d.json", path, SEP, upper_bound);
 		current_file_exists = exists(file_path);
 	}
 	int lower_bound(upper_bound / 2);
 	int middle((lower_bound + upper_bound) / 2);
 	while (middle != lower_bound) {
-		sprintf(file_path, "%s\\%d.json", path, middle);
+		sprintf(file_path, "%s%c%d.json", path, SEP, middle);
 		if (exists(file_path)) {
 			lower_bound = middle;
 		} else {
@@ -130,16 +226,95 @@ const int count_num_files(const char *path) {
 
 void make_dir(const char *folder_path) {
 	if (!exists(folder_path)) {
+#if defined(_WIN32)
 		_mkdir(folder_path);
+#else
+		mkdir(folder_path, 0755);
+#endif
+	}
+}
+
+const long long get_file_size(const char *path) {
+	struct stat file_stat;
+	if (stat(path, &file_stat) != 0) {
+		return 0;
 	}
+	return static_cast<long long>(file_stat.st_size);
 }
 }
 
 
+namespace binary {
+void put_varint(vector<unsigned char> &buffer, unsigned long long value) {
+	while (value >= 0x80) {
+		buffer.push_back(static_cast<unsigned char>((value & 0x7f) | 0x80));
+		value >>= 7;
+	}
+	buffer.push_back(static_cast<unsigned char>(value));
+}
+
+void put_uint32(vector<unsigned char> &buffer, unsigned int value) {
+	for (int i = 0; i < 4; ++i) {
+		buffer.push_back(static_cast<unsigned char>(value >> (i * 8) & 0xff));
+	}
+}
+
+void put_uint64(vector<unsigned char> &buffer, unsigned long long value) {
+	for (int i = 0; i < 8; ++i) {
+		buffer.push_back(static_cast<unsigned char>(value >> (i * 8) & 0xff));
+	}
+}
+
+void put_double(vector<unsigned char> &buffer, double value) {
+	unsigned long long bits;
+	memcpy(&bits, &value, sizeof(bits));
+	put_uint64(buffer, bits);
+}
+
+void put_2bit(vector<unsigned char> &buffer, const vector<int> &values) {
+	size_t begin(buffer.size());
+	buffer.resize(begin + (values.size() + 3) / 4);
+	for (size_t i = 0; i < values.size(); ++i) {
+		buffer[begin + (i >> 2)] |= static_cast<unsigned char>(values[i] << ((i & 3) << 1));
+	}
+}
+}
+
+
+enum ConsoleBackend {
+	WINDOWS_BACKEND,
+	ANSI_BACKEND,
+	HEADLESS_BACKEND
+};
+
+
+const ConsoleBackend get_console_backend() {
+	const char *backend_name(getenv("AUTOSWEEPER_CONSOLE"));
+	if (backend_name != nullptr) {
+		if (strcmp(backend_name, "windows") == 0) {
+			return WINDOWS_BACKEND;
+		}
+		if (strcmp(backend_name, "ansi") == 0) {
+			return ANSI_BACKEND;
+		}
+		if (strcmp(backend_name, "headless") == 0) {
+			return HEADLESS_BACKEND;
+		}
+	}
+#if defined(_WIN32)
+	return _isatty(_fileno(stdout)) ? WINDOWS_BACKEND : HEADLESS_BACKEND;
+#else
+	return isatty(fileno(stdout)) ? ANSI_BACKEND : HEADLESS_BACKEND;
+#endif
+}
+
+
 struct ConsoleTools {
 private:
 	int __cols;
 	int __lines;
+	ConsoleBackend __backend;
+#if defined(_WIN32)
 	HANDLE __hStdOut;
 
 	const BOOL __set_console_cursor_position(int x, int y) const {
@@ -159,49 +334,149 @@ private:
 	const BOOL __set_console_text_attribute(int color) const {
 		return SetConsoleTextAttribute(__hStdOut, color);
 	}
+#endif
+
+	static const int __get_ansi_color_index(int color) {
+		return (color & 0x01) << 2 | (color & 0x02) | (color & 0x04) >> 2;
+	}
 
 	void __set_console_size() const {
-		char cmd_str[64];
-		sprintf(cmd_str, "mode con cols=%d lines=%d", __cols + 3, __lines + 2);
-		system(cmd_str);
+		switch (__backend) {
+			case WINDOWS_BACKEND: {
+				char cmd_str[64];
+				sprintf(cmd_str, "mode con cols=%d lines=%d", __cols + 3, __lines + 2);
+				system(cmd_str);
+				break;
+			}
+			case ANSI_BACKEND: {
+				printf("\033[8;%d;%dt", __lines + 2, __cols + 3);
+				break;
+			}
+			default: {
+				break;
+			}
+		}
 	}
 
 public:
 	static const int DEFAULT_CONSOLE_COLS = 80;
 	static const int DEFAULT_CONSOLE_LINES = 40;
 	static const int DEFAULT_DW_SIZE = 20;
+	static const int DEFAULT_COLOR = 0x0f;
 
 	ConsoleTools():
 		__cols(DEFAULT_CONSOLE_COLS),
 		__lines(DEFAULT_CONSOLE_LINES),
-		__hStdOut(GetStdHandle(STD_OUTPUT_HANDLE))
-	{}
+		__backend(get_console_backend())
+#if defined(_WIN32)
+		, __hStdOut(GetStdHandle(STD_OUTPUT_HANDLE))
+#endif
+	{
+#if !defined(_WIN32)
+		if (__backend == WINDOWS_BACKEND) {
+			__backend = ANSI_BACKEND;
+		}
+#endif
+	}
 
 	virtual ~ConsoleTools() = default;
 
+	const bool is_headless() const {
+		return __backend == HEADLESS_BACKEND;
+	}
+
+	void set_backend(ConsoleBackend backend) {
+		__backend = backend;
+	}
+
 	void clear_console() const {
-		system("cls");
+		switch (__backend) {
+			case WINDOWS_BACKEND: {
+				system("cls");
+				break;
+			}
+			case ANSI_BACKEND: {
+				printf("\033[2J\033[H");
+				break;
+			}
+			default: {
+				break;
+			}
+		}
 	}
 
 	void hide_cursor(int cursor_size=DEFAULT_DW_SIZE) const {
-		__set_console_cursor_info(0, cursor_size);
+		switch (__backend) {
+#if defined(_WIN32)
+			case WINDOWS_BACKEND: {
+				__set_console_cursor_info(0, cursor_size);
+				break;
+			}
+#endif
+			case ANSI_BACKEND: {
+				printf("\033[?25l");
+				break;
+			}
+			default: {
+				break;
+			}
+		}
 	}
 
 	void show_cursor(int cursor_size=DEFAULT_DW_SIZE) const {
-		__set_console_cursor_info(1, cursor_size);
+		switch (__backend) {
+#if defined(_WIN32)
+			case WINDOWS_BACKEND: {
+				__set_console_cursor_info(1, cursor_size);
+				break;
+			}
+#endif
+			case ANSI_BACKEND: {
+				printf("\033[?25h");
+				break;
+			}
+			default: {
+				break;
+			}
+		}
 	}
 
 	void set_cmd_text_color(int color) const {
-		__set_console_text_attribute(color);
+		switch (__backend) {
+#if defined(_WIN32)
+			case WINDOWS_BACKEND: {
+				fflush(stdout);
+				__set_console_text_attribute(color);
+				break;
+			}
+#endif
+			case ANSI_BACKEND: {
+				int foreground(color & 0x0f);
+				int background(color >> 4);
+				printf(
+					"\033[%d;%dm",
+					__get_ansi_color_index(foreground) + (foreground & 0x08 ? 90 : 30),
+					__get_ansi_color_index(background) + (background & 0x08 ? 100 : 40)
+				);
+				break;
+			}
+			default: {
+				break;
+			}
+		}
 	}
 
 	void reset_color() const {
-		set_cmd_text_color(0x0f);
+		if (__backend == ANSI_BACKEND) {
+			printf("\033[0m");
+		} else {
+			set_cmd_text_color(DEFAULT_COLOR);
+		}
 	}
 
 	void printf_with_color(const char *value, int color) const {
 		set_cmd_text_color(color);
-		printf(value);
+		fputs(value, stdout);
 		reset_color();
 	}
 	
@@ -221,7 +496,22 @@ public:
 		int x(coord.first);
 		int y(coord.second);
 		assert(x < __cols && y < __lines);
-		__set_console_cursor_position(x, y);
+		switch (__backend) {
+#if defined(_WIN32)
+			case WINDOWS_BACKEND: {
+				fflush(stdout);
+				__set_console_cursor_position(x, y);
+				break;
+			}
+#endif
+			case ANSI_BACKEND: {
+				printf("\033[%d;%dH", y + 1, x + 1);
+				break;
+			}
+			default: {
+				break;
+			}
+		}
 	}
 
 	void move_cursor_to_line(int line_index) const {
@@ -232,12 +522,24 @@ public:
 		move_cursor_to_line(__lines - reversed_line_index - 1);
 	}
 
+	void print_at(pair<int, int> coord, const char *value) const {
+		if (__backend == HEADLESS_BACKEND) {
+			return;
+		}
+		move_cursor_to(coord);
+		fputs(value, stdout);
+	}
+
 	void pause() {
+		if (__backend == HEADLESS_BACKEND) {
+			return;
+		}
 		printf("Press any key to continue...");
+		fflush(stdout);
 #if defined(_WIN32)
 		system("pause > nul");
 #else
-		getch();
+		getchar();
 #endif
 	}
 
@@ -249,11 +551,15 @@ public:
 	}
 
 	void ready_to_quit() {
+		if (__backend == HEADLESS_BACKEND) {
+			printf("\n");
+		}
 		show_cursor();
 		move_cursor_to_end_line(0);
 		pause();
 		clear_console();
 		set_console_size_to_default();
+		fflush(stdout);
 		exit(0);
 	}
 } CONSOLE;
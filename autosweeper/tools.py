@@ -2,8 +2,11 @@
 # coding: utf-8
 
 import ctypes
+import functools
 import os
 import sys
+import threading
+import time
 
 
 __author__ = "Michael W"
@@ -126,11 +129,181 @@ class InputTools(object):
         )
 
 
+class BinaryTools(object):
+    @staticmethod
+    def put_varint(buffer, value):
+        """
+        Appends a non-negative int to a bytearray in LEB128 encoding.
+        """
+        while value >= 0x80:
+            buffer.append(value & 0x7f | 0x80)
+            value >>= 7
+        buffer.append(value)
+
+    @staticmethod
+    def get_varint(data, position):
+        """
+        :return: tuple[int, int]
+            The decoded int and the position right after it.
+        """
+        result = 0
+        shift = 0
+        while True:
+            byte = data[position]
+            position += 1
+            result |= (byte & 0x7f) << shift
+            if byte < 0x80:
+                return result, position
+            shift += 7
+
+    @staticmethod
+    def pack_2bit(values):
+        """
+        Packs ints in range(4) four per byte, the first one in the lowest
+        bits.
+        """
+        result = bytearray((len(values) + 3) // 4)
+        for i, value in enumerate(values):
+            result[i >> 2] |= value << ((i & 3) << 1)
+        return result
+
+    @staticmethod
+    def unpack_2bit(data, position, count):
+        """
+        :return: tuple[list[int], int]
+            The unpacked ints and the position right after them.
+        """
+        values = [
+            data[position + (i >> 2)] >> ((i & 3) << 1) & 3
+            for i in range(count)
+        ]
+        return values, position + (count + 3) // 4
+
+
+class SeedTools(object):
+    MASK = (1 << 64) - 1
+    GOLDEN_GAMMA = 0x9e3779b97f4a7c15
+
+    @staticmethod
+    def splitmix64(value):
+        value = (value ^ value >> 30) * 0xbf58476d1ce4e5b9 & SeedTools.MASK
+        value = (value ^ value >> 27) * 0x94d049bb133111eb & SeedTools.MASK
+        return value ^ value >> 31
+
+    @staticmethod
+    def get_game_seed(master_seed, serial_num):
+        """
+        :return: int
+            The seed of the `serial_num`-th game (counted from 1) of a run,
+            which is the `serial_num`-th output of a SplitMix64 generator
+            seeded with `master_seed`. Thus each game gets its own stream
+            whichever process plays it.
+        """
+        return SeedTools.splitmix64(
+            master_seed + serial_num * SeedTools.GOLDEN_GAMMA & SeedTools.MASK
+        )
+
+
+class Profiler(object):
+    """
+    Opt-in timers and counters of the phases of a game, enabled by the
+    environment variable `ENABLED_VAR`. Methods are only wrapped by
+    `time_method` and `count_method` when it's enabled, so a disabled
+    profiler costs nothing. Time is charged to the innermost running phase.
+
+    :attr phase_times: dict[str, int]
+        Nanoseconds spent in each phase.
+
+    :attr counts: dict[str, int]
+    """
+    ENABLED_VAR = "AUTOSWEEPER_PROFILE"
+
+    def __init__(self, phases, counters):
+        self.enabled = os.environ.get(Profiler.ENABLED_VAR, "0") \
+            not in ("", "0")
+        self.phases = phases
+        self.counters = counters
+        self.phase_times = dict.fromkeys(phases, 0)
+        self.counts = dict.fromkeys(counters, 0)
+        self.current_phase = None
+        self.mark_time = 0
+
+    def enter(self, phase):
+        now = time.perf_counter_ns()
+        previous_phase = self.current_phase
+        if previous_phase is not None:
+            self.phase_times[previous_phase] += now - self.mark_time
+        self.current_phase = phase
+        self.mark_time = now
+        return previous_phase
+
+    def exit(self, previous_phase):
+        now = time.perf_counter_ns()
+        self.phase_times[self.current_phase] += now - self.mark_time
+        self.current_phase = previous_phase
+        self.mark_time = now
+
+    def time_method(self, cls, method_name, phase, counter=None):
+        method = getattr(cls, method_name)
+        counts = self.counts
+
+        @functools.wraps(method)
+        def timed_method(*args, **kwargs):
+            if counter is not None:
+                counts[counter] += 1
+            previous_phase = self.enter(phase)
+            try:
+                return method(*args, **kwargs)
+            finally:
+                self.exit(previous_phase)
+
+        setattr(cls, method_name, timed_method)
+
+    def count_method(self, cls, method_name, counter):
+        method = getattr(cls, method_name)
+        counts = self.counts
+
+        @functools.wraps(method)
+        def counted_method(*args, **kwargs):
+            counts[counter] += 1
+            return method(*args, **kwargs)
+
+        setattr(cls, method_name, counted_method)
+
+    def pop_totals(self):
+        """
+        :return: tuple[dict[str, int], dict[str, int]]
+            The phase times and counts since the last call.
+        """
+        totals = (dict(self.phase_times), dict(self.counts))
+        for phase in self.phases:
+            self.phase_times[phase] = 0
+        for counter in self.counters:
+            self.counts[counter] = 0
+        return totals
+
+    def merge_totals(self, totals):
+        phase_times, counts = totals
+        for phase, phase_time in phase_times.items():
+            self.phase_times[phase] += phase_time
+        for counter, count in counts.items():
+            self.counts[counter] += count
+
+
 class ConsoleCursor(object):
     STD_INPUT_HANDLE = -10
     STD_OUTPUT_HANDLE = -11
     STD_ERROR_HANDLE = -12
-    HANDLE_STD_OUT = ctypes.windll.kernel32.GetStdHandle(STD_OUTPUT_HANDLE)
+    HANDLE_STD_OUT = None
+
+    @staticmethod
+    def get_handle():
+        if ConsoleCursor.HANDLE_STD_OUT is None:
+            ConsoleCursor.HANDLE_STD_OUT = \
+                ctypes.windll.kernel32.GetStdHandle(
+                    ConsoleCursor.STD_OUTPUT_HANDLE
+                )
+        return ConsoleCursor.HANDLE_STD_OUT
 
 
 class ConsoleCursorInfo(ctypes.Structure, ConsoleCursor):
@@ -141,7 +314,7 @@ class ConsoleCursorInfo(ctypes.Structure, ConsoleCursor):
         self.dwSize = ConsoleCursorInfo.DEFAULT_DW_SIZE
         self.bVisible = visible
         ctypes.windll.kernel32.SetConsoleCursorInfo(
-            ConsoleCursor.HANDLE_STD_OUT, ctypes.byref(self)
+            ConsoleCursor.get_handle(), ctypes.byref(self)
         )
 
 
@@ -152,7 +325,7 @@ class ConsoleCursorPosition(ctypes.Structure, ConsoleCursor):
         self.X = x
         self.Y = y
         ctypes.windll.kernel32.SetConsoleCursorPosition(
-            ConsoleCursor.HANDLE_STD_OUT, self
+            ConsoleCursor.get_handle(), self
         )
 
 
@@ -181,37 +354,284 @@ class ConsoleTextColor(ConsoleCursor):
             f: white
         """
         ctypes.windll.kernel32.SetConsoleTextAttribute(
-            ConsoleCursor.HANDLE_STD_OUT, color
+            ConsoleCursor.get_handle(), color
+        )
+
+
+class HeadlessBackend(object):
+    """
+    Skips every cursor, color and console size operation. Only plain text
+    (prompts, messages) is printed.
+    """
+    NAME = "headless"
+    INTERACTIVE = False
+
+    def clear_console(self):
+        pass
+
+    def set_cursor_visible(self, visible):
+        pass
+
+    def set_text_color(self, color):
+        pass
+
+    def reset_color(self):
+        pass
+
+    def move_cursor_to(self, x, y):
+        pass
+
+    def set_console_size(self, cols, lines):
+        pass
+
+    def write_runs(self, runs):
+        """
+        :param runs: list[tuple[int, int, list[tuple[int, str]]]]
+            Each run is written from its coord, as segments of text in
+            their colors, see `FrameBuffer.pop_runs`.
+        """
+        pass
+
+    def pause(self):
+        pass
+
+
+class WindowsBackend(HeadlessBackend):
+    NAME = "windows"
+    INTERACTIVE = True
+
+    def clear_console(self):
+        os.system("cls")
+
+    def set_cursor_visible(self, visible):
+        ConsoleCursorInfo(int(visible))
+
+    def set_text_color(self, color):
+        ConsoleTextColor(color)
+
+    def reset_color(self):
+        ConsoleTextColor(ConsoleTools.DEFAULT_COLOR)
+
+    def move_cursor_to(self, x, y):
+        ConsoleCursorPosition(x, y)
+
+    def set_console_size(self, cols, lines):
+        os.system("mode con cols={0} lines={1}".format(cols, lines))
+
+    def write_runs(self, runs):
+        for x, y, segments in runs:
+            self.move_cursor_to(x, y)
+            for color, text in segments:
+                self.set_text_color(color)
+                print_(text)
+        self.reset_color()
+
+    def pause(self):
+        os.system(" ".join(("pause", ">", os.devnull)))
+
+
+class AnsiBackend(HeadlessBackend):
+    NAME = "ansi"
+    INTERACTIVE = True
+    CSI = "\033["
+
+    @staticmethod
+    def get_color_code(color):
+        def get_ansi_index(win_color):
+            return (win_color & 0x01) << 2 | win_color & 0x02 \
+                | (win_color & 0x04) >> 2
+        foreground = color & 0x0f
+        background = color >> 4
+        foreground_code = get_ansi_index(foreground) \
+            + (90 if foreground & 0x08 else 30)
+        background_code = get_ansi_index(background) \
+            + (100 if background & 0x08 else 40)
+        return "{0}{1};{2}m".format(
+            AnsiBackend.CSI, foreground_code, background_code
         )
 
+    def clear_console(self):
+        print_(AnsiBackend.CSI + "2J" + AnsiBackend.CSI + "H")
+
+    def set_cursor_visible(self, visible):
+        print_(AnsiBackend.CSI + ("?25h" if visible else "?25l"))
+
+    def set_text_color(self, color):
+        print_(AnsiBackend.get_color_code(color))
+
+    def reset_color(self):
+        print_(AnsiBackend.CSI + "0m")
+
+    def move_cursor_to(self, x, y):
+        print_("{0}{1};{2}H".format(AnsiBackend.CSI, y + 1, x + 1))
+
+    def set_console_size(self, cols, lines):
+        print_("{0}8;{1};{2}t".format(AnsiBackend.CSI, lines, cols))
+
+    def write_runs(self, runs):
+        parts = []
+        for x, y, segments in runs:
+            parts.append("{0}{1};{2}H".format(AnsiBackend.CSI, y + 1, x + 1))
+            for color, text in segments:
+                parts.append(AnsiBackend.get_color_code(color))
+                parts.append(text)
+        parts.append(AnsiBackend.CSI + "0m")
+        print_("".join(parts))
+
+    def pause(self):
+        if not sys.stdin.isatty():
+            sys.stdin.readline()
+            return
+        try:
+            import termios
+            import tty
+        except ImportError:
+            input()
+            return
+        fd = sys.stdin.fileno()
+        old_settings = termios.tcgetattr(fd)
+        try:
+            tty.setraw(fd)
+            sys.stdin.read(1)
+        finally:
+            termios.tcsetattr(fd, termios.TCSADRAIN, old_settings)
+
+
+def get_console_backend():
+    """
+    The backend can be chosen with the environment variable
+    AUTOSWEEPER_CONSOLE (windows / ansi / headless). By default the windows
+    backend is used on Windows and the ansi one elsewhere, while headless is
+    used if stdout is not a terminal.
+    """
+    backends = {
+        backend.NAME: backend
+        for backend in (WindowsBackend, AnsiBackend, HeadlessBackend)
+    }
+    backend_name = os.environ.get("AUTOSWEEPER_CONSOLE", "").lower()
+    if backend_name not in backends:
+        if not sys.stdout.isatty():
+            backend_name = HeadlessBackend.NAME
+        elif os.name == "nt":
+            backend_name = WindowsBackend.NAME
+        else:
+            backend_name = AnsiBackend.NAME
+    return backends[backend_name]()
+
+
+class FrameBuffer(object):
+    """
+    Off-screen characters and colors of the console. Writing only changes
+    the buffer; `pop_runs` collects the cells which differ from what is on
+    the screen, so that they can be written at once, with one cursor move
+    for each run of adjacent cells and one color change for each change of
+    color within a run.
+
+    A cell holds one character, which takes `cell_width` columns of the
+    console.
+    """
+    def __init__(self):
+        """
+        :attr cells: dict[tuple[int, int], tuple[str, int, int]]
+            The character, color and width of the cell at each coord.
+
+        :attr shown_cells: dict
+            The same as `cells`, for the cells on the screen.
+
+        :attr dirty_coords: set[tuple[int, int]]
+            The coords of the cells written since the last `pop_runs`.
+        """
+        self.cells = {}
+        self.shown_cells = {}
+        self.dirty_coords = set()
+
+    def clear(self):
+        self.cells.clear()
+        self.shown_cells.clear()
+        self.dirty_coords.clear()
+
+    def put(self, coord, value, color, cell_width):
+        x, y = coord
+        cells = self.cells
+        for char in value:
+            cell = (char, color, cell_width)
+            if cells.get((x, y)) != cell:
+                cells[(x, y)] = cell
+                self.dirty_coords.add((x, y))
+            x += cell_width
+
+    def pop_runs(self):
+        """
+        :return: list[tuple[int, int, list[tuple[int, str]]]]
+            The coord of the first cell of each run, and the segments of
+            text of the same color in it.
+        """
+        cells = self.cells
+        shown_cells = self.shown_cells
+        runs = []
+        next_coord = None
+        segments = None
+        for y, x in sorted(
+            (y, x) for x, y in self.dirty_coords
+            if cells[(x, y)] != shown_cells.get((x, y))
+        ):
+            cell = cells[(x, y)]
+            shown_cells[(x, y)] = cell
+            char, color, cell_width = cell
+            if (x, y) != next_coord:
+                segments = []
+                runs.append((x, y, segments))
+            if segments and segments[-1][0] == color:
+                segments[-1][1].append(char)
+            else:
+                segments.append((color, [char]))
+            next_coord = (x + cell_width, y)
+        self.dirty_coords.clear()
+        return [
+            (x, y, [(color, "".join(chars)) for color, chars in segments])
+            for x, y, segments in runs
+        ]
+
 
 class ConsoleTools(object):
     DEFAULT_CONSOLE_COLS = 80
     DEFAULT_CONSOLE_LINES = 40
+    DEFAULT_COLOR = 0x0f
+    BACKEND = get_console_backend()
 
     def __init__(self):
         self.__cols = ConsoleTools.DEFAULT_CONSOLE_COLS
         self.__lines = ConsoleTools.DEFAULT_CONSOLE_COLS
+        self.__frame_buffer = FrameBuffer()
+        self.__lock = threading.RLock()
+
+    @staticmethod
+    def set_backend(backend):
+        ConsoleTools.BACKEND = backend
+
+    @staticmethod
+    def is_interactive():
+        return ConsoleTools.BACKEND.INTERACTIVE
 
     @staticmethod
     def clear_console():
-        os.system("cls")
+        ConsoleTools.BACKEND.clear_console()
 
     @staticmethod
     def hide_cursor():
-        ConsoleCursorInfo(0)
+        ConsoleTools.BACKEND.set_cursor_visible(False)
 
     @staticmethod
     def show_cursor():
-        ConsoleCursorInfo(1)
+        ConsoleTools.BACKEND.set_cursor_visible(True)
 
     @staticmethod
     def __set_cmd_text_color(color):
-        ConsoleTextColor(color)
+        ConsoleTools.BACKEND.set_text_color(color)
 
     @staticmethod
     def __reset_color():
-        ConsoleTools.__set_cmd_text_color(0x0f)
+        ConsoleTools.BACKEND.reset_color()
 
     @staticmethod
     def put_new_line():
@@ -224,9 +644,9 @@ class ConsoleTools(object):
         ConsoleTools.__reset_color()
 
     def __set_console_size(self):
-        os.system("mode con cols={0} lines={1}".format(
+        ConsoleTools.BACKEND.set_console_size(
             self.__cols + 3, self.__lines + 2
-        ))
+        )
     
     def set_console_size(self, cols, lines):
         self.__cols = cols
@@ -234,38 +654,76 @@ class ConsoleTools(object):
         self.__set_console_size()
     
     def set_console_size_to_default(self):
-        self.__init__()
+        self.__cols = ConsoleTools.DEFAULT_CONSOLE_COLS
+        self.__lines = ConsoleTools.DEFAULT_CONSOLE_COLS
         self.__set_console_size()
 
     def __move_cursor_to(self, coord):
         x, y = coord
         assert x < self.__cols and y < self.__lines
-        ConsoleCursorPosition(x, y)
+        ConsoleTools.BACKEND.move_cursor_to(x, y)
 
     def move_cursor_to_line(self, line_index):
-        self.__move_cursor_to((0, line_index))
+        with self.__lock:
+            self.flush()
+            self.__move_cursor_to((0, line_index))
 
     def move_cursor_to_end_line(self, reversed_line_index):
         self.move_cursor_to_line(self.__lines - reversed_line_index - 1)
 
     def print_at(self, coord, value, *, color=0x0f):
+        if not ConsoleTools.is_interactive():
+            return
         assert "\n" not in value
         assert len(value) + coord[0] <= self.__cols
-        self.__move_cursor_to(coord)
-        ConsoleTools.print_with_color(value, color=color)
+        with self.__lock:
+            self.flush()
+            self.__move_cursor_to(coord)
+            ConsoleTools.print_with_color(value, color=color)
 
     def print_in_line(self, line_index, value, *, color=0x0f):
         self.print_at((0, line_index), value, color=color)
 
-    def print_list_as_table_row(self, line_index, list_obj,
-            cell_width, align, cell_separator):
+    def draw_at(self, coord, value, *, color=0x0f, cell_width=1):
+        """
+        Writes into the frame buffer, which is shown on the next `flush`.
+        Any direct printing flushes the frame buffer first.
+
+        Drawing, printing at a coord and flushing may be called from
+        different threads.
+        """
+        if not ConsoleTools.is_interactive():
+            return
+        assert "\n" not in value
+        assert len(value) * cell_width + coord[0] <= self.__cols
+        with self.__lock:
+            self.__frame_buffer.put(coord, value, color, cell_width)
+
+    def draw_in_line(self, line_index, value, *, color=0x0f):
+        self.draw_at((0, line_index), value, color=color)
+
+    def flush(self):
+        if not self.__frame_buffer.dirty_coords:
+            return
+        with self.__lock:
+            runs = self.__frame_buffer.pop_runs()
+            if runs:
+                ConsoleTools.BACKEND.write_runs(runs)
+
+    @staticmethod
+    def get_table_row_str(list_obj, cell_width, align, cell_separator):
         cell_str_template_list = [
             StringTools.set_space(cell_width, align, str_index=k)
             for k in range(len(list_obj))
         ]
+        return cell_separator.join(cell_str_template_list).format(*list_obj)
+
+    def print_list_as_table_row(self, line_index, list_obj,
+            cell_width, align, cell_separator):
         self.print_in_line(
-            line_index,
-            cell_separator.join(cell_str_template_list).format(*list_obj)
+            line_index, ConsoleTools.get_table_row_str(
+                list_obj, cell_width, align, cell_separator
+            )
         )
 
     def print_copyright_str(self):
@@ -273,16 +731,21 @@ class ConsoleTools(object):
 
     @staticmethod
     def pause():
+        if not ConsoleTools.is_interactive():
+            return
         print_("Press any key to quit...")
-        os.system(" ".join(("pause", ">", os.devnull)))
+        ConsoleTools.BACKEND.pause()
 
     def ready_to_begin(self, cols, lines):
+        self.__frame_buffer.clear()
         ConsoleTools.clear_console()
         ConsoleTools.hide_cursor()
         ConsoleTools.__reset_color()
         self.set_console_size(cols, lines)
 
     def ready_to_quit(self):
+        if not ConsoleTools.is_interactive():
+            ConsoleTools.put_new_line()
         ConsoleTools.show_cursor()
         self.move_cursor_to_end_line(0)
         ConsoleTools.pause()